@@ -0,0 +1,168 @@
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+
+from artifact_cache import fingerprint
+from baseline_engine import sorted_quantiles
+from baseline_store import dataset_fingerprint
+
+
+# Scales the MAD to the standard deviation of normally distributed data
+MAD_SCALE = 1.4826
+
+
+class ThresholdModel:
+    def __init__(self, method='percentile', k=3.0, percentile=95, by_hour=False, min_group_size=30,
+                 cache_file="threshold_cache.pkl", max_cache_entries=20):
+        """
+        Per-context bottleneck thresholds
+
+        A threshold is computed for every (resource, activity) pair, and
+        optionally every (resource, activity, hour of day), in one grouped pass
+        over the events sorted by (group, duration). Groups with fewer than
+        min_group_size events fall back to the next coarser level: hour groups
+        to their pair, pairs to the global threshold.
+
+        Parameters:
+        - method: 'percentile' = per-group percentile, 'mad' = median + k * scaled MAD
+          (the MAD rule flags nothing in groups whose durations are spread evenly,
+          e.g. uniform, since median + 3 MAD then exceeds the group maximum)
+        - k: MAD multiplier for method='mad'
+        - percentile: Percentile for method='percentile' (also the global fallback level)
+        - by_hour: Also split every pair by hour of day
+        - min_group_size: Minimum events for a group to get its own threshold
+        - cache_file: Pickle file of fitted thresholds per dataset (None = no caching)
+        - max_cache_entries: Oldest fitted datasets are dropped beyond this count
+        """
+        if method not in ('mad', 'percentile'):
+            raise ValueError("method must be 'mad' or 'percentile'")
+        self.method = method
+        self.k = k
+        self.percentile = percentile
+        self.by_hour = by_hour
+        self.min_group_size = min_group_size
+        self.cache_file = cache_file
+        self.max_cache_entries = max_cache_entries
+        self.thresholds = None
+        self.hourly_thresholds = None
+        self.global_threshold = None
+
+    @property
+    def params(self):
+        return {'method': self.method, 'k': self.k, 'percentile': self.percentile,
+                'by_hour': self.by_hour, 'min_group_size': self.min_group_size}
+
+    def describe(self):
+        """Short description of the threshold rule"""
+        rule = f"median + {self.k:g}·MAD" if self.method == 'mad' else f"{self.percentile:g}th percentile"
+        return f"{rule} per process/syscall{' and hour' if self.by_hour else ''}"
+
+    def _load_cache(self):
+        if self.cache_file and os.path.exists(self.cache_file):
+            try:
+                with open(self.cache_file, 'rb') as f:
+                    return pickle.load(f)
+            except (OSError, pickle.UnpicklingError, EOFError) as e:
+                print(f"⚠️  Ignoring unreadable threshold cache: {e}")
+        return {}
+
+    def _save_cache(self, cache):
+        if self.cache_file:
+            while len(cache) > self.max_cache_entries:
+                cache.pop(next(iter(cache)))
+            with open(self.cache_file, 'wb') as f:
+                pickle.dump(cache, f)
+
+    def _group_thresholds(self, groups, durations):
+        """(group ids, counts, medians, MADs, thresholds) for every non-empty group"""
+        order = np.lexsort((durations, groups))
+        groups, durations = groups[order], durations[order]
+        group_ids, starts, counts = np.unique(groups, return_index=True, return_counts=True)
+        medians = sorted_quantiles(durations, starts, counts, 0.5)
+
+        if self.method == 'percentile':
+            mads = np.full(len(group_ids), np.nan)
+            thresholds = sorted_quantiles(durations, starts, counts, self.percentile / 100)
+        else:
+            dense = np.repeat(np.arange(len(group_ids)), counts)
+            deviations = np.abs(durations - medians[dense])
+            deviations = deviations[np.lexsort((deviations, dense))]
+            mads = sorted_quantiles(deviations, starts, counts, 0.5) * MAD_SCALE
+            thresholds = medians + self.k * mads
+        return group_ids, counts, medians, mads, thresholds
+
+    def fit(self, df):
+        """Compute (or load cached) thresholds for an event frame; returns self"""
+        cache = self._load_cache() if self.cache_file else {}
+        key = fingerprint((dataset_fingerprint(df), sorted(self.params.items())))
+        if key in cache:
+            self.thresholds, self.hourly_thresholds, self.global_threshold = cache[key]
+            print(f"♻️  Loaded cached thresholds ({self.describe()})")
+            return self
+
+        durations = df['duration_ms'].to_numpy(dtype=np.float64)
+        resource_codes, resources = pd.factorize(df['resource'], sort=True)
+        activity_codes, activities = pd.factorize(df['activity'], sort=True)
+        pairs = resource_codes.astype(np.int64) * len(activities) + activity_codes
+
+        self.global_threshold = float(np.percentile(durations, self.percentile)) if self.method == 'percentile' \
+            else float(self._group_thresholds(np.zeros(len(df), dtype=np.int64), durations)[4][0])
+
+        pair_ids, counts, medians, mads, thresholds = self._group_thresholds(pairs, durations)
+        small = counts < self.min_group_size
+        self.thresholds = pd.DataFrame({
+            'resource': np.asarray(resources)[pair_ids // len(activities)],
+            'activity': np.asarray(activities)[pair_ids % len(activities)],
+            'count': counts,
+            'median': medians,
+            'mad': mads,
+            'threshold': np.where(small, self.global_threshold, thresholds),
+            'level': np.where(small, 'global', 'pair')
+        }).set_index(['resource', 'activity'])
+
+        self.hourly_thresholds = None
+        if self.by_hour:
+            timestamps = df['timestamp'].values.astype('datetime64[ns]').astype(np.int64)
+            hours = timestamps // (3600 * 10**9) % 24
+            hour_ids, counts, medians, mads, thresholds = self._group_thresholds(pairs * 24 + hours, durations)
+            pair_positions = np.searchsorted(pair_ids, hour_ids // 24)
+            small = counts < self.min_group_size
+            self.hourly_thresholds = pd.DataFrame({
+                'resource': np.asarray(resources)[hour_ids // 24 // len(activities)],
+                'activity': np.asarray(activities)[hour_ids // 24 % len(activities)],
+                'hour': hour_ids % 24,
+                'count': counts,
+                'median': medians,
+                'mad': mads,
+                'threshold': np.where(small, self.thresholds['threshold'].to_numpy()[pair_positions], thresholds),
+                'level': np.where(small, self.thresholds['level'].to_numpy()[pair_positions], 'hour')
+            }).set_index(['resource', 'activity', 'hour'])
+
+        cache[key] = (self.thresholds, self.hourly_thresholds, self.global_threshold)
+        self._save_cache(cache)
+        print(f"✅ Thresholds fitted for {len(self.thresholds):,} process/syscall pairs ({self.describe()})")
+        return self
+
+    def thresholds_for(self, df):
+        """Per-event threshold array for df (unknown contexts get the global threshold)"""
+        if self.thresholds is None:
+            raise ValueError("Threshold model not fitted. Call fit() first.")
+        values = np.full(len(df), self.global_threshold)
+        positions = self.thresholds.index.get_indexer(pd.MultiIndex.from_arrays([df['resource'], df['activity']]))
+        found = positions >= 0
+        values[found] = self.thresholds['threshold'].to_numpy()[positions[found]]
+
+        if self.hourly_thresholds is not None:
+            timestamps = df['timestamp'].values.astype('datetime64[ns]').astype(np.int64)
+            hours = timestamps // (3600 * 10**9) % 24
+            positions = self.hourly_thresholds.index.get_indexer(
+                pd.MultiIndex.from_arrays([df['resource'], df['activity'], hours]))
+            found = positions >= 0
+            values[found] = self.hourly_thresholds['threshold'].to_numpy()[positions[found]]
+        return values
+
+    def flag(self, df):
+        """Boolean mask of events slower than their context's threshold"""
+        return df['duration_ms'].to_numpy(dtype=np.float64) > self.thresholds_for(df)
@@ -0,0 +1,205 @@
+import os
+import re
+import json
+import hashlib
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+
+def fingerprint(obj):
+    """Stable SHA-256 fingerprint of nested plot data (frames, arrays, dicts, scalars)"""
+    digest = hashlib.sha256()
+    _update_digest(digest, obj)
+    return digest.hexdigest()
+
+
+def _update_digest(digest, obj):
+    if isinstance(obj, pd.DataFrame):
+        digest.update(b'DF')
+        digest.update(repr(list(obj.columns)).encode())
+        digest.update(repr([str(t) for t in obj.dtypes]).encode())
+        digest.update(pd.util.hash_pandas_object(obj, index=True).values.tobytes())
+    elif isinstance(obj, pd.Series):
+        digest.update(b'SR')
+        digest.update(repr(obj.name).encode())
+        digest.update(str(obj.dtype).encode())
+        digest.update(pd.util.hash_pandas_object(obj, index=True).values.tobytes())
+    elif isinstance(obj, np.ndarray):
+        digest.update(b'NP')
+        digest.update(str(obj.dtype).encode())
+        digest.update(repr(obj.shape).encode())
+        digest.update(np.ascontiguousarray(obj).tobytes())
+    elif isinstance(obj, dict):
+        digest.update(b'DI')
+        for key in sorted(obj, key=repr):
+            _update_digest(digest, key)
+            _update_digest(digest, obj[key])
+    elif isinstance(obj, (list, tuple)):
+        digest.update(b'LI' if isinstance(obj, list) else b'TU')
+        digest.update(str(len(obj)).encode())
+        for item in obj:
+            _update_digest(digest, item)
+    elif callable(obj) and hasattr(obj, '__code__'):
+        # Include the drawing code so edited chart functions re-render
+        digest.update(f"{obj.__module__}.{obj.__qualname__}".encode())
+        _update_code_digest(digest, obj.__code__)
+    else:
+        digest.update(type(obj).__name__.encode())
+        digest.update(repr(obj).encode())
+
+
+def _update_code_digest(digest, code):
+    digest.update(code.co_code)
+    # Called helpers and attributes are referenced by name index, so the names matter too
+    digest.update(repr(code.co_names).encode())
+    for const in code.co_consts:
+        # Nested code objects (comprehensions, lambdas) repr with their address
+        if hasattr(const, 'co_code'):
+            _update_code_digest(digest, const)
+        else:
+            digest.update(repr(const).encode())
+
+
+def atomic_write(path, write):
+    """Call write(temp path) and move the result into place, so a failed write leaves no partial file"""
+    base, extension = os.path.splitext(path)
+    temp_path = f"{base}.tmp{extension}"
+    try:
+        write(temp_path)
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+_DOT_NODE = re.compile(r'^\s*("[^"]*"|\w+) \[(.*)\]$')
+_DOT_EDGE = re.compile(r'^\s*("[^"]*"|\w+) -> ("[^"]*"|\w+)(?: \[(.*)\])?$')
+
+
+def _short_hash(text):
+    return hashlib.sha256(text.encode()).hexdigest()[:16]
+
+
+def canonical_graph(node_attrs, edges):
+    """
+    Sorted, id-independent lines describing a labelled directed graph
+
+    Nodes get deterministic ids by colour refinement: a node starts from a
+    hash of its attributes (its label) and is repeatedly re-hashed with the
+    sorted ids of its predecessors and successors, until the partition into
+    ids stops splitting. Unlabelled nodes (places, hidden transitions) are
+    thereby told apart by where they sit in the graph.
+
+    Parameters:
+    - node_attrs: {node: attribute string}; nodes may be any hashable object
+    - edges: (source node, target node, attribute string) triples
+    """
+    node_attrs = dict(node_attrs)
+    for source_node, target_node, _ in edges:
+        node_attrs.setdefault(source_node, '')
+        node_attrs.setdefault(target_node, '')
+
+    ids = {node: _short_hash(attrs) for node, attrs in node_attrs.items()}
+    for _ in range(len(ids)):
+        outgoing = {node: [] for node in ids}
+        incoming = {node: [] for node in ids}
+        for source_node, target_node, attrs in edges:
+            outgoing[source_node].append(f"{attrs}>{ids[target_node]}")
+            incoming[target_node].append(f"{attrs}<{ids[source_node]}")
+        refined = {node: _short_hash('|'.join([ids[node], *sorted(outgoing[node]), '', *sorted(incoming[node])]))
+                   for node in ids}
+        stable = len(set(refined.values())) == len(set(ids.values()))
+        ids = refined
+        if stable:
+            break
+
+    canonical = [f"{ids[node]} [{attrs}]" for node, attrs in node_attrs.items()]
+    canonical += [f"{ids[source_node]} -> {ids[target_node]} [{attrs}]" for source_node, target_node, attrs in edges]
+    return sorted(canonical)
+
+
+def canonical_dot_source(source):
+    """
+    Reduce a dot source to a layout-independent form for fingerprinting
+
+    pm4py names graphviz nodes after Python object ids and emits them in set
+    order, so the same model produces a different source on every run. The
+    nodes and edges are rewritten with structural ids (see canonical_graph)
+    and all lines sorted.
+    """
+    node_attrs, edges, other = {}, [], []
+    for line in source.splitlines():
+        edge = _DOT_EDGE.match(line)
+        node = _DOT_NODE.match(line)
+        if edge:
+            edges.append((edge.group(1), edge.group(2), edge.group(3) or ''))
+        elif node:
+            node_attrs[node.group(1)] = node.group(2)
+        elif line.lstrip().startswith(('digraph', 'graph ')) and line.rstrip().endswith('{'):
+            other.append(line.split(' ', 1)[0])
+        else:
+            other.append(line.strip())
+    return '\n'.join(sorted(canonical_graph(node_attrs, edges) + other))
+
+
+class ArtifactCache:
+    def __init__(self, manifest_file="render_manifest.json"):
+        """
+        Track the fingerprint of every rendered artifact so unchanged charts are reused
+
+        Parameters:
+        - manifest_file: JSON manifest with the artifact fingerprints and the last run's reuse record
+        """
+        self.manifest_file = manifest_file
+        self.artifacts = {}
+        self.run_log = []
+        self._load()
+
+    def _load(self):
+        if os.path.exists(self.manifest_file):
+            try:
+                with open(self.manifest_file) as f:
+                    self.artifacts = json.load(f).get('artifacts', {})
+            except (OSError, ValueError) as e:
+                print(f"⚠️  Ignoring unreadable render manifest: {e}")
+                self.artifacts = {}
+
+    def _key(self, output_path):
+        return os.path.abspath(output_path)
+
+    def is_fresh(self, output_path, fp):
+        """True if output_path exists and was rendered from data with this fingerprint"""
+        entry = self.artifacts.get(self._key(output_path))
+        return entry is not None and entry['fingerprint'] == fp and os.path.exists(output_path)
+
+    def mark_reused(self, output_path, fp):
+        self.run_log.append({'output': output_path, 'fingerprint': fp, 'status': 'reused'})
+
+    def mark_rendered(self, output_path, fp):
+        self.artifacts[self._key(output_path)] = {
+            'fingerprint': fp,
+            'rendered_at': datetime.now().isoformat(timespec='seconds')
+        }
+        self.run_log.append({'output': output_path, 'fingerprint': fp, 'status': 'rendered'})
+
+    def mark_failed(self, output_path, fp):
+        self.artifacts.pop(self._key(output_path), None)
+        self.run_log.append({'output': output_path, 'fingerprint': fp, 'status': 'failed'})
+
+    def save(self):
+        """Write the manifest, including what this run reused or rendered"""
+        manifest = {
+            'updated': datetime.now().isoformat(timespec='seconds'),
+            'artifacts': self.artifacts,
+            'last_run': {
+                'reused': sum(1 for r in self.run_log if r['status'] == 'reused'),
+                'rendered': sum(1 for r in self.run_log if r['status'] == 'rendered'),
+                'failed': sum(1 for r in self.run_log if r['status'] == 'failed'),
+                'outputs': self.run_log
+            }
+        }
+        with open(self.manifest_file, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        return manifest
@@ -0,0 +1,180 @@
+import os
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from event_schema import read_event_log
+from baseline_engine import compute_baselines
+from time_rollups import RollupCube
+from baseline_store import BaselineStore
+
+
+def bootstrap_from_sketch(sketch, n_bootstrap=1000, quantiles=(0.95, 0.99), rng=None):
+    """
+    Bootstrap distributions of the mean and quantiles, resampled from a sketch
+
+    Uses the Poisson bootstrap over the sketch buckets: every bucket count is
+    redrawn as Poisson(count) for all resamples in one array, so the cost
+    depends on the number of buckets and resamples, not on the event count.
+
+    Returns (means, {q: values}) with one entry per resample.
+    """
+    rng = rng or np.random.default_rng()
+    lower, upper, counts = sketch.histogram()
+    values = np.concatenate([[0.0], (lower + upper) / 2])
+    weights = np.concatenate([[sketch.zero_count], counts]).astype(np.float64)
+    draws = rng.poisson(weights, size=(n_bootstrap, len(weights)))
+    totals = np.maximum(draws.sum(axis=1), 1)
+
+    means = draws @ values / totals
+    cumulative = np.cumsum(draws, axis=1)
+    quantile_values = {
+        q: values[np.argmax(cumulative > (q * (totals - 1))[:, None], axis=1)]
+        for q in quantiles
+    }
+    return means, quantile_values
+
+
+def _bootstrap_p_value(deltas):
+    """Two-sided bootstrap p-value of a delta being different from zero"""
+    return min(1.0, 2 * min((deltas <= 0).mean(), (deltas >= 0).mean()))
+
+
+def compare_target(before, after, n_bootstrap=1000, alpha=0.05, exact_limit=2_000_000, rng=None):
+    """
+    Compare one target's baseline metrics against post-optimisation metrics
+
+    Uses a Mann-Whitney U test on the raw durations when both sides kept
+    them and the samples fit exact_limit, and a sketch bootstrap otherwise
+    (which also gives a confidence interval for the p95 delta).
+    """
+    rng = rng or np.random.default_rng()
+    result = {}
+    for metric in ['mean_duration', 'p95_duration', 'p99_duration', 'total_time_impact', 'total_events']:
+        delta = after[metric] - before[metric]
+        result[f'{metric}_before'] = before[metric]
+        result[f'{metric}_after'] = after[metric]
+        result[f'{metric}_delta'] = delta
+        result[f'{metric}_change_pct'] = delta / before[metric] * 100 if before[metric] else np.nan
+
+    # Normal-approximation interval for the mean delta from the stored moments
+    standard_error = np.sqrt(before['std_duration'] ** 2 / before['total_events'] +
+                             after['std_duration'] ** 2 / after['total_events'])
+    z = stats.norm.ppf(1 - alpha / 2)
+    result['mean_delta_ci'] = (result['mean_duration_delta'] - z * standard_error,
+                               result['mean_duration_delta'] + z * standard_error)
+
+    raw_before, raw_after = before.get('raw_durations'), after.get('raw_durations')
+    if raw_before is not None and raw_after is not None and len(raw_before) + len(raw_after) <= exact_limit:
+        result['test'] = 'mann-whitney'
+        result['p_value'] = stats.mannwhitneyu(raw_before, raw_after, alternative='two-sided').pvalue
+        result['p95_delta_ci'] = (np.nan, np.nan)
+    else:
+        before_means, before_q = bootstrap_from_sketch(before['sketch'], n_bootstrap, (0.95,), rng)
+        after_means, after_q = bootstrap_from_sketch(after['sketch'], n_bootstrap, (0.95,), rng)
+        p95_deltas = after_q[0.95] - before_q[0.95]
+        result['test'] = 'bootstrap'
+        result['p_value'] = _bootstrap_p_value(after_means - before_means)
+        result['p95_delta_ci'] = tuple(np.percentile(p95_deltas, [100 * alpha / 2, 100 * (1 - alpha / 2)]))
+
+    if result['p_value'] < alpha and result['mean_duration_delta'] < 0:
+        result['verdict'] = 'IMPROVEMENT'
+    elif result['p_value'] < alpha and result['mean_duration_delta'] > 0:
+        result['verdict'] = 'REGRESSION'
+    else:
+        result['verdict'] = 'NO SIGNIFICANT CHANGE'
+    return result
+
+
+def compare_baselines(before, after, n_bootstrap=1000, alpha=0.05, seed=None):
+    """Compare every target present in both baselines; returns a DataFrame indexed by (process, activity)"""
+    rng = np.random.default_rng(seed)
+    rows = {}
+    for target in sorted(set(before) & set(after)):
+        rows[target] = compare_target(before[target], after[target], n_bootstrap, alpha, rng=rng)
+    missing = sorted(set(before) - set(after))
+    if missing:
+        print(f"⚠️  {len(missing)} baseline targets have no events in the new log")
+    if not rows:
+        return pd.DataFrame()
+    table = pd.DataFrame.from_dict(rows, orient='index')
+    table.index.names = ['process', 'activity']
+    return table
+
+
+def compare_to_baseline(csv_file, version=None, store=None, n_bootstrap=1000, alpha=0.05):
+    """Compare a new log against a stored baseline version (default: the newest)"""
+    store = store or BaselineStore()
+    stored = store.load(version)
+    print(f"\n=== Comparing {csv_file} against baseline {stored.meta['version']} ===")
+    before = stored.to_baselines()
+    df = read_event_log(csv_file)
+    after = compute_baselines(df, stored.targets, RollupCube(df))
+    comparison = compare_baselines(before, after, n_bootstrap, alpha)
+
+    changed = comparison[comparison['verdict'] != 'NO SIGNIFICANT CHANGE'] if len(comparison) else comparison
+    for (process, activity), row in changed.iterrows():
+        print(f"{process} - {activity}: {row['verdict']} "
+              f"(mean {row['mean_duration_change_pct']:+.1f}%, p95 {row['p95_duration_change_pct']:+.1f}%, "
+              f"p={row['p_value']:.3g})")
+    print(f"✅ Compared {len(comparison)} targets: {len(changed)} significant changes")
+    return comparison
+
+
+def generate_comparison_report(comparison, output_file="baseline_analysis/comparison_report.txt", alpha=0.05):
+    """Write the regression/improvement report"""
+    os.makedirs(os.path.dirname(output_file) or '.', exist_ok=True)
+    with open(output_file, 'w') as f:
+        f.write("BEFORE/AFTER OPTIMISATION COMPARISON REPORT\n")
+        f.write("=" * 45 + "\n\n")
+
+        counts = comparison['verdict'].value_counts() if len(comparison) else pd.Series(dtype=int)
+        f.write(f"• Targets compared: {len(comparison)}\n")
+        f.write(f"• Improvements: {counts.get('IMPROVEMENT', 0)}\n")
+        f.write(f"• Regressions: {counts.get('REGRESSION', 0)}\n")
+        f.write(f"• No significant change: {counts.get('NO SIGNIFICANT CHANGE', 0)}\n")
+        f.write(f"• Significance level: {alpha}\n\n")
+
+        for verdict in ['REGRESSION', 'IMPROVEMENT', 'NO SIGNIFICANT CHANGE']:
+            section = comparison[comparison['verdict'] == verdict] if len(comparison) else comparison
+            if len(section) == 0:
+                continue
+            f.write(f"{verdict}S:\n" if verdict != 'NO SIGNIFICANT CHANGE' else "NO SIGNIFICANT CHANGE:\n")
+            f.write("-" * 40 + "\n")
+            for (process, activity), row in section.sort_values('total_time_impact_delta').iterrows():
+                f.write(f"{process} - {activity}\n")
+                f.write(f"  • Mean: {row['mean_duration_before']:.1f}ms → {row['mean_duration_after']:.1f}ms "
+                        f"({row['mean_duration_change_pct']:+.1f}%, {100 * (1 - alpha):g}% CI {row['mean_delta_ci'][0]:+.1f} to {row['mean_delta_ci'][1]:+.1f}ms)\n")
+                f.write(f"  • P95: {row['p95_duration_before']:.1f}ms → {row['p95_duration_after']:.1f}ms "
+                        f"({row['p95_duration_change_pct']:+.1f}%)\n")
+                f.write(f"  • P99: {row['p99_duration_before']:.1f}ms → {row['p99_duration_after']:.1f}ms "
+                        f"({row['p99_duration_change_pct']:+.1f}%)\n")
+                f.write(f"  • Total Time Impact: {row['total_time_impact_before']/1000:.1f}s → "
+                        f"{row['total_time_impact_after']/1000:.1f}s ({row['total_time_impact_delta']/1000:+.1f}s)\n")
+                f.write(f"  • Test: {row['test']} (p = {row['p_value']:.3g})\n\n")
+
+    print(f"✅ Comparison report saved to {output_file}")
+    return output_file
+
+
+def main():
+    """Compare a post-optimisation log against a saved baseline"""
+    store = BaselineStore()
+    for meta in store.versions():
+        print(f"  {meta['version']}: {meta['source']} ({meta['targets']} targets, {meta['events']:,} events)")
+    version = input("Enter baseline version (or press Enter for latest): ").strip() or None
+    csv_file = input("Enter post-optimisation CSV file name: ").strip()
+
+    try:
+        comparison = compare_to_baseline(csv_file, version, store)
+        generate_comparison_report(comparison)
+        return comparison
+
+    except FileNotFoundError as e:
+        print(f"❌ File not found: {e}")
+    except Exception as e:
+        print(f"❌ Error: {e}")
+
+if __name__ == "__main__":
+    main()
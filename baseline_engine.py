@@ -0,0 +1,143 @@
+import numpy as np
+import pandas as pd
+
+from event_index import sketches_by_group
+from time_rollups import RollupCube
+
+
+QUANTILES = {'p25_duration': 0.25, 'median_duration': 0.5, 'p75_duration': 0.75,
+             'p95_duration': 0.95, 'p99_duration': 0.99}
+
+
+def classify_distribution(skewness):
+    """Describe a duration distribution by its skewness"""
+    if abs(skewness) < 0.5:
+        return "Normal-like"
+    elif skewness > 1:
+        return "Right-skewed (many short, few long operations)"
+    elif skewness < -1:
+        return "Left-skewed (many long, few short operations)"
+    else:
+        return "Moderately skewed"
+
+
+def sorted_quantiles(sorted_values, starts, counts, q):
+    """Linear-interpolated quantile of every group of a group-sorted array (pandas' method)"""
+    position = q * (counts - 1)
+    lower = np.floor(position).astype(np.int64)
+    upper = np.minimum(lower + 1, counts - 1)
+    fraction = position - lower
+    return sorted_values[starts + lower] * (1 - fraction) + sorted_values[starts + upper] * fraction
+
+
+def compute_baselines(df, targets=None, rollups=None, relative_accuracy=0.01):
+    """
+    Baseline metrics for many (resource, activity) targets in one grouped pass
+
+    Events are grouped by an integer (resource, activity) code and sorted once
+    by (group, duration); counts, moments, exact quantiles, IQR outliers and
+    affected cases are then array operations over all groups at once.
+
+    Parameters:
+    - targets: List of (resource, activity) pairs, or None for every combination
+    - rollups: RollupCube over df for the temporal metrics (built if omitted)
+
+    Returns {(resource, activity): metrics} for targets with data. Raw
+    durations are kept as a sorted float32 array next to a DurationSketch.
+    """
+    rollups = rollups or RollupCube(df)
+    resource_codes, resources = pd.factorize(df['resource'], sort=True)
+    activity_codes, activities = pd.factorize(df['activity'], sort=True)
+    case_codes, _ = pd.factorize(df['case_id'])
+    durations = df['duration_ms'].to_numpy(dtype=np.float64)
+
+    n_activities = len(activities)
+    groups = resource_codes.astype(np.int64) * n_activities + activity_codes
+
+    # Restrict to the requested targets
+    if targets is not None:
+        resource_index = {r: i for i, r in enumerate(resources)}
+        activity_index = {a: i for i, a in enumerate(activities)}
+        wanted = np.array([resource_index[r] * n_activities + activity_index[a]
+                           for r, a in targets if r in resource_index and a in activity_index], dtype=np.int64)
+        keep = np.isin(groups, wanted)
+        groups, durations, case_codes = groups[keep], durations[keep], case_codes[keep]
+
+    # One sort by (group, duration)
+    order = np.lexsort((durations, groups))
+    groups, sorted_durations, case_codes = groups[order], durations[order], case_codes[order]
+    group_ids, starts, counts = np.unique(groups, return_index=True, return_counts=True)
+    if len(group_ids) == 0:
+        return {}
+    dense = np.repeat(np.arange(len(group_ids)), counts)
+
+    # Moments
+    sums = np.bincount(dense, weights=sorted_durations)
+    means = sums / counts
+    centered = sorted_durations - means[dense]
+    m2 = np.bincount(dense, weights=centered ** 2) / counts
+    m3 = np.bincount(dense, weights=centered ** 3) / counts
+    m4 = np.bincount(dense, weights=centered ** 4) / counts
+    with np.errstate(divide='ignore', invalid='ignore'):
+        std = np.sqrt(m2 * counts / (counts - 1))
+        skewness = np.where(m2 > 0, m3 / m2 ** 1.5, np.nan)
+        kurtosis = np.where(m2 > 0, m4 / m2 ** 2 - 3, np.nan)
+
+    quantiles = {name: sorted_quantiles(sorted_durations, starts, counts, q) for name, q in QUANTILES.items()}
+
+    # IQR outliers
+    iqr = quantiles['p75_duration'] - quantiles['p25_duration']
+    lower_bound = quantiles['p25_duration'] - 1.5 * iqr
+    upper_bound = quantiles['p75_duration'] + 1.5 * iqr
+    is_outlier = (sorted_durations < lower_bound[dense]) | (sorted_durations > upper_bound[dense])
+    outliers = np.bincount(dense, weights=is_outlier, minlength=len(group_ids)).astype(np.int64)
+
+    # Distinct cases per group
+    n_cases = int(case_codes.max()) + 1
+    case_pairs = np.sort(dense.astype(np.int64) * n_cases + case_codes)
+    case_pairs = case_pairs[np.r_[True, case_pairs[1:] != case_pairs[:-1]]]
+    affected = np.bincount(case_pairs // n_cases, minlength=len(group_ids))
+
+    sketches = sketches_by_group(dense, sorted_durations, len(group_ids), relative_accuracy)
+    raw = sorted_durations.astype(np.float32)
+
+    baselines = {}
+    for i, group in enumerate(group_ids):
+        resource, activity = resources[group // n_activities], activities[group % n_activities]
+        peak_hour, peak_count = rollups.peak_hour(resource, activity)
+        baselines[(resource, activity)] = {
+            # Basic Statistics
+            'total_events': int(counts[i]),
+            'mean_duration': means[i],
+            'median_duration': quantiles['median_duration'][i],
+            'std_duration': std[i],
+            'min_duration': sorted_durations[starts[i]],
+            'max_duration': sorted_durations[starts[i] + counts[i] - 1],
+
+            # Percentiles
+            'p95_duration': quantiles['p95_duration'][i],
+            'p99_duration': quantiles['p99_duration'][i],
+            'p75_duration': quantiles['p75_duration'][i],
+            'p25_duration': quantiles['p25_duration'][i],
+
+            # Impact Metrics
+            'total_time_impact': sums[i],
+            'avg_events_per_case': counts[i] / affected[i],
+            'affected_cases': int(affected[i]),
+
+            # Temporal Analysis
+            'events_per_hour': rollups.events_per_hour(resource, activity),
+            'peak_hour_events': {'peak_hour': peak_hour, 'peak_count': peak_count},
+
+            # Distribution Analysis
+            'skewness': skewness[i],
+            'kurtosis': kurtosis[i],
+            'distribution_type': classify_distribution(skewness[i]),
+            'outlier_count': int(outliers[i]),
+            'coefficient_of_variation': std[i] / means[i],
+
+            # Raw data for detailed analysis (sorted, compact)
+            'raw_durations': raw[starts[i]:starts[i] + counts[i]],
+            'sketch': sketches[i]
+        }
+    return baselines
@@ -1,82 +1,66 @@
-import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
 from datetime import datetime
 import os
-from scipy import stats
+from render_queue import RenderQueue
+from event_schema import read_event_log
+from time_rollups import RollupCube
+from baseline_engine import compute_baselines
+from baseline_comparison import compare_baselines
+from baseline_store import BaselineStore, dataset_fingerprint
 
 class BaselinePerformanceMeasurement:
-    def __init__(self):
+    def __init__(self, render_queue=None):
         self.raw_data = None
+        self.source = None
+        self.rollups = None
+        self.render_queue = render_queue or RenderQueue()
         self.target_bottlenecks = [
             ('guardian.exe', 'ReadFile'),
             ('explorer.exe', 'RegQueryValue'), 
             ('notepad.exe', 'ReadFile')
         ]
         self.baseline_metrics = {}
+        self.baseline_targets = {}
         
     def load_data(self, csv_file):
         """Load the system call data"""
         print(f"Loading data from {csv_file}...")
-        self.raw_data = pd.read_csv(csv_file)
-        self.raw_data['timestamp'] = pd.to_datetime(self.raw_data['timestamp'])
+        self.raw_data = read_event_log(csv_file)
+        self.source = csv_file
+        self.rollups = RollupCube(self.raw_data)
         print(f"✅ Loaded {len(self.raw_data):,} events")
         
-    def establish_baselines(self):
-        """Establish comprehensive baseline metrics for target bottlenecks"""
+    def establish_baselines(self, targets=None):
+        """
+        Establish comprehensive baseline metrics for target bottlenecks
+        
+        Parameters:
+        - targets: (process, activity) pairs; None = target_bottlenecks, 'all' = every combination
+        """
         print("\n📊 Establishing baseline performance metrics...")
         
-        for process, activity in self.target_bottlenecks:
-            print(f"\n🔍 Analyzing {process} - {activity}...")
-            
-            # Filter data for this specific bottleneck
-            bottleneck_data = self.raw_data[
-                (self.raw_data['resource'] == process) & 
-                (self.raw_data['activity'] == activity)
-            ].copy()
-            
-            if len(bottleneck_data) == 0:
+        if targets is None:
+            targets = self.target_bottlenecks
+        baselines = compute_baselines(self.raw_data, None if targets == 'all' else targets, self.rollups)
+        if targets == 'all':
+            targets = sorted(baselines)
+        
+        for process, activity in targets:
+            baseline = baselines.get((process, activity))
+            if baseline is None:
                 print(f"⚠️  No data found for {process} - {activity}")
                 continue
             
-            # Calculate comprehensive baseline metrics
-            baseline = {
-                # Basic Statistics
-                'total_events': len(bottleneck_data),
-                'mean_duration': bottleneck_data['duration_ms'].mean(),
-                'median_duration': bottleneck_data['duration_ms'].median(),
-                'std_duration': bottleneck_data['duration_ms'].std(),
-                'min_duration': bottleneck_data['duration_ms'].min(),
-                'max_duration': bottleneck_data['duration_ms'].max(),
-                
-                # Percentiles
-                'p95_duration': bottleneck_data['duration_ms'].quantile(0.95),
-                'p99_duration': bottleneck_data['duration_ms'].quantile(0.99),
-                'p75_duration': bottleneck_data['duration_ms'].quantile(0.75),
-                'p25_duration': bottleneck_data['duration_ms'].quantile(0.25),
-                
-                # Impact Metrics
-                'total_time_impact': bottleneck_data['duration_ms'].sum(),
-                'avg_events_per_case': len(bottleneck_data) / bottleneck_data['case_id'].nunique(),
-                'affected_cases': bottleneck_data['case_id'].nunique(),
-                
-                # Temporal Analysis
-                'events_per_hour': len(bottleneck_data) / 24,  # Assuming 24-hour dataset
-                'peak_hour_events': self._get_peak_hour_stats(bottleneck_data),
-                
-                # Distribution Analysis
-                'distribution_type': self._analyze_distribution(bottleneck_data['duration_ms']),
-                'outlier_count': self._count_outliers(bottleneck_data['duration_ms']),
-                'coefficient_of_variation': bottleneck_data['duration_ms'].std() / bottleneck_data['duration_ms'].mean(),
-                
-                # Raw data for detailed analysis
-                'raw_durations': bottleneck_data['duration_ms'].tolist()
-            }
-            
             self.baseline_metrics[f"{process}_{activity}"] = baseline
+            self.baseline_targets[f"{process}_{activity}"] = (process, activity)
+            
+            if len(targets) > 10:
+                continue
             
             # Display summary
+            print(f"\n🔍 {process} - {activity}")
             print(f"   📈 Total Events: {baseline['total_events']:,}")
             print(f"   ⏱️  Mean Duration: {baseline['mean_duration']:.1f}ms")
             print(f"   📊 95th Percentile: {baseline['p95_duration']:.1f}ms")
@@ -85,122 +69,28 @@ class BaselinePerformanceMeasurement:
         
         print(f"\n✅ Baseline metrics established for {len(self.baseline_metrics)} bottlenecks")
         
-    def _get_peak_hour_stats(self, data):
-        """Get peak hour statistics"""
-        data['hour'] = data['timestamp'].dt.hour
-        hourly_counts = data.groupby('hour').size()
-        peak_hour = hourly_counts.idxmax()
-        peak_count = hourly_counts.max()
-        return {'peak_hour': peak_hour, 'peak_count': peak_count}
-        
-    def _analyze_distribution(self, durations):
-        """Analyze the distribution type of durations"""
-        # Simple distribution analysis
-        skewness = stats.skew(durations)
-        kurtosis = stats.kurtosis(durations)
-        
-        if abs(skewness) < 0.5:
-            return "Normal-like"
-        elif skewness > 1:
-            return "Right-skewed (many short, few long operations)"
-        elif skewness < -1:
-            return "Left-skewed (many long, few short operations)"
-        else:
-            return "Moderately skewed"
-            
-    def _count_outliers(self, durations):
-        """Count outliers using IQR method"""
-        q1 = durations.quantile(0.25)
-        q3 = durations.quantile(0.75)
-        iqr = q3 - q1
-        lower_bound = q1 - 1.5 * iqr
-        upper_bound = q3 + 1.5 * iqr
-        
-        outliers = durations[(durations < lower_bound) | (durations > upper_bound)]
-        return len(outliers)
-        
     def create_baseline_visualizations(self, output_dir="baseline_analysis"):
         """Create ONE comprehensive baseline visualization"""
         os.makedirs(output_dir, exist_ok=True)
         print(f"\n🎨 Creating single comprehensive baseline chart...")
         
-        # Set style
-        plt.style.use('default')
-        sns.set_palette("husl")
-        
-        # Create ONE comprehensive figure
-        fig = plt.figure(figsize=(16, 10))
-        fig.suptitle('Baseline Performance Analysis - Target Bottlenecks', fontsize=18, fontweight='bold')
-        
-        # Create grid layout
-        gs = fig.add_gridspec(2, 3, height_ratios=[2, 1], hspace=0.3, wspace=0.3)
-        
         # Extract data for all visualizations
         bottleneck_names = []
         mean_durations = []
-        p95_durations = []
         total_impacts = []
         event_counts = []
-        all_distributions = []
-        
-        # Use different shades of blue instead of red/orange/green
-        colors = ['#1f4e79', '#4a90e2', '#87ceeb']  # Dark blue, Medium blue, Light blue
+        table_data = []
         
         for key, metrics in self.baseline_metrics.items():
             name = key.replace('_', '\n').replace('.exe', '')
             bottleneck_names.append(name)
             mean_durations.append(metrics['mean_duration'])
-            p95_durations.append(metrics['p95_duration'])
             total_impacts.append(metrics['total_time_impact'] / 1000)  # Convert to seconds
             event_counts.append(metrics['total_events'])
-            all_distributions.append(metrics['raw_durations'])
-        
-        # 1. Mean Duration Comparison (Top Left)
-        ax1 = fig.add_subplot(gs[0, 0])
-        bars1 = ax1.bar(bottleneck_names, mean_durations, color=colors, alpha=0.8, edgecolor='navy')
-        ax1.set_ylabel('Mean Duration (ms)', fontsize=12, fontweight='bold')
-        ax1.set_title('Current Performance\n(Lower is Better)', fontsize=12, fontweight='bold')
-        
-        # Add value labels on bars
-        for bar, value in zip(bars1, mean_durations):
-            ax1.text(bar.get_x() + bar.get_width()/2, bar.get_height() + bar.get_height()*0.02,
-                    f'{value:.0f}ms', ha='center', va='bottom', fontweight='bold', fontsize=10)
-        
-        ax1.grid(True, alpha=0.3, axis='y')
-        
-        # 2. Total Impact Comparison (Top Middle)
-        ax2 = fig.add_subplot(gs[0, 1])
-        bars2 = ax2.bar(bottleneck_names, total_impacts, color=colors, alpha=0.8, edgecolor='navy')
-        ax2.set_ylabel('Total Time Impact (seconds)', fontsize=12, fontweight='bold')
-        ax2.set_title('System Impact\n(Lower is Better)', fontsize=12, fontweight='bold')
-        
-        for bar, value in zip(bars2, total_impacts):
-            ax2.text(bar.get_x() + bar.get_width()/2, bar.get_height() + bar.get_height()*0.02,
-                    f'{value:.1f}s', ha='center', va='bottom', fontweight='bold', fontsize=10)
-        
-        ax2.grid(True, alpha=0.3, axis='y')
-        
-        # 3. Event Frequency (Top Right)
-        ax3 = fig.add_subplot(gs[0, 2])
-        bars3 = ax3.bar(bottleneck_names, event_counts, color=colors, alpha=0.8, edgecolor='navy')
-        ax3.set_ylabel('Event Count', fontsize=12, fontweight='bold')
-        ax3.set_title('Frequency\n(Higher = More Critical)', fontsize=12, fontweight='bold')
-        
-        for bar, value in zip(bars3, event_counts):
-            ax3.text(bar.get_x() + bar.get_width()/2, bar.get_height() + bar.get_height()*0.02,
-                    f'{value:,}', ha='center', va='bottom', fontweight='bold', fontsize=9)
-        
-        ax3.grid(True, alpha=0.3, axis='y')
-        
-        # 4. Summary Statistics Table (Bottom - spans all columns)
-        ax4 = fig.add_subplot(gs[1, :])
-        
-        # Create summary table
-        table_data = []
-        for i, (key, metrics) in enumerate(self.baseline_metrics.items()):
-            name = key.replace('_', ' → ').replace('.exe', '')
+            
+            table_name = key.replace('_', ' → ').replace('.exe', '')
             table_data.append([
-                name,
+                table_name,
                 f"{metrics['total_events']:,}",
                 f"{metrics['mean_duration']:.0f}ms",
                 f"{metrics['median_duration']:.0f}ms",
@@ -210,41 +100,19 @@ class BaselinePerformanceMeasurement:
                 "🔴 HIGH" if metrics['mean_duration'] > 1500 else "🟠 MEDIUM" if metrics['mean_duration'] > 800 else "🟢 MANAGEABLE"
             ])
         
-        headers = ['Bottleneck', 'Events', 'Mean', 'Median', '95th %', 'Total Impact', 'Variability', 'Priority']
-        
-        table = ax4.table(cellText=table_data, colLabels=headers,
-                         cellLoc='center', loc='center')
-        table.auto_set_font_size(False)
-        table.set_fontsize(11)
-        table.scale(1, 2.5)
-        
-        # Color code the table with blue tones
-        for i in range(len(table_data)):
-            for j in range(len(headers)):
-                if j == 0:  # Name column
-                    table[(i+1, j)].set_facecolor('lightblue')
-                elif j == 7:  # Priority column
-                    if '🔴' in table_data[i][j]:
-                        table[(i+1, j)].set_facecolor('lightcoral')
-                    elif '🟠' in table_data[i][j]:
-                        table[(i+1, j)].set_facecolor('lightyellow') 
-                    else:
-                        table[(i+1, j)].set_facecolor('lightgreen')
-                elif j in [2, 5]:  # Mean and Total Impact - performance indicators
-                    # Use transparent blue colors for these cells
-                    blue_alpha = colors[i] + '40'  # Add transparency
-                    table[(i+1, j)].set_facecolor(blue_alpha)
-        
-        ax4.set_xlim(0, 1)
-        ax4.set_ylim(0, 1)
-        ax4.axis('off')
-        ax4.set_title('Baseline Performance Summary', fontsize=14, fontweight='bold', pad=20)
+        plot_data = {
+            'bottleneck_names': bottleneck_names,
+            'mean_durations': mean_durations,
+            'total_impacts': total_impacts,
+            'event_counts': event_counts,
+            'table_data': table_data
+        }
         
-        # Save the single comprehensive chart
-        plt.savefig(f'{output_dir}/baseline_analysis.png', dpi=300, bbox_inches='tight')
-        plt.close()
+        # Queue the single comprehensive chart
+        self.render_queue.submit_plot('baseline_analysis', _plot_baseline_analysis, plot_data,
+                                      f'{output_dir}/baseline_analysis')
         
-        print(f"✅ Single baseline chart saved: {output_dir}/baseline_analysis.png")
+        print(f"✅ Single baseline chart queued: {output_dir}/baseline_analysis")
         
     def generate_baseline_report(self, output_dir="baseline_analysis"):
         """Generate comprehensive baseline report"""
@@ -256,7 +124,7 @@ class BaselinePerformanceMeasurement:
             
             f.write("MEASUREMENT METHODOLOGY:\n")
             f.write("-" * 25 + "\n")
-            f.write("• Dataset: 373,828 system call events over 24-hour period\n")
+            f.write(f"• Dataset: {self.rollups.total_events:,} system call events over {self.rollups.span_hours:.1f}-hour period\n")
             f.write("• Target bottlenecks: Top 3 identified via prioritization analysis\n")
             f.write("• Metrics: Comprehensive statistical analysis including percentiles, distribution analysis\n")
             f.write("• Outlier detection: IQR method (1.5 × IQR beyond Q1/Q3)\n\n")
@@ -331,6 +199,20 @@ class BaselinePerformanceMeasurement:
         
         print(f"✅ Baseline report saved to {report_file}")
         
+    def save_baselines(self, store=None):
+        """Persist the established baselines as a new store version for later comparison"""
+        store = store or BaselineStore()
+        baselines = {self.baseline_targets[key]: metrics for key, metrics in self.baseline_metrics.items()}
+        version = store.save(baselines, self.rollups, dataset_fingerprint(self.raw_data), self.source)
+        print(f"✅ Baselines saved as version {version} in {store.root}")
+        return version
+        
+    def compare_with(self, other, n_bootstrap=1000, alpha=0.05):
+        """Compare these baselines (before) with another measurement's baselines (after)"""
+        before = {self.baseline_targets[key]: metrics for key, metrics in self.baseline_metrics.items()}
+        after = {other.baseline_targets[key]: metrics for key, metrics in other.baseline_metrics.items()}
+        return compare_baselines(before, after, n_bootstrap, alpha)
+        
     def get_baseline_summary(self):
         """Get summary of baseline metrics for next phase"""
         summary = {}
@@ -343,6 +225,100 @@ class BaselinePerformanceMeasurement:
             }
         return summary
 
+def _plot_baseline_analysis(data):
+    """Draw the comprehensive baseline chart (runs in a render worker)"""
+    # Set style
+    plt.style.use('default')
+    sns.set_palette("husl")
+    
+    bottleneck_names = data['bottleneck_names']
+    mean_durations = data['mean_durations']
+    total_impacts = data['total_impacts']
+    event_counts = data['event_counts']
+    table_data = data['table_data']
+    
+    # Create ONE comprehensive figure
+    fig = plt.figure(figsize=(16, 10))
+    fig.suptitle('Baseline Performance Analysis - Target Bottlenecks', fontsize=18, fontweight='bold')
+    
+    # Create grid layout
+    gs = fig.add_gridspec(2, 3, height_ratios=[2, 1], hspace=0.3, wspace=0.3)
+    
+    # Use different shades of blue instead of red/orange/green
+    colors = ['#1f4e79', '#4a90e2', '#87ceeb']  # Dark blue, Medium blue, Light blue
+    
+    # 1. Mean Duration Comparison (Top Left)
+    ax1 = fig.add_subplot(gs[0, 0])
+    bars1 = ax1.bar(bottleneck_names, mean_durations, color=colors, alpha=0.8, edgecolor='navy')
+    ax1.set_ylabel('Mean Duration (ms)', fontsize=12, fontweight='bold')
+    ax1.set_title('Current Performance\n(Lower is Better)', fontsize=12, fontweight='bold')
+    
+    # Add value labels on bars
+    for bar, value in zip(bars1, mean_durations):
+        ax1.text(bar.get_x() + bar.get_width()/2, bar.get_height() + bar.get_height()*0.02,
+                f'{value:.0f}ms', ha='center', va='bottom', fontweight='bold', fontsize=10)
+    
+    ax1.grid(True, alpha=0.3, axis='y')
+    
+    # 2. Total Impact Comparison (Top Middle)
+    ax2 = fig.add_subplot(gs[0, 1])
+    bars2 = ax2.bar(bottleneck_names, total_impacts, color=colors, alpha=0.8, edgecolor='navy')
+    ax2.set_ylabel('Total Time Impact (seconds)', fontsize=12, fontweight='bold')
+    ax2.set_title('System Impact\n(Lower is Better)', fontsize=12, fontweight='bold')
+    
+    for bar, value in zip(bars2, total_impacts):
+        ax2.text(bar.get_x() + bar.get_width()/2, bar.get_height() + bar.get_height()*0.02,
+                f'{value:.1f}s', ha='center', va='bottom', fontweight='bold', fontsize=10)
+    
+    ax2.grid(True, alpha=0.3, axis='y')
+    
+    # 3. Event Frequency (Top Right)
+    ax3 = fig.add_subplot(gs[0, 2])
+    bars3 = ax3.bar(bottleneck_names, event_counts, color=colors, alpha=0.8, edgecolor='navy')
+    ax3.set_ylabel('Event Count', fontsize=12, fontweight='bold')
+    ax3.set_title('Frequency\n(Higher = More Critical)', fontsize=12, fontweight='bold')
+    
+    for bar, value in zip(bars3, event_counts):
+        ax3.text(bar.get_x() + bar.get_width()/2, bar.get_height() + bar.get_height()*0.02,
+                f'{value:,}', ha='center', va='bottom', fontweight='bold', fontsize=9)
+    
+    ax3.grid(True, alpha=0.3, axis='y')
+    
+    # 4. Summary Statistics Table (Bottom - spans all columns)
+    ax4 = fig.add_subplot(gs[1, :])
+    
+    headers = ['Bottleneck', 'Events', 'Mean', 'Median', '95th %', 'Total Impact', 'Variability', 'Priority']
+    
+    table = ax4.table(cellText=table_data, colLabels=headers,
+                     cellLoc='center', loc='center')
+    table.auto_set_font_size(False)
+    table.set_fontsize(11)
+    table.scale(1, 2.5)
+    
+    # Color code the table with blue tones
+    for i in range(len(table_data)):
+        for j in range(len(headers)):
+            if j == 0:  # Name column
+                table[(i+1, j)].set_facecolor('lightblue')
+            elif j == 7:  # Priority column
+                if '🔴' in table_data[i][j]:
+                    table[(i+1, j)].set_facecolor('lightcoral')
+                elif '🟠' in table_data[i][j]:
+                    table[(i+1, j)].set_facecolor('lightyellow') 
+                else:
+                    table[(i+1, j)].set_facecolor('lightgreen')
+            elif j in [2, 5]:  # Mean and Total Impact - performance indicators
+                # Use transparent blue colors for these cells
+                blue_alpha = colors[i % len(colors)] + '40'  # Add transparency
+                table[(i+1, j)].set_facecolor(blue_alpha)
+    
+    ax4.set_xlim(0, 1)
+    ax4.set_ylim(0, 1)
+    ax4.axis('off')
+    ax4.set_title('Baseline Performance Summary', fontsize=14, fontweight='bold', pad=20)
+    
+    return fig
+
 def main():
     """Main function for baseline measurement"""
     analyzer = BaselinePerformanceMeasurement()
@@ -367,6 +343,8 @@ def main():
         # Create visualizations and reports
         analyzer.create_baseline_visualizations()
         analyzer.generate_baseline_report()
+        analyzer.save_baselines()
+        analyzer.render_queue.shutdown()
         
         # Display baseline summary
         print("\n🎯 BASELINE SUMMARY:")
@@ -386,6 +364,7 @@ def main():
         print("\n📊 Generated Files:")
         print("• baseline_analysis/baseline_analysis.png (SINGLE comprehensive chart)")
         print("• baseline_analysis/baseline_performance_report.txt")
+        print("• baseline_store/ (versioned baselines, input for baseline_comparison.py)")
         
         print("\n🚀 Ready for Step 4.3: Optimization Strategy Design!")
         
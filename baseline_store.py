@@ -0,0 +1,208 @@
+import os
+import json
+import shutil
+from datetime import datetime
+
+import numpy as np
+
+from artifact_cache import fingerprint, atomic_write
+from baseline_engine import classify_distribution
+from event_index import DurationSketch
+
+
+SCALAR_METRICS = ['total_events', 'mean_duration', 'median_duration', 'std_duration', 'min_duration',
+                  'max_duration', 'p95_duration', 'p99_duration', 'p75_duration', 'p25_duration',
+                  'total_time_impact', 'avg_events_per_case', 'affected_cases', 'events_per_hour',
+                  'skewness', 'kurtosis', 'outlier_count', 'coefficient_of_variation']
+INTEGER_METRICS = {'total_events', 'affected_cases', 'outlier_count'}
+SKETCH_FIELDS = ['relative_accuracy', 'offset', 'zero_count', 'count', 'total', 'min', 'max']
+
+
+def dataset_fingerprint(df):
+    """Fingerprint of the columns baselines are computed from"""
+    return fingerprint(df[['case_id', 'resource', 'activity', 'timestamp', 'duration_ms']])
+
+
+def _concat(parts, dtype):
+    """Concatenate variable-length arrays into (values, starts) with starts[i]:starts[i + 1] per part"""
+    starts = np.zeros(len(parts) + 1, dtype=np.int64)
+    starts[1:] = np.cumsum([len(p) for p in parts])
+    values = np.concatenate(parts).astype(dtype) if parts else np.zeros(0, dtype=dtype)
+    return values, starts
+
+
+class StoredBaseline:
+    def __init__(self, path, meta):
+        """
+        One stored baseline version, memory-mapped
+
+        Arrays are opened with mmap_mode='r', so a point lookup only pages in
+        the rows and slices of the requested target.
+        """
+        self.path = path
+        self.meta = meta
+        with open(os.path.join(path, "targets.json")) as f:
+            self.targets = [tuple(t) for t in json.load(f)['targets']]
+        self.rows = {target: i for i, target in enumerate(self.targets)}
+        load = lambda name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r')
+        self._scalars = load('scalars')
+        self._sketch_meta = load('sketch_meta')
+        self._sketch_counts = load('sketch_counts')
+        self._sketch_starts = load('sketch_starts')
+        self._hourly = load('hourly')
+        self._raw = load('raw')
+        self._raw_starts = load('raw_starts')
+
+    def __contains__(self, target):
+        return tuple(target) in self.rows
+
+    def _row(self, target):
+        try:
+            return self.rows[tuple(target)]
+        except KeyError:
+            raise KeyError(f"No baseline for {target} in version {self.meta['version']}") from None
+
+    def scalars(self, target):
+        """Scalar metrics of one target"""
+        values = self._scalars[self._row(target)]
+        return {name: int(v) if name in INTEGER_METRICS else float(v) for name, v in zip(SCALAR_METRICS, values)}
+
+    def sketch(self, target):
+        row = self._row(target)
+        fields = dict(zip(SKETCH_FIELDS, self._sketch_meta[row]))
+        fields['counts'] = self._sketch_counts[self._sketch_starts[row]:self._sketch_starts[row + 1]]
+        return DurationSketch.from_dict(fields)
+
+    def histogram(self, target):
+        """(bucket lower edges, bucket upper edges, counts) of the target's duration sketch"""
+        return self.sketch(target).histogram()
+
+    def hourly_profile(self, target):
+        """Event count per hour of day (24 values)"""
+        return np.asarray(self._hourly[self._row(target)])
+
+    def raw_durations(self, target):
+        """Sorted float32 durations (memory-mapped slice)"""
+        row = self._row(target)
+        return self._raw[self._raw_starts[row]:self._raw_starts[row + 1]]
+
+    def metrics(self, target):
+        """Full metrics dict in the shape compute_baselines returns"""
+        metrics = self.scalars(target)
+        hourly = self.hourly_profile(target)
+        peak_hour = int(hourly.argmax()) if hourly.any() else None
+        metrics['peak_hour_events'] = {'peak_hour': peak_hour, 'peak_count': int(hourly.max())}
+        metrics['distribution_type'] = classify_distribution(metrics['skewness'])
+        metrics['raw_durations'] = self.raw_durations(target)
+        metrics['sketch'] = self.sketch(target)
+        return metrics
+
+    def to_baselines(self):
+        """{(resource, activity): metrics} for every stored target"""
+        return {target: self.metrics(target) for target in self.targets}
+
+
+class BaselineStore:
+    def __init__(self, root="baseline_store"):
+        """
+        Versioned on-disk store of baseline metrics
+
+        Every save creates a version named after its date and dataset
+        fingerprint, holding plain .npy arrays (scalars, sketch buckets,
+        hourly profiles, sorted raw durations) plus a target list. index.json
+        lists the versions so the latest baseline for a dataset is found
+        without opening any arrays.
+
+        Parameters:
+        - root: Directory holding one sub-directory per version and index.json
+        """
+        self.root = root
+        self.index_file = os.path.join(root, "index.json")
+        os.makedirs(root, exist_ok=True)
+        self.index = self._load_index()
+
+    def _load_index(self):
+        if os.path.exists(self.index_file):
+            try:
+                with open(self.index_file) as f:
+                    return json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"⚠️  Ignoring unreadable baseline store index: {e}")
+        return {}
+
+    def _save_index(self):
+        def write(path):
+            with open(path, 'w') as f:
+                json.dump(self.index, f, indent=2)
+        atomic_write(self.index_file, write)
+
+    def save(self, baselines, rollups, dataset_fingerprint, source=None):
+        """
+        Store {(resource, activity): metrics} as a new version and return its name
+
+        Parameters:
+        - rollups: RollupCube of the measured log, for the hourly profiles
+        - dataset_fingerprint: See dataset_fingerprint()
+        - source: Optional description of the data (e.g. the CSV file name)
+        """
+        created = datetime.now()
+        version = f"{created.strftime('%Y%m%d-%H%M%S')}_{dataset_fingerprint[:12]}"
+        path = os.path.join(self.root, version)
+        os.makedirs(path, exist_ok=True)
+
+        targets = sorted(baselines)
+        scalars = np.array([[baselines[t][name] for name in SCALAR_METRICS] for t in targets],
+                           dtype=np.float64).reshape(len(targets), len(SCALAR_METRICS))
+        sketches = [baselines[t]['sketch'].to_dict() for t in targets]
+        sketch_meta = np.array([[s[name] for name in SKETCH_FIELDS] for s in sketches],
+                               dtype=np.float64).reshape(len(targets), len(SKETCH_FIELDS))
+        sketch_counts, sketch_starts = _concat([s['counts'] for s in sketches], np.int64)
+        hourly = np.zeros((len(targets), 24), dtype=np.int64)
+        for i, (resource, activity) in enumerate(targets):
+            profile = rollups.by_hour_of_day(resource, activity)
+            hourly[i, profile.index] = profile.to_numpy()
+        raw, raw_starts = _concat([np.asarray(baselines[t]['raw_durations']) for t in targets], np.float32)
+
+        for name, array in [('scalars', scalars), ('sketch_meta', sketch_meta), ('sketch_counts', sketch_counts),
+                            ('sketch_starts', sketch_starts), ('hourly', hourly), ('raw', raw),
+                            ('raw_starts', raw_starts)]:
+            np.save(os.path.join(path, f"{name}.npy"), array)
+        def write_targets(temp_path):
+            with open(temp_path, 'w') as f:
+                json.dump({'targets': [list(t) for t in targets]}, f)
+        atomic_write(os.path.join(path, "targets.json"), write_targets)
+
+        self.index[version] = {
+            'version': version,
+            'created': created.isoformat(timespec='seconds'),
+            'fingerprint': dataset_fingerprint,
+            'source': source,
+            'targets': len(targets),
+            'events': int(scalars[:, 0].sum()) if len(targets) else 0
+        }
+        self._save_index()
+        return version
+
+    def versions(self, dataset_fingerprint=None):
+        """Index entries, oldest first (optionally only those of one dataset)"""
+        entries = [meta for meta in self.index.values()
+                   if dataset_fingerprint is None or meta['fingerprint'] == dataset_fingerprint]
+        return sorted(entries, key=lambda meta: meta['created'])
+
+    def latest(self, dataset_fingerprint=None):
+        """Name of the newest version, or None"""
+        entries = self.versions(dataset_fingerprint)
+        return entries[-1]['version'] if entries else None
+
+    def load(self, version=None):
+        """Open a version (default: the newest) as a StoredBaseline"""
+        version = version or self.latest()
+        if version not in self.index:
+            raise FileNotFoundError(f"No baseline version '{version}' in {self.root}")
+        return StoredBaseline(os.path.join(self.root, version), self.index[version])
+
+    def delete(self, version):
+        """Remove a version and its arrays"""
+        self.index.pop(version, None)
+        shutil.rmtree(os.path.join(self.root, version), ignore_errors=True)
+        self._save_index()
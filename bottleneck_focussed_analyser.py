@@ -1,14 +1,32 @@
-import pandas as pd
 import pm4py
 import matplotlib.pyplot as plt
 import seaborn as sns
 import numpy as np
 from datetime import datetime
 import os
+from pm4py.visualization.petri_net import visualizer as pn_visualizer
+from render_queue import RenderQueue
+from event_schema import read_event_log, widen_floats
+from time_rollups import RollupCube
+from preprocessing import add_pm4py_aliases, pm4py_frame
+from model_store import ModelStore
+from adaptive_thresholds import ThresholdModel
+from case_analytics import case_metrics, summarize_cases
+from stage_analytics import analyze_stages
+from interference_analyzer import InterferenceAnalyzer
+from path_hotspots import PathIndex
+from thread_timeline import ThreadTimeline
+from precursor_analyzer import precursor_patterns, top_precursors, describe_precursor
 
 class BottleneckAnalyzer:
-    def __init__(self):
+    def __init__(self, render_queue=None, model_store=None):
         self.raw_data = None
+        self.render_queue = render_queue or RenderQueue()
+        self.model_store = model_store or ModelStore()
+        self.threshold_percentile = None
+        self.threshold_model = None
+        self.event_thresholds = None
+        self.bottleneck_cases_data = None
         self.bottleneck_data = None
         self.bottleneck_log = None
         self.analysis_results = {}
@@ -18,8 +36,7 @@ class BottleneckAnalyzer:
         print(f"Loading data from {csv_file}...")
         
         try:
-            self.raw_data = pd.read_csv(csv_file)
-            self.raw_data['timestamp'] = pd.to_datetime(self.raw_data['timestamp'])
+            self.raw_data = read_event_log(csv_file)
             print(f"✅ Loaded {len(self.raw_data):,} events")
             
             if 'duration_ms' not in self.raw_data.columns:
@@ -52,22 +69,33 @@ class BottleneckAnalyzer:
         print(f"  95th percentile (>{p95_threshold:.1f}ms): {p95_count:,} events ({p95_count/len(self.raw_data)*100:.2f}%)")
         print(f"  99th percentile (>{p99_threshold:.1f}ms): {p99_count:,} events ({p99_count/len(self.raw_data)*100:.2f}%)")
         
-    def identify_bottlenecks(self, threshold_percentile=95, min_frequency=10):
+    def identify_bottlenecks(self, threshold_percentile=95, min_frequency=10, threshold_model=None):
         """
         Identify bottlenecks using statistical analysis
         
         Parameters:
         - threshold_percentile: Percentile above which events are considered slow
         - min_frequency: Minimum frequency for an activity to be considered
+        - threshold_model: ThresholdModel for per-process/syscall thresholds
+          (None = one global threshold_percentile over all events)
         """
-        print(f"\n=== Identifying Bottlenecks (>{threshold_percentile}th percentile) ===")
-        
-        # Calculate threshold
-        threshold = self.raw_data['duration_ms'].quantile(threshold_percentile / 100)
-        print(f"Bottleneck threshold: {threshold:.2f}ms")
+        self.threshold_percentile = threshold_percentile
+        self.threshold_model = threshold_model
+        
+        if threshold_model is None:
+            print(f"\n=== Identifying Bottlenecks (>{threshold_percentile}th percentile) ===")
+            threshold = self.raw_data['duration_ms'].quantile(threshold_percentile / 100)
+            print(f"Bottleneck threshold: {threshold:.2f}ms")
+            self.event_thresholds = np.full(len(self.raw_data), threshold)
+        else:
+            print(f"\n=== Identifying Bottlenecks ({threshold_model.describe()}) ===")
+            if threshold_model.thresholds is None:
+                threshold_model.fit(self.raw_data)
+            self.event_thresholds = threshold_model.thresholds_for(self.raw_data)
+            print(f"Bottleneck thresholds: {self.event_thresholds.min():.2f}ms to {self.event_thresholds.max():.2f}ms")
         
         # Extract bottleneck events
-        self.bottleneck_data = self.raw_data[self.raw_data['duration_ms'] > threshold].copy()
+        self.bottleneck_data = self.raw_data[self.raw_data['duration_ms'].to_numpy() > self.event_thresholds].copy()
         
         print(f"Identified {len(self.bottleneck_data):,} bottleneck events ({len(self.bottleneck_data)/len(self.raw_data)*100:.2f}%)")
         
@@ -82,47 +110,36 @@ class BottleneckAnalyzer:
         print("\n=== Bottleneck Pattern Analysis ===")
         
         # 1. By Activity
-        activity_bottlenecks = self.bottleneck_data.groupby('activity').agg({
+        activity_bottlenecks = self.bottleneck_data.groupby('activity', observed=True).agg({
             'duration_ms': ['count', 'mean', 'median', 'std', 'max'],
             'case_id': 'nunique'
-        }).round(2)
+        }).pipe(widen_floats).round(2)
         activity_bottlenecks.columns = ['Count', 'Mean_Duration', 'Median_Duration', 'Std_Duration', 'Max_Duration', 'Affected_Cases']
         activity_bottlenecks = activity_bottlenecks.sort_values('Count', ascending=False)
         
-        print("🎯 Top Bottleneck Activities:")
-        print(activity_bottlenecks.head(10))
-        
         # 2. By Resource (Process)
-        resource_bottlenecks = self.bottleneck_data.groupby('resource').agg({
+        resource_bottlenecks = self.bottleneck_data.groupby('resource', observed=True).agg({
             'duration_ms': ['count', 'mean', 'median', 'max'],
             'case_id': 'nunique'
-        }).round(2)
+        }).pipe(widen_floats).round(2)
         resource_bottlenecks.columns = ['Count', 'Mean_Duration', 'Median_Duration', 'Max_Duration', 'Affected_Cases']
         resource_bottlenecks = resource_bottlenecks.sort_values('Count', ascending=False)
         
-        print("\n🎯 Bottlenecks by Process:")
-        print(resource_bottlenecks)
-        
         # 3. Combined (Resource + Activity)
-        combined_bottlenecks = self.bottleneck_data.groupby(['resource', 'activity']).agg({
+        combined_bottlenecks = self.bottleneck_data.groupby(['resource', 'activity'], observed=True).agg({
             'duration_ms': ['count', 'mean', 'median'],
             'case_id': 'nunique'
-        }).round(2)
+        }).pipe(widen_floats).round(2)
         combined_bottlenecks.columns = ['Count', 'Mean_Duration', 'Median_Duration', 'Affected_Cases']
+        if self.threshold_model is not None:
+            thresholds = self.threshold_model.thresholds['threshold']
+            combined_bottlenecks['Threshold'] = thresholds.reindex(combined_bottlenecks.index).round(2).to_numpy()
         combined_bottlenecks = combined_bottlenecks.sort_values('Count', ascending=False)
         
-        print("\n🎯 Top Combined Bottlenecks (Process + Activity):")
-        print(combined_bottlenecks.head(15))
-        
         # 4. Temporal patterns
-        self.bottleneck_data['hour'] = self.bottleneck_data['timestamp'].dt.hour
-        hourly_bottlenecks = self.bottleneck_data.groupby('hour').size()
+        self.bottleneck_rollups = RollupCube(self.bottleneck_data)
+        hourly_bottlenecks = self.bottleneck_rollups.by_hour_of_day()
         
-        print(f"\n🕐 Bottleneck Peak Hours:")
-        top_hours = hourly_bottlenecks.nlargest(3)
-        for hour, count in top_hours.items():
-            print(f"  {hour:02d}:00 - {count} bottleneck events")
-            
         # Store results
         self.analysis_results = {
             'activity_bottlenecks': activity_bottlenecks,
@@ -131,6 +148,24 @@ class BottleneckAnalyzer:
             'hourly_bottlenecks': hourly_bottlenecks
         }
         
+        if len(self.bottleneck_data) == 0:
+            print("⚠️  No events exceed the bottleneck thresholds")
+            return
+        
+        print("🎯 Top Bottleneck Activities:")
+        print(activity_bottlenecks.head(10))
+        
+        print("\n🎯 Bottlenecks by Process:")
+        print(resource_bottlenecks)
+        
+        print("\n🎯 Top Combined Bottlenecks (Process + Activity):")
+        print(combined_bottlenecks.head(15))
+        
+        print(f"\n🕐 Bottleneck Peak Hours:")
+        top_hours = hourly_bottlenecks.nlargest(3)
+        for hour, count in top_hours.items():
+            print(f"  {hour:02d}:00 - {count} bottleneck events")
+        
     def _create_bottleneck_event_log(self):
         """Create event log focusing on cases with bottlenecks"""
         print("\n=== Creating Bottleneck-Focused Event Log ===")
@@ -139,25 +174,27 @@ class BottleneckAnalyzer:
         bottleneck_case_ids = self.bottleneck_data['case_id'].unique()
         
         # Extract all events from these cases (not just bottleneck events)
-        bottleneck_cases_data = self.raw_data[self.raw_data['case_id'].isin(bottleneck_case_ids)].copy()
+        in_cases = self.raw_data['case_id'].isin(bottleneck_case_ids).to_numpy()
+        bottleneck_cases_data = self.raw_data[in_cases].copy()
         
         print(f"Cases with bottlenecks: {len(bottleneck_case_ids):,}")
         print(f"Total events in these cases: {len(bottleneck_cases_data):,}")
         
-        # Add bottleneck flag
-        bottleneck_cases_data['is_bottleneck'] = bottleneck_cases_data.apply(
-            lambda row: 'BOTTLENECK' if row['duration_ms'] > self.raw_data['duration_ms'].quantile(0.95) else 'NORMAL',
-            axis=1
+        # Add bottleneck flag (against the same thresholds the events were identified with)
+        bottleneck_cases_data['is_bottleneck'] = np.where(
+            bottleneck_cases_data['duration_ms'].to_numpy() > self.event_thresholds[in_cases],
+            'BOTTLENECK', 'NORMAL'
         )
         
         # Prepare for pm4py
-        bottleneck_cases_data['case:concept:name'] = bottleneck_cases_data['case_id']
-        bottleneck_cases_data['concept:name'] = bottleneck_cases_data['activity'] + '_' + bottleneck_cases_data['is_bottleneck']
+        bottleneck_cases_data['case:concept:name'] = bottleneck_cases_data['case_id'].astype(str)
+        bottleneck_cases_data['concept:name'] = bottleneck_cases_data['activity'].astype(str) + '_' + bottleneck_cases_data['is_bottleneck']
         bottleneck_cases_data['time:timestamp'] = bottleneck_cases_data['timestamp']
         
-        # Convert to event log
-        self.bottleneck_log = pm4py.convert_to_event_log(bottleneck_cases_data)
-        print(f"✅ Bottleneck event log created with {len(self.bottleneck_log)} cases")
+        # Case-sorted frame that pm4py reads directly
+        self.bottleneck_cases_data = bottleneck_cases_data
+        self.bottleneck_log = pm4py_frame(bottleneck_cases_data)
+        print(f"✅ Bottleneck event log created with {len(bottleneck_case_ids)} cases")
         
     def discover_bottleneck_processes(self):
         """Discover process models highlighting bottleneck patterns"""
@@ -165,21 +202,29 @@ class BottleneckAnalyzer:
             raise ValueError("Bottleneck event log not created. Call identify_bottlenecks() first.")
             
         print(f"\n=== Bottleneck Process Discovery ===")
+        if len(self.bottleneck_cases_data) == 0:
+            print("⚠️  No cases with bottlenecks - skipping process discovery")
+            return None, None, None
         
         try:
             # Create output directory
             output_dir = "bottleneck_analysis"
             os.makedirs(output_dir, exist_ok=True)
             
-            # Discover process model
-            net, initial_marking, final_marking = pm4py.discover_petri_net_inductive(self.bottleneck_log)
+            # Discover process model (or reuse one stored for the same variant profile)
+            (net, initial_marking, final_marking), _ = self.model_store.get_or_discover(
+                'inductive', self.bottleneck_cases_data,
+                {'scope': 'bottleneck_cases', 'threshold_percentile': self.threshold_percentile,
+                 'threshold_model': self.threshold_model.params if self.threshold_model else None},
+                lambda: pm4py.discover_petri_net_inductive(self.bottleneck_log),
+                activity_col='concept:name')
             
             # Visualize bottleneck process
-            gviz = pm4py.vis.view_petri_net(net, initial_marking, final_marking, format="png")
+            gviz = pn_visualizer.apply(net, initial_marking, final_marking)
             output_path = f"{output_dir}/bottleneck_process_model"
-            gviz.render(output_path, format='png', cleanup=True)
+            self.render_queue.submit_graphviz('process_model', gviz, output_path)
             
-            print(f"✅ Bottleneck process model saved to {output_path}.png")
+            print(f"✅ Bottleneck process model queued for {output_path}")
             
             # Create simplified view for each major bottleneck type
             self._create_bottleneck_type_models()
@@ -215,22 +260,19 @@ class BottleneckAnalyzer:
                 case_data = self.raw_data[self.raw_data['case_id'].isin(case_ids)].copy()
                 
                 # Prepare for pm4py
-                case_data['case:concept:name'] = case_data['case_id']
-                case_data['concept:name'] = case_data['activity']
-                case_data['time:timestamp'] = case_data['timestamp']
+                add_pm4py_aliases(case_data)
                 
-                # Convert to event log
-                activity_log = pm4py.convert_to_event_log(case_data)
-                
-                # Discover model
-                net, im, fm = pm4py.discover_petri_net_inductive(activity_log)
+                # Discover model (or reuse one stored for the same variant profile)
+                (net, im, fm), _ = self.model_store.get_or_discover(
+                    'inductive', case_data, {'scope': 'bottleneck_type', 'activity': activity},
+                    lambda: pm4py.discover_petri_net_inductive(pm4py_frame(case_data)))
                 
                 # Visualize
-                gviz = pm4py.vis.view_petri_net(net, im, fm, format="png")
+                gviz = pn_visualizer.apply(net, im, fm)
                 output_path = f"{output_dir}/bottleneck_{activity.replace('/', '_')}_model"
-                gviz.render(output_path, format='png', cleanup=True)
+                self.render_queue.submit_graphviz('process_model', gviz, output_path)
                 
-                print(f"✅ {activity} bottleneck model saved to {output_path}.png")
+                print(f"✅ {activity} bottleneck model queued for {output_path}")
                 
             except Exception as e:
                 print(f"⚠️  Could not create model for {activity}: {e}")
@@ -272,11 +314,178 @@ class BottleneckAnalyzer:
             'frequency_impact': frequency_impact
         }
         
+    def analyze_case_flow(self):
+        """Analyze end-to-end case time: service vs queue wait vs idle gaps"""
+        print(f"\n=== Case Flow Analysis ===")
+        
+        metrics = case_metrics(self.raw_data)
+        flow = summarize_cases(metrics)
+        
+        # Cases containing a bottleneck event vs the rest
+        has_bottleneck = metrics.index.isin(self.bottleneck_data['case_id'].unique())
+        affected_throughput = metrics.loc[has_bottleneck, 'throughput_ms'].mean()
+        clean_throughput = metrics.loc[~has_bottleneck, 'throughput_ms'].mean()
+        
+        print("⏳ Case flow by process (sorted by share of case time spent waiting):")
+        print(flow[['cases', 'mean_throughput_ms', 'mean_service_ms', 'mean_queue_wait_ms',
+                    'mean_idle_ms', 'max_gap_ms', 'waiting_share']])
+        if has_bottleneck.any():
+            print(f"\nMean throughput: {affected_throughput:.1f}ms for cases with bottlenecks, "
+                  f"{clean_throughput:.1f}ms without")
+        else:
+            print(f"\nMean throughput: {clean_throughput:.1f}ms (no cases with bottlenecks)")
+        
+        self.analysis_results['case_metrics'] = metrics
+        self.analysis_results['case_flow'] = flow
+        self.analysis_results['case_throughput_split'] = {
+            'with_bottlenecks_ms': affected_throughput,
+            'without_bottlenecks_ms': clean_throughput
+        }
+        return flow
+        
+    def analyze_stage_bottlenecks(self, top_n=10):
+        """Rank workflow stages by time spent in them (uses the process_stage labels)"""
+        print(f"\n=== Stage Bottleneck Analysis ===")
+        
+        if 'process_stage' not in self.raw_data.columns:
+            print("⚠️  No process_stage column - stage analysis skipped")
+            return None
+            
+        stages = analyze_stages(self.raw_data)
+        
+        # Share of each stage's visits that contain a bottleneck event
+        bottleneck_visits = self.bottleneck_data.groupby(['workflow_type', 'process_stage'], observed=True)['case_id'].nunique()
+        bottleneck_visits.index.names = ['workflow_type', 'stage']
+        ranking = stages['stages']
+        ranking['bottleneck_visit_share'] = (bottleneck_visits.reindex(ranking.index).fillna(0) / ranking['visits']).round(3).to_numpy()
+        
+        print("🧭 Stage ranking by total time in stage:")
+        print(ranking.head(top_n))
+        print("\n🔀 Slowest stage transitions (p95):")
+        print(stages['transitions'].sort_values('p95_ms', ascending=False).head(5))
+        
+        self.analysis_results['stage_ranking'] = ranking
+        self.analysis_results['stage_transitions'] = stages['transitions']
+        return ranking
+        
+    def analyze_interference(self, min_events=30, top_n=10):
+        """Measure how each process's latency changes while another process's bottleneck calls run"""
+        print(f"\n=== Cross-Process Interference Analysis ===")
+        
+        interference = InterferenceAnalyzer(self.raw_data, 
+                                            bottleneck_mask=self.raw_data['duration_ms'].to_numpy() > self.event_thresholds)
+        matrix = interference.scan(min_events=min_events)
+        if len(matrix) == 0:
+            print("No overlapping bottleneck calls between processes")
+            self.analysis_results['interference'] = matrix
+            return matrix
+        
+        print("🔗 Latency uplift of target calls while source bottleneck calls are active:")
+        print(matrix.head(top_n))
+        
+        # Per-syscall breakdown for the strongest pair
+        worst = matrix.iloc[0]
+        detail = interference.interference(worst['source'], target_resources=[worst['target']])
+        print(f"\n{worst['target']} syscalls during {worst['source']} bottlenecks:")
+        frequent = detail[detail['during_count'] >= min_events]
+        if len(frequent) == 0:
+            # The pair passed min_events summed over its syscalls; show the syscalls that carry it
+            print(f"(no single syscall has {min_events}+ overlapping calls - showing the most frequent)")
+            frequent = detail.sort_values('during_count', ascending=False).head(5)
+        detail = frequent
+        print(detail[['during_count', 'during_p50', 'during_p95', 'clear_p50', 'clear_p95', 'p95_uplift']].head(5))
+        
+        self.analysis_results['interference'] = matrix
+        self.analysis_results['interference_detail'] = detail
+        return matrix
+        
+    def analyze_path_hotspots(self, activities=('ReadFile', 'WriteFile'), top_n=10):
+        """Find the directories and files behind slow file I/O bottlenecks"""
+        print(f"\n=== File Path Hotspot Analysis ({'/'.join(activities)}) ===")
+        
+        if 'file_path' not in self.raw_data.columns:
+            print("⚠️  No file_path column - path analysis skipped")
+            return None
+            
+        index = PathIndex(self.raw_data, list(activities),
+                          bottleneck_mask=self.raw_data['duration_ms'].to_numpy() > self.event_thresholds)
+        directories = index.directories_summary(min_depth=2)
+        shared = index.shared_files()
+        
+        print("🗂️  Directories ranked by time in bottleneck calls:")
+        print(directories.head(top_n))
+        print("\n📄 Slowest files:")
+        print(index.files().head(5))
+        print(f"\n🤝 Files used by several processes in the same second: {len(shared)}")
+        print(shared.head(5))
+        
+        self.analysis_results['path_hotspots'] = directories
+        self.analysis_results['file_hotspots'] = index.files()
+        self.analysis_results['shared_files'] = shared
+        return directories
+        
+    def analyze_threads(self, memory_activities=('VirtualAlloc', 'VirtualFree', 'HeapAlloc')):
+        """Thread concurrency, blocking and fan-out around memory bottlenecks (uses pid/tid)"""
+        print(f"\n=== Thread Timeline Analysis ===")
+        
+        if not {'pid', 'tid'} <= set(self.raw_data.columns):
+            print("⚠️  No pid/tid columns - thread analysis skipped")
+            return None
+            
+        timeline = ThreadTimeline(self.raw_data)
+        concurrency = timeline.concurrency_summary()
+        blocked = timeline.blocked_time()
+        slow_mask = self.raw_data['duration_ms'].to_numpy() > self.event_thresholds
+        if not self.bottleneck_data['activity'].isin(memory_activities).any():
+            print("No memory bottleneck calls - comparing calls above each syscall's 95th percentile instead")
+            slow_mask = None
+        fan_out = timeline.fan_out(list(memory_activities), slow_mask=slow_mask)
+        
+        print(f"🧵 {len(timeline.thread_keys):,} threads - concurrency per process (1s buckets):")
+        print(concurrency)
+        print("\n⏸️  Time blocked in WaitForSingleObject:")
+        print(blocked)
+        print(f"\n🧠 Busy threads at the start of {'/'.join(memory_activities)} calls (slow vs other):")
+        print(fan_out)
+        
+        output_dir = "bottleneck_analysis"
+        os.makedirs(output_dir, exist_ok=True)
+        timeline.queue_concurrency_chart(self.render_queue, f'{output_dir}/thread_concurrency')
+        
+        self.analysis_results['thread_concurrency'] = concurrency
+        self.analysis_results['thread_blocking'] = blocked
+        self.analysis_results['memory_fan_out'] = fan_out
+        return concurrency
+        
+    def analyze_precursors(self, top_n=5, k=3, min_events=20):
+        """Find the preceding calls in a case that predict the top bottlenecks"""
+        print(f"\n=== Precursor Analysis (preceding {k} calls) ===")
+        
+        targets = list(self.analysis_results['combined_bottlenecks'].head(top_n).index)
+        patterns = precursor_patterns(self.raw_data, targets,
+                                      self.raw_data['duration_ms'].to_numpy() > self.event_thresholds,
+                                      k=k, min_events=min_events)
+        ranked = top_precursors(patterns)
+        
+        if len(ranked) == 0:
+            print("No call context raises the bottleneck rate of the top bottlenecks")
+        for (resource, activity), contexts in ranked.groupby(['resource', 'activity'], sort=False):
+            print(f"🔎 {resource} → {activity}:")
+            for _, row in contexts.iterrows():
+                print(f"   {describe_precursor(row)}")
+        
+        self.analysis_results['precursors'] = patterns
+        self.analysis_results['top_precursors'] = ranked
+        return ranked
+        
     def suggest_optimizations(self):
         """Suggest specific optimizations based on bottleneck analysis"""
         print(f"\n=== Optimization Suggestions ===")
         
         top_bottlenecks = self.analysis_results['combined_bottlenecks'].head(5)
+        if 'top_precursors' not in self.analysis_results:
+            self.analyze_precursors()
+        precursors = self.analysis_results['top_precursors']
         
         suggestions = {
             ('guardian.exe', 'ReadFile'): [
@@ -325,6 +534,12 @@ class BottleneckAnalyzer:
                 print(f"   🔧 Profile {activity} operation in {resource}")
                 print(f"   🔧 Implement caching for {activity} results")
                 print(f"   🔧 Consider asynchronous execution of {activity}")
+            
+            contexts = precursors[(precursors['resource'] == resource) & (precursors['activity'] == activity)]
+            for _, context in contexts.head(2).iterrows():
+                print(f"   🔎 Slow calls often follow {' → '.join(context['context'])} "
+                      f"(×{context['lift']:.1f} bottleneck rate, {(context['latency_uplift'] - 1)*100:+.0f}% latency) "
+                      f"- review this call pattern")
                 
         print(f"\n💡 GENERAL OPTIMIZATION STRATEGIES:")
         print("🔧 Implement operation prioritization (critical vs non-critical)")
@@ -335,95 +550,37 @@ class BottleneckAnalyzer:
         
     def create_bottleneck_visualizations(self):
         """Create comprehensive visualizations for bottleneck analysis"""
+        if len(self.bottleneck_data) == 0:
+            print("⚠️  No bottleneck events - skipping bottleneck visualizations")
+            return
+        
         output_dir = "bottleneck_analysis"
         os.makedirs(output_dir, exist_ok=True)
         
-        # Set plotting style
-        plt.style.use('default')
-        sns.set_palette("rocket")
-        
-        # 1. Bottleneck distribution by activity
-        plt.figure(figsize=(15, 10))
-        
-        plt.subplot(2, 3, 1)
-        top_activities = self.analysis_results['activity_bottlenecks'].head(8)
-        plt.barh(range(len(top_activities)), top_activities['Count'])
-        plt.yticks(range(len(top_activities)), top_activities.index)
-        plt.xlabel('Bottleneck Count')
-        plt.title('Top Bottleneck Activities')
-        plt.gca().invert_yaxis()
-        
-        # 2. Duration vs Frequency scatter
-        plt.subplot(2, 3, 2)
-        activity_stats = self.analysis_results['activity_bottlenecks']
-        plt.scatter(activity_stats['Count'], activity_stats['Mean_Duration'], 
-                   s=activity_stats['Affected_Cases']*2, alpha=0.6)
-        plt.xlabel('Frequency (Count)')
-        plt.ylabel('Mean Duration (ms)')
-        plt.title('Duration vs Frequency\n(Size = Affected Cases)')
-        
-        # 3. Bottlenecks by process
-        plt.subplot(2, 3, 3)
-        resource_stats = self.analysis_results['resource_bottlenecks']
-        plt.pie(resource_stats['Count'], labels=resource_stats.index, autopct='%1.1f%%')
-        plt.title('Bottlenecks by Process')
-        
-        # 4. Hourly bottleneck pattern
-        plt.subplot(2, 3, 4)
-        hourly_data = self.analysis_results['hourly_bottlenecks']
-        plt.plot(hourly_data.index, hourly_data.values, marker='o', linewidth=2)
-        plt.xlabel('Hour of Day')
-        plt.ylabel('Bottleneck Events')
-        plt.title('Bottleneck Timeline (24-hour)')
-        plt.grid(True, alpha=0.3)
-        
-        # 5. Duration distribution comparison
-        plt.subplot(2, 3, 5)
-        plt.hist(self.raw_data['duration_ms'], bins=50, alpha=0.5, label='All Events', density=True)
-        plt.hist(self.bottleneck_data['duration_ms'], bins=50, alpha=0.7, label='Bottlenecks', density=True)
-        plt.xlabel('Duration (ms)')
-        plt.ylabel('Density')
-        plt.title('Duration Distribution')
-        plt.legend()
-        plt.yscale('log')
-        
-        # 6. Impact analysis
-        plt.subplot(2, 3, 6)
+        # Aggregate everything the charts need up front so only small
+        # tables travel to the render workers
         impact_data = self.analyze_bottleneck_impact()
-        impacts = ['Time Impact', 'Case Impact', 'Frequency Impact']
-        values = [impact_data['time_impact'], impact_data['case_impact'], impact_data['frequency_impact']]
-        colors = ['red', 'orange', 'yellow']
-        bars = plt.bar(impacts, values, color=colors, alpha=0.7)
-        plt.ylabel('Impact (%)')
-        plt.title('Bottleneck Impact Analysis')
-        plt.xticks(rotation=45)
-        
-        # Add value labels on bars
-        for bar, value in zip(bars, values):
-            plt.text(bar.get_x() + bar.get_width()/2, bar.get_height() + 0.5, 
-                    f'{value:.1f}%', ha='center', va='bottom')
-        
-        plt.tight_layout()
-        plt.savefig(f'{output_dir}/bottleneck_analysis_dashboard.png', dpi=300, bbox_inches='tight')
-        plt.close()
-        
-        # Create detailed heatmap
-        plt.figure(figsize=(12, 8))
+        all_hist, all_edges = np.histogram(self.raw_data['duration_ms'], bins=50, density=True)
+        bottleneck_hist, bottleneck_edges = np.histogram(self.bottleneck_data['duration_ms'], bins=50, density=True)
+        
+        dashboard_data = {
+            'activity_bottlenecks': self.analysis_results['activity_bottlenecks'],
+            'resource_bottlenecks': self.analysis_results['resource_bottlenecks'],
+            'hourly_bottlenecks': self.analysis_results['hourly_bottlenecks'],
+            'all_duration_hist': (all_hist, all_edges),
+            'bottleneck_duration_hist': (bottleneck_hist, bottleneck_edges),
+            'impact_data': impact_data
+        }
+        self.render_queue.submit_plot('bottleneck_analysis_dashboard', _plot_bottleneck_dashboard,
+                                      dashboard_data, f'{output_dir}/bottleneck_analysis_dashboard')
         
         # Bottleneck heatmap by process and activity
-        bottleneck_pivot = self.bottleneck_data.groupby(['resource', 'activity']).size().reset_index(name='count')
+        bottleneck_pivot = self.bottleneck_data.groupby(['resource', 'activity'], observed=True).size().reset_index(name='count')
         heatmap_data = bottleneck_pivot.pivot(index='resource', columns='activity', values='count').fillna(0)
+        self.render_queue.submit_plot('bottleneck_heatmap', _plot_bottleneck_heatmap,
+                                      heatmap_data, f'{output_dir}/bottleneck_heatmap')
         
-        sns.heatmap(heatmap_data, annot=True, fmt='.0f', cmap='Reds', cbar_kws={'label': 'Bottleneck Count'})
-        plt.title('Bottleneck Heatmap: Process vs Activity')
-        plt.xlabel('Activity')
-        plt.ylabel('Process')
-        plt.xticks(rotation=45)
-        plt.tight_layout()
-        plt.savefig(f'{output_dir}/bottleneck_heatmap.png', dpi=300, bbox_inches='tight')
-        plt.close()
-        
-        print(f"✅ Bottleneck visualizations saved in {output_dir}/")
+        print(f"✅ Bottleneck visualizations queued in {output_dir}/")
         
     def generate_bottleneck_report(self):
         """Generate comprehensive bottleneck analysis report"""
@@ -436,36 +593,84 @@ class BottleneckAnalyzer:
         print(f"\n📊 EXECUTIVE SUMMARY")
         print(f"Total Events Analyzed: {len(self.raw_data):,}")
         print(f"Bottleneck Events: {len(self.bottleneck_data):,}")
+        if self.threshold_model is not None:
+            print(f"Threshold Rule: {self.threshold_model.describe()}")
+        else:
+            print(f"Threshold Rule: global {self.threshold_percentile}th percentile")
         print(f"Performance Impact: {impact_data['time_impact']:.1f}% of total execution time")
         print(f"System Coverage: {impact_data['case_impact']:.1f}% of processes affected")
         
-        print(f"\n🎯 TOP 5 BOTTLENECK SOURCES")
-        top_5 = self.analysis_results['combined_bottlenecks'].head(5)
-        for i, (index, row) in enumerate(top_5.iterrows()):
-            resource, activity = index
-            print(f"{i+1}. {resource} → {activity}")
-            print(f"   Events: {row['Count']}, Avg Duration: {row['Mean_Duration']:.1f}ms")
+        if len(self.bottleneck_data) == 0:
+            print(f"\n🎯 No events exceed the bottleneck thresholds - nothing to prioritize")
+        else:
+            print(f"\n🎯 TOP 5 BOTTLENECK SOURCES")
+            top_5 = self.analysis_results['combined_bottlenecks'].head(5)
+            for i, (index, row) in enumerate(top_5.iterrows()):
+                resource, activity = index
+                print(f"{i+1}. {resource} → {activity}")
+                print(f"   Events: {row['Count']}, Avg Duration: {row['Mean_Duration']:.1f}ms")
             
-        print(f"\n🔥 CRITICAL FINDINGS")
-        worst_bottleneck = self.analysis_results['combined_bottlenecks'].iloc[0]
-        worst_resource, worst_activity = self.analysis_results['combined_bottlenecks'].index[0]
-        print(f"• Worst bottleneck: {worst_resource} → {worst_activity}")
-        print(f"  ({worst_bottleneck['Count']} events, {worst_bottleneck['Mean_Duration']:.1f}ms avg)")
-        
-        peak_hour = self.analysis_results['hourly_bottlenecks'].idxmax()
-        peak_count = self.analysis_results['hourly_bottlenecks'].max()
-        print(f"• Peak bottleneck time: {peak_hour:02d}:00 ({peak_count} events)")
-        
-        worst_process = self.analysis_results['resource_bottlenecks'].iloc[0]
-        worst_process_name = self.analysis_results['resource_bottlenecks'].index[0]
-        print(f"• Most problematic process: {worst_process_name}")
-        print(f"  ({worst_process['Count']} bottleneck events)")
+            print(f"\n🔥 CRITICAL FINDINGS")
+            worst_bottleneck = self.analysis_results['combined_bottlenecks'].iloc[0]
+            worst_resource, worst_activity = self.analysis_results['combined_bottlenecks'].index[0]
+            print(f"• Worst bottleneck: {worst_resource} → {worst_activity}")
+            print(f"  ({worst_bottleneck['Count']} events, {worst_bottleneck['Mean_Duration']:.1f}ms avg)")
+        
+            peak_hour = self.analysis_results['hourly_bottlenecks'].idxmax()
+            peak_count = self.analysis_results['hourly_bottlenecks'].max()
+            print(f"• Peak bottleneck time: {peak_hour:02d}:00 ({peak_count} events)")
+        
+            worst_process = self.analysis_results['resource_bottlenecks'].iloc[0]
+            worst_process_name = self.analysis_results['resource_bottlenecks'].index[0]
+            print(f"• Most problematic process: {worst_process_name}")
+            print(f"  ({worst_process['Count']} bottleneck events)")
+        
+        if 'stage_ranking' in self.analysis_results:
+            print(f"\n🧭 SLOWEST STAGES")
+            for (workflow, stage), row in self.analysis_results['stage_ranking'].head(5).iterrows():
+                print(f"• {workflow} → {stage}: {row['total_ms']/1000:.1f}s total, "
+                      f"p95 {row['p95_ms']:.1f}ms per visit, {row['share_of_workflow']*100:.0f}% of workflow time")
+        
+        directories = self.analysis_results.get('path_hotspots')
+        if directories is not None and (directories['bottlenecks'] > 0).any():
+            print(f"\n🗂️  FILE I/O HOTSPOTS")
+            for directory, row in directories[directories['bottlenecks'] > 0].head(3).iterrows():
+                print(f"• {directory}: {int(row['bottlenecks']):,} bottleneck calls ({row['bottleneck_ms']/1000:.1f}s) "
+                      f"across {int(row['files'])} files, p95 {row['p95_ms']:.1f}ms, used by {int(row['processes'])} processes")
+        
+        fan_out = self.analysis_results.get('memory_fan_out')
+        if fan_out is not None and 'fan_out_ratio' in fan_out.columns:
+            print(f"\n🧵 THREAD ACTIVITY")
+            for process, row in fan_out.dropna(subset=['fan_out_ratio']).sort_values('fan_out_ratio', ascending=False).head(3).iterrows():
+                blocked = self.analysis_results['thread_blocking'].loc[process, 'blocked_share']
+                print(f"• {process}: {row['threads_when_slow']:.2f} busy threads during slow memory calls vs "
+                      f"{row['threads_otherwise']:.2f} otherwise (x{row['fan_out_ratio']:.2f}), "
+                      f"{blocked*100:.1f}% of thread time blocked")
+        
+        interference = self.analysis_results.get('interference')
+        if interference is not None and len(interference):
+            print(f"\n🔗 CROSS-PROCESS INTERFERENCE")
+            for _, row in interference.head(3).iterrows():
+                print(f"• {row['target']} runs {(row['p95_uplift'] - 1)*100:+.0f}% slower at p95 "
+                      f"({(row['mean_uplift'] - 1)*100:+.0f}% mean) while {row['source']} bottlenecks are active "
+                      f"({row['during_events']:,} overlapping calls)")
+        
+        if 'case_flow' not in self.analysis_results:
+            self.analyze_case_flow()
+        flow = self.analysis_results['case_flow']
+        print(f"\n⏳ WAITING VS SERVICE TIME")
+        for process, row in flow.iterrows():
+            print(f"• {process}: {row['waiting_share']*100:.1f}% of case time waiting "
+                  f"(queue {row['mean_queue_wait_ms']:.1f}ms + idle {row['mean_idle_ms']:.1f}ms per case, "
+                  f"service {row['mean_service_ms']:.1f}ms, max gap {row['max_gap_ms']:.1f}ms)")
         
         print(f"\n📁 GENERATED OUTPUTS")
         print("• bottleneck_analysis/bottleneck_process_model.png - Overall bottleneck flow")
         print("• bottleneck_analysis/bottleneck_*_model.png - Individual bottleneck models")
         print("• bottleneck_analysis/bottleneck_analysis_dashboard.png - Summary charts")
         print("• bottleneck_analysis/bottleneck_heatmap.png - Process vs Activity heatmap")
+        if 'thread_concurrency' in self.analysis_results:
+            print("• bottleneck_analysis/thread_concurrency.png - Thread concurrency per process")
         
         print(f"\n🚀 NEXT STEPS")
         print("1. Focus optimization efforts on top 3 bottlenecks identified above")
@@ -473,6 +678,89 @@ class BottleneckAnalyzer:
         print("3. Monitor peak hours for targeted performance improvements")
         print("4. Re-run analysis after optimizations to measure improvements")
 
+def _plot_bottleneck_dashboard(data):
+    """Draw the six-panel bottleneck dashboard (runs in a render worker)"""
+    # Set plotting style
+    plt.style.use('default')
+    sns.set_palette("rocket")
+    
+    # 1. Bottleneck distribution by activity
+    fig = plt.figure(figsize=(15, 10))
+    
+    plt.subplot(2, 3, 1)
+    top_activities = data['activity_bottlenecks'].head(8)
+    plt.barh(range(len(top_activities)), top_activities['Count'])
+    plt.yticks(range(len(top_activities)), top_activities.index)
+    plt.xlabel('Bottleneck Count')
+    plt.title('Top Bottleneck Activities')
+    plt.gca().invert_yaxis()
+    
+    # 2. Duration vs Frequency scatter
+    plt.subplot(2, 3, 2)
+    activity_stats = data['activity_bottlenecks']
+    plt.scatter(activity_stats['Count'], activity_stats['Mean_Duration'], 
+               s=activity_stats['Affected_Cases']*2, alpha=0.6)
+    plt.xlabel('Frequency (Count)')
+    plt.ylabel('Mean Duration (ms)')
+    plt.title('Duration vs Frequency\n(Size = Affected Cases)')
+    
+    # 3. Bottlenecks by process
+    plt.subplot(2, 3, 3)
+    resource_stats = data['resource_bottlenecks']
+    plt.pie(resource_stats['Count'], labels=resource_stats.index, autopct='%1.1f%%')
+    plt.title('Bottlenecks by Process')
+    
+    # 4. Hourly bottleneck pattern
+    plt.subplot(2, 3, 4)
+    hourly_data = data['hourly_bottlenecks']
+    plt.plot(hourly_data.index, hourly_data.values, marker='o', linewidth=2)
+    plt.xlabel('Hour of Day')
+    plt.ylabel('Bottleneck Events')
+    plt.title('Bottleneck Timeline (24-hour)')
+    plt.grid(True, alpha=0.3)
+    
+    # 5. Duration distribution comparison (histograms are pre-binned)
+    plt.subplot(2, 3, 5)
+    all_hist, all_edges = data['all_duration_hist']
+    bottleneck_hist, bottleneck_edges = data['bottleneck_duration_hist']
+    plt.stairs(all_hist, all_edges, fill=True, alpha=0.5, label='All Events')
+    plt.stairs(bottleneck_hist, bottleneck_edges, fill=True, alpha=0.7, label='Bottlenecks')
+    plt.xlabel('Duration (ms)')
+    plt.ylabel('Density')
+    plt.title('Duration Distribution')
+    plt.legend()
+    plt.yscale('log')
+    
+    # 6. Impact analysis
+    plt.subplot(2, 3, 6)
+    impact_data = data['impact_data']
+    impacts = ['Time Impact', 'Case Impact', 'Frequency Impact']
+    values = [impact_data['time_impact'], impact_data['case_impact'], impact_data['frequency_impact']]
+    colors = ['red', 'orange', 'yellow']
+    bars = plt.bar(impacts, values, color=colors, alpha=0.7)
+    plt.ylabel('Impact (%)')
+    plt.title('Bottleneck Impact Analysis')
+    plt.xticks(rotation=45)
+    
+    # Add value labels on bars
+    for bar, value in zip(bars, values):
+        plt.text(bar.get_x() + bar.get_width()/2, bar.get_height() + 0.5, 
+                f'{value:.1f}%', ha='center', va='bottom')
+    
+    plt.tight_layout()
+    return fig
+
+def _plot_bottleneck_heatmap(heatmap_data):
+    """Draw the process vs activity heatmap (runs in a render worker)"""
+    fig = plt.figure(figsize=(12, 8))
+    sns.heatmap(heatmap_data, annot=True, fmt='.0f', cmap='Reds', cbar_kws={'label': 'Bottleneck Count'})
+    plt.title('Bottleneck Heatmap: Process vs Activity')
+    plt.xlabel('Activity')
+    plt.ylabel('Process')
+    plt.xticks(rotation=45)
+    plt.tight_layout()
+    return fig
+
 def main():
     analyzer = BottleneckAnalyzer()
     
@@ -486,17 +774,30 @@ def main():
         analyzer.load_data(csv_file)
         
         # Get threshold preference
-        threshold = input("Enter bottleneck threshold percentile (or press Enter for 95): ").strip()
-        threshold = int(threshold) if threshold else 95
-        
-        print(f"\n🔍 Running bottleneck analysis (>{threshold}th percentile)...")
+        mode = input("Threshold mode - 'global' percentile or 'adaptive' (per process/syscall) (press Enter for global): ").strip().lower()
+        threshold_model = None
+        if mode == 'adaptive':
+            threshold = 95
+            threshold_model = ThresholdModel()
+            print(f"\n🔍 Running bottleneck analysis ({threshold_model.describe()})...")
+        else:
+            threshold = input("Enter bottleneck threshold percentile (or press Enter for 95): ").strip()
+            threshold = int(threshold) if threshold else 95
+            print(f"\n🔍 Running bottleneck analysis (>{threshold}th percentile)...")
         
         # Run complete bottleneck analysis
-        analyzer.identify_bottlenecks(threshold_percentile=threshold)
+        analyzer.identify_bottlenecks(threshold_percentile=threshold, threshold_model=threshold_model)
         analyzer.discover_bottleneck_processes()
+        analyzer.analyze_case_flow()
+        analyzer.analyze_stage_bottlenecks()
+        analyzer.analyze_interference()
+        analyzer.analyze_path_hotspots()
+        analyzer.analyze_threads()
+        analyzer.analyze_precursors()
         analyzer.suggest_optimizations()
         analyzer.create_bottleneck_visualizations()
         analyzer.generate_bottleneck_report()
+        analyzer.render_queue.shutdown()
         
         print(f"\n✅ Bottleneck analysis completed!")
         print(f"Check the 'bottleneck_analysis/' directory for all outputs.")
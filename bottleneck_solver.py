@@ -23,8 +23,21 @@ from langchain.chains import RetrievalQA
 from langchain_google_genai import ChatGoogleGenerativeAI, GoogleGenerativeAIEmbeddings
 import google.generativeai as genai
 
+from render_queue import RenderQueue
+from event_schema import read_event_log, widen_floats
+from case_analytics import case_metrics, summarize_cases
+from precursor_analyzer import precursor_patterns, top_precursors, describe_precursor
+from what_if import WhatIfEngine, parse_rule, describe_scenario
+
+# The local solutions' expected improvements, at the conservative end, as what-if rules
+LOCAL_SOLUTION_SCENARIOS = {
+    'File I/O optimization (40-60%)': ['ReadFile WriteFile duration × 0.6'],
+    'Memory management (30-50%)': ['VirtualAlloc duration × 0.7'],
+    'Registry caching (20-30%)': ['RegQueryValue duration × 0.8'],
+}
+
 class SimpleBottleneckSolver:
-    def __init__(self):
+    def __init__(self, render_queue=None):
         """Initialize with hardcoded Gemini settings"""
         # Hardcoded settings
         self.llm_provider = "gemini"
@@ -38,6 +51,7 @@ class SimpleBottleneckSolver:
         self.bottleneck_data = None
         self.solutions = {}
         self.cost_tracking = {}
+        self.render_queue = render_queue or RenderQueue()
         
         # Initialize LLM
         self._initialize_llm()
@@ -94,12 +108,16 @@ Provide detailed, technical, and actionable solutions with realistic time and co
 - **Total Events**: {total_events:,}
 - **Bottleneck Events**: {bottleneck_events:,} 
 - **Performance Impact**: {performance_impact:.1f}% of total execution time
-- **Bottleneck Threshold**: {threshold_ms:.1f}ms
+- **Bottleneck Threshold**: {threshold_ms:.1f}ms ({threshold_method})
 - **Time Lost**: {bottleneck_time:.1f} seconds
 
 ## TOP CRITICAL BOTTLENECKS
 {critical_combinations}
 
+## SLOW-CALL PRECURSORS
+Preceding calls in the same case that raise the chance of a bottleneck call:
+{precursors}
+
 ## TECHNICAL CONTEXT
 {system_context}
 
@@ -137,24 +155,41 @@ Rank by impact potential, effort, and ROI
 Provide specific technical details and realistic estimates.
 """
     
-    def load_and_analyze(self, csv_file="enhanced_system_call_log_95249_events_20250610_143122.csv", threshold_percentile=95):
-        """Load data and perform bottleneck analysis"""
+    def load_and_analyze(self, csv_file="enhanced_system_call_log_95249_events_20250610_143122.csv", threshold_percentile=95,
+                         threshold_model=None):
+        """
+        Load data and perform bottleneck analysis
+        
+        Parameters:
+        - threshold_percentile: Global percentile threshold (used when threshold_model is None)
+        - threshold_model: ThresholdModel for per-process/syscall thresholds
+        """
         print(f"🔍 Loading and analyzing {csv_file}...")
         
         try:
             # Load data
-            raw_data = pd.read_csv(csv_file)
-            raw_data['timestamp'] = pd.to_datetime(raw_data['timestamp'])
+            raw_data = read_event_log(csv_file)
             
             # Calculate bottleneck threshold
-            threshold = raw_data['duration_ms'].quantile(threshold_percentile / 100)
-            bottleneck_events = raw_data[raw_data['duration_ms'] > threshold].copy()
+            if threshold_model is None:
+                threshold = raw_data['duration_ms'].quantile(threshold_percentile / 100)
+                threshold_method = f"global {threshold_percentile}th percentile"
+                bottleneck_events = raw_data[raw_data['duration_ms'] > threshold].copy()
+            else:
+                if threshold_model.thresholds is None:
+                    threshold_model.fit(raw_data)
+                threshold = threshold_model.thresholds['threshold'].median()
+                threshold_method = f"{threshold_model.describe()}, median shown"
+                bottleneck_events = raw_data[threshold_model.flag(raw_data)].copy()
             
             print(f"✅ Loaded {len(raw_data):,} events")
-            print(f"📊 Identified {len(bottleneck_events):,} bottlenecks (>{threshold:.2f}ms)")
+            print(f"📊 Identified {len(bottleneck_events):,} bottlenecks (>{threshold:.2f}ms, {threshold_method})")
             
             # Extract key bottleneck data
             self.bottleneck_data = self._extract_key_bottlenecks(raw_data, bottleneck_events, threshold)
+            self.bottleneck_data['system_overview']['threshold_method'] = threshold_method
+            self.bottleneck_data['what_if'] = self._simulate_local_solutions(raw_data, threshold_percentile,
+                                                                             threshold_model)
             
             return True
             
@@ -171,13 +206,20 @@ Provide specific technical details and realistic estimates.
         performance_impact = (bottleneck_time / total_time) * 100
         
         # Top critical combinations
-        combined_bottlenecks = bottleneck_events.groupby(['resource', 'activity']).agg({
+        combined_bottlenecks = bottleneck_events.groupby(['resource', 'activity'], observed=True).agg({
             'duration_ms': ['count', 'mean', 'sum'],
             'case_id': 'nunique'
-        }).round(2)
+        }).pipe(widen_floats).round(2)
         combined_bottlenecks.columns = ['frequency', 'avg_duration', 'total_time', 'affected_instances']
         combined_bottlenecks = combined_bottlenecks.sort_values('total_time', ascending=False)
         
+        # End-to-end case time split into service, queue wait and idle gaps
+        case_flow = summarize_cases(case_metrics(raw_data))
+        
+        # Call contexts that precede the top bottlenecks
+        precursors = top_precursors(precursor_patterns(raw_data, list(combined_bottlenecks.head(5).index),
+                                                       raw_data.index.isin(bottleneck_events.index)), n=2)
+        
         return {
             'system_overview': {
                 'total_events': total_events,
@@ -187,6 +229,9 @@ Provide specific technical details and realistic estimates.
                 'bottleneck_time_seconds': bottleneck_time / 1000,
             },
             'critical_combinations': combined_bottlenecks.head(10).to_dict('index'),
+            'precursors': [f"{row['resource']}: {describe_precursor(row)}" for _, row in precursors.iterrows()],
+            'case_flow': case_flow[['cases', 'mean_throughput_ms', 'mean_service_ms', 'mean_queue_wait_ms',
+                                    'mean_idle_ms', 'max_gap_ms', 'waiting_share']].to_dict('index'),
             'system_context': {
                 'unique_processes': raw_data['resource'].nunique(),
                 'unique_activities': raw_data['activity'].nunique(),
@@ -194,6 +239,17 @@ Provide specific technical details and realistic estimates.
             }
         }
     
+    def _simulate_local_solutions(self, raw_data, threshold_percentile, threshold_model):
+        """Check the local solutions' expected improvements against the data with the what-if engine"""
+        activities = set(raw_data['activity'].unique())
+        scenarios = {name: rules for name, rules in LOCAL_SOLUTION_SCENARIOS.items()
+                     if all(set(parse_rule(rule)['targets']) <= activities for rule in rules)}
+        if not scenarios:
+            return []
+        engine = WhatIfEngine(raw_data, threshold_model, threshold_percentile)
+        comparison, _ = engine.run(scenarios)
+        return [describe_scenario(row) for _, row in comparison.iterrows()]
+    
     def generate_ai_solutions(self):
         """Generate AI-powered solutions using Gemini"""
         
@@ -220,7 +276,10 @@ Provide specific technical details and realistic estimates.
             context = self.bottleneck_data['system_context']
             context_text = f"""- System Type: Windows with {context['unique_processes']} processes
 - Activities: {context['unique_activities']} different system calls
-- Analysis Period: {context['analysis_timespan_hours']:.1f} hours"""
+- Analysis Period: {context['analysis_timespan_hours']:.1f} hours
+- Case Time Spent Waiting (queue + idle): """ + ", ".join(
+                f"{process} {flow['waiting_share']*100:.1f}%"
+                for process, flow in self.bottleneck_data['case_flow'].items())
             
             # Create comprehensive prompt
             prompt = self.analysis_template.format(
@@ -228,8 +287,10 @@ Provide specific technical details and realistic estimates.
                 bottleneck_events=overview['bottleneck_events'],
                 performance_impact=overview['performance_impact_percent'],
                 threshold_ms=overview['threshold_ms'],
+                threshold_method=overview['threshold_method'],
                 bottleneck_time=overview['bottleneck_time_seconds'],
                 critical_combinations=critical_text,
+                precursors="\n".join(f"- {line}" for line in self.bottleneck_data['precursors']) or "- None found",
                 system_context=context_text
             )
             
@@ -306,7 +367,11 @@ Provide specific technical details and realistic estimates.
                 'bottleneck_events': self.bottleneck_data['system_overview']['bottleneck_events'],
                 'performance_impact': f"{self.bottleneck_data['system_overview']['performance_impact_percent']:.1f}%",
                 'threshold_ms': f"{self.bottleneck_data['system_overview']['threshold_ms']:.2f}ms",
-                'top_bottlenecks': list(self.bottleneck_data['critical_combinations'].keys())[:5]
+                'threshold_method': self.bottleneck_data['system_overview']['threshold_method'],
+                'top_bottlenecks': list(self.bottleneck_data['critical_combinations'].keys())[:5],
+                'case_flow': self.bottleneck_data['case_flow'],
+                'precursors': self.bottleneck_data['precursors'],
+                'what_if': self.bottleneck_data['what_if']
             }
             
             with open(f"{output_dir}/analysis_summary.json", 'w') as f:
@@ -322,28 +387,18 @@ Provide specific technical details and realistic estimates.
         output_dir = "bottleneck_analysis_results"
         os.makedirs(output_dir, exist_ok=True)
         
-        # Create simple bar chart of top bottlenecks
-        plt.figure(figsize=(12, 8))
-        
         top_bottlenecks = list(self.bottleneck_data['critical_combinations'].items())[:8]
-        labels = [f"{proc}\n{act}" for (proc, act), _ in top_bottlenecks]
-        impacts = [stats['total_time'] for _, stats in top_bottlenecks]
-        
-        bars = plt.barh(range(len(labels)), impacts, color='red', alpha=0.7)
-        plt.yticks(range(len(labels)), labels, fontsize=10)
-        plt.xlabel('Total Time Impact (ms)')
-        plt.title('Top System Call Bottlenecks', fontsize=16, fontweight='bold')
-        
-        # Add value labels
-        for i, (bar, impact) in enumerate(zip(bars, impacts)):
-            plt.text(bar.get_width() + max(impacts)*0.01, bar.get_y() + bar.get_height()/2,
-                    f'{impact:.0f}ms', va='center', fontsize=9)
-        
-        plt.tight_layout()
-        plt.savefig(f'{output_dir}/bottleneck_chart.png', dpi=300, bbox_inches='tight')
-        plt.close()
+        if not top_bottlenecks:
+            print("⚠️  No bottlenecks to chart")
+            return
+        chart_data = {
+            'labels': [f"{proc}\n{act}" for (proc, act), _ in top_bottlenecks],
+            'impacts': [stats['total_time'] for _, stats in top_bottlenecks]
+        }
+        self.render_queue.submit_plot('bottleneck_chart', _plot_bottleneck_chart, chart_data,
+                                      f'{output_dir}/bottleneck_chart')
         
-        print(f"📊 Visualization saved to {output_dir}/bottleneck_chart.png")
+        print(f"📊 Visualization queued for {output_dir}/bottleneck_chart")
     
     def print_summary(self):
         """Print analysis summary"""
@@ -363,18 +418,30 @@ Provide specific technical details and realistic estimates.
         print(f"• Time Lost: {overview['bottleneck_time_seconds']:.1f} seconds")
         
         print(f"\n🔥 TOP 5 CRITICAL BOTTLENECKS:")
+        if not self.bottleneck_data['critical_combinations']:
+            print("• None - no events exceed the bottleneck threshold")
         for i, ((process, activity), stats) in enumerate(list(self.bottleneck_data['critical_combinations'].items())[:5], 1):
             print(f"{i}. {process} → {activity}")
             print(f"   Impact: {stats['total_time']:.1f}ms ({stats['frequency']} events)")
+        
+        print(f"\n⏳ CASE FLOW (share of case time waiting):")
+        for process, flow in self.bottleneck_data['case_flow'].items():
+            print(f"• {process}: {flow['waiting_share']*100:.1f}% waiting, "
+                  f"{flow['mean_throughput_ms']:.1f}ms mean throughput over {flow['cases']:,} cases")
+        
+        if self.bottleneck_data['what_if']:
+            print(f"\n🧪 LOCAL SOLUTIONS, SIMULATED ON THIS LOG:")
+            for line in self.bottleneck_data['what_if']:
+                print(f"• {line}")
     
-    def run_complete_analysis(self, csv_file="enhanced_system_call_log_95249_events_20250610_143122.csv"):
+    def run_complete_analysis(self, csv_file="enhanced_system_call_log_95249_events_20250610_143122.csv", threshold_model=None):
         """Run complete bottleneck analysis pipeline"""
         
         print("🚀 AUTOMATED BOTTLENECK ANALYSIS")
         print("="*50)
         
         # Step 1: Load and analyze data
-        if not self.load_and_analyze(csv_file):
+        if not self.load_and_analyze(csv_file, threshold_model=threshold_model):
             print("❌ Failed to load data")
             return
         
@@ -389,6 +456,7 @@ Provide specific technical details and realistic estimates.
         
         # Step 5: Print summary
         self.print_summary()
+        self.render_queue.wait()
         
         print("\n✅ Analysis Complete!")
         print("📂 Check 'bottleneck_analysis_results/' for detailed results")
@@ -398,10 +466,32 @@ Provide specific technical details and realistic estimates.
             'solutions': solutions
         }
 
+def _plot_bottleneck_chart(data):
+    """Draw the top bottleneck bar chart (runs in a render worker)"""
+    labels = data['labels']
+    impacts = data['impacts']
+    
+    # Create simple bar chart of top bottlenecks
+    fig = plt.figure(figsize=(12, 8))
+    
+    bars = plt.barh(range(len(labels)), impacts, color='red', alpha=0.7)
+    plt.yticks(range(len(labels)), labels, fontsize=10)
+    plt.xlabel('Total Time Impact (ms)')
+    plt.title('Top System Call Bottlenecks', fontsize=16, fontweight='bold')
+    
+    # Add value labels
+    for i, (bar, impact) in enumerate(zip(bars, impacts)):
+        plt.text(bar.get_width() + max(impacts)*0.01, bar.get_y() + bar.get_height()/2,
+                f'{impact:.0f}ms', va='center', fontsize=9)
+    
+    plt.tight_layout()
+    return fig
+
 def main():
     """Main execution function"""
     solver = SimpleBottleneckSolver()
     results = solver.run_complete_analysis()
+    solver.render_queue.shutdown()
     return results
 
 if __name__ == "__main__":
@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+
+
+def case_metrics(df, case_col='case_id', timestamp_col='timestamp', duration_col='duration_ms',
+                 resource_col='resource'):
+    """
+    End-to-end timing of every case in one grouped pass
+
+    An event's timestamp is its completion time, so it started duration_ms
+    earlier. Events are ordered by (case, start) once; case bounds, service
+    time and idle gaps are then reduceat/accumulate operations over all cases
+    at once. A gap is the time between an event starting and the latest end
+    of the case's earlier events (overlapping calls leave no gap). When the
+    log has queue_wait_ms (load profiles), the part of each call spent queued
+    for a shared resource is reported separately from its service time.
+
+    Returns a DataFrame indexed by case with: resource, events, start, end,
+    throughput_ms, service_ms, queue_wait_ms, idle_ms, max_gap_ms and
+    waiting_share ((queue wait + idle) / throughput).
+    """
+    if len(df) == 0:
+        return pd.DataFrame(columns=['resource', 'events', 'start', 'end', 'throughput_ms', 'service_ms',
+                                     'queue_wait_ms', 'idle_ms', 'max_gap_ms', 'waiting_share'])
+
+    case_codes, cases = pd.factorize(df[case_col])
+    end_us = df[timestamp_col].values.astype('datetime64[us]').astype(np.int64)
+    durations = df[duration_col].to_numpy(dtype=np.float64)
+    start_us = end_us - np.round(durations * 1000).astype(np.int64)
+    queue_wait = (df['queue_wait_ms'].to_numpy(dtype=np.float64) if 'queue_wait_ms' in df.columns
+                  else np.zeros(len(df)))
+
+    order = np.lexsort((start_us, case_codes))
+    case_codes, start_us, end_us = case_codes[order], start_us[order], end_us[order]
+    durations, queue_wait = durations[order], queue_wait[order]
+    bounds = np.flatnonzero(np.r_[True, case_codes[1:] != case_codes[:-1]])
+    counts = np.diff(np.r_[bounds, len(case_codes)])
+    dense = np.repeat(np.arange(len(bounds)), counts)
+
+    case_start = np.minimum.reduceat(start_us, bounds)
+    case_end = np.maximum.reduceat(end_us, bounds)
+
+    # Running latest end within each case: offset every case past the previous one's range
+    relative_end = end_us - case_start[dense]
+    stride = int(relative_end.max()) + 1
+    running_end = np.maximum.accumulate(dense.astype(np.int64) * stride + relative_end) - dense * stride
+    previous_end = np.r_[0, running_end[:-1]] + case_start[dense]
+    gaps = np.where(np.r_[True, dense[1:] != dense[:-1]], 0, np.maximum(start_us - previous_end, 0)) / 1000
+
+    throughput = (case_end - case_start) / 1000
+    total_queue = np.add.reduceat(queue_wait, bounds)
+    idle = np.add.reduceat(gaps, bounds)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        waiting_share = np.where(throughput > 0, (total_queue + idle) / throughput, 0.0)
+
+    return pd.DataFrame({
+        'resource': df[resource_col].to_numpy()[order][bounds],
+        'events': counts,
+        'start': pd.to_datetime(case_start, unit='us'),
+        'end': pd.to_datetime(case_end, unit='us'),
+        'throughput_ms': throughput,
+        'service_ms': np.add.reduceat(durations, bounds) - total_queue,
+        'queue_wait_ms': total_queue,
+        'idle_ms': idle,
+        'max_gap_ms': np.maximum.reduceat(gaps, bounds),
+        'waiting_share': waiting_share
+    }, index=pd.Index(np.asarray(cases)[case_codes[bounds]], name=case_col))
+
+
+def summarize_cases(metrics, by='resource'):
+    """
+    Per-group case flow summary, sorted by the share of case time spent waiting
+
+    waiting_share is time-weighted: total (queue wait + idle) over total throughput.
+    """
+    grouped = metrics.groupby(by, observed=True)
+    summary = grouped.agg(
+        cases=('events', 'size'),
+        mean_throughput_ms=('throughput_ms', 'mean'),
+        p95_throughput_ms=('throughput_ms', lambda t: t.quantile(0.95)),
+        mean_service_ms=('service_ms', 'mean'),
+        mean_queue_wait_ms=('queue_wait_ms', 'mean'),
+        mean_idle_ms=('idle_ms', 'mean'),
+        max_gap_ms=('max_gap_ms', 'max')
+    )
+    totals = grouped[['throughput_ms', 'queue_wait_ms', 'idle_ms']].sum()
+    summary = summary.round(2)
+    summary['waiting_share'] = ((totals['queue_wait_ms'] + totals['idle_ms']) /
+                                totals['throughput_ms'].where(totals['throughput_ms'] > 0)).round(4)
+    return summary.sort_values('waiting_share', ascending=False)
@@ -0,0 +1,195 @@
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from artifact_cache import canonical_graph, fingerprint
+from trace_variants import extract_variants
+from event_schema import read_event_log
+
+
+def model_fingerprint(net, initial_marking, final_marking):
+    """
+    Fingerprint a Petri net by its labels, structure and markings
+
+    Place and transition names are ignored (the inductive miner names them
+    with random UUIDs), so rediscovering the same model gives the same key.
+    """
+    nodes = {t: f"transition {t.label!r}" for t in net.transitions}
+    nodes.update({p: f"place {initial_marking.get(p, 0)} {final_marking.get(p, 0)}" for p in net.places})
+    arcs = [(arc.source, arc.target, str(arc.weight)) for arc in net.arcs]
+    return fingerprint(canonical_graph(nodes, arcs))
+
+
+def _replay_variants(net, initial_marking, final_marking, variants):
+    """Token-replay each variant once (runs in a worker process)"""
+    from pm4py.algo.conformance.tokenreplay import algorithm as token_replay
+    from pm4py.objects.log.obj import EventLog, Trace, Event
+
+    log = EventLog([Trace([Event({'concept:name': activity}) for activity in variant])
+                    for variant in variants])
+    replayed = token_replay.apply(log, net, initial_marking, final_marking)
+    return [{
+        'trace_fitness': r['trace_fitness'],
+        'trace_is_fit': r['trace_is_fit'],
+        'missing_tokens': r['missing_tokens'],
+        'consumed_tokens': r['consumed_tokens'],
+        'remaining_tokens': r['remaining_tokens'],
+        'produced_tokens': r['produced_tokens'],
+        'problem_transitions': sorted(str(t.label or t.name) for t in r['transitions_with_problems'])
+    } for r in replayed]
+
+
+class ConformanceChecker:
+    def __init__(self, net, initial_marking, final_marking, cache_file="conformance_cache.pkl",
+                 max_workers=None, chunk_size=200, max_cache_entries=100_000):
+        """
+        Variant-level token replay against a discovered Petri net
+
+        Each distinct variant is replayed once and weighted by its frequency,
+        per-variant results are cached across runs, and uncached variants are
+        replayed in chunks across a worker pool.
+
+        Parameters:
+        - cache_file: Pickle file for per-variant replay results (None = in-memory only)
+        - max_workers: Pool size (None = CPU count, 0 = replay inline)
+        - chunk_size: Variants per worker task
+        - max_cache_entries: Cached (model, variant) results kept, least recently used dropped first
+        """
+        self.net = net
+        self.initial_marking = initial_marking
+        self.final_marking = final_marking
+        self.model_key = model_fingerprint(net, initial_marking, final_marking)
+        self.cache_file = cache_file
+        self.max_workers = max_workers
+        self.chunk_size = chunk_size
+        self.max_cache_entries = max_cache_entries
+        self.cache = self._load_cache()
+
+    def _load_cache(self):
+        if self.cache_file and os.path.exists(self.cache_file):
+            try:
+                with open(self.cache_file, 'rb') as f:
+                    return pickle.load(f)
+            except Exception as e:
+                print(f"⚠️  Ignoring unreadable conformance cache: {e}")
+        return {}
+
+    def _save_cache(self):
+        # The cache dict is kept in least-recently-used-first order
+        excess = len(self.cache) - self.max_cache_entries
+        if excess > 0:
+            for key in list(self.cache)[:excess]:
+                del self.cache[key]
+        if self.cache_file:
+            with open(self.cache_file, 'wb') as f:
+                pickle.dump(self.cache, f)
+
+    def _replay_missing(self, variants):
+        missing = [v for v in variants if (self.model_key, v) not in self.cache]
+        if not missing:
+            return 0
+
+        chunks = [missing[i:i + self.chunk_size] for i in range(0, len(missing), self.chunk_size)]
+        if self.max_workers == 0 or len(chunks) == 1:
+            results = [_replay_variants(self.net, self.initial_marking, self.final_marking, chunk)
+                       for chunk in chunks]
+        else:
+            with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+                futures = [executor.submit(_replay_variants, self.net, self.initial_marking,
+                                           self.final_marking, chunk) for chunk in chunks]
+                results = [future.result() for future in futures]
+
+        for chunk, chunk_results in zip(chunks, results):
+            for variant, result in zip(chunk, chunk_results):
+                self.cache[(self.model_key, variant)] = result
+        return len(missing)
+
+    def check(self, df, case_col='case_id', activity_col='activity', timestamp_col='timestamp'):
+        """
+        Measure how well an event frame fits the model
+
+        Returns a dict with log fitness, the share of fitting cases, a per-variant
+        table and the deviating cases.
+        """
+        print(f"\n=== Conformance Checking ===")
+        variants, case_variants = extract_variants(df, case_col, activity_col, timestamp_col)
+        if len(variants) == 0:
+            raise ValueError("No events to check")
+
+        replayed = self._replay_missing(list(variants['variant']))
+        # Move this check's entries to the recently used end
+        rows = []
+        for variant in variants['variant']:
+            key = (self.model_key, variant)
+            self.cache[key] = self.cache.pop(key)
+            rows.append(self.cache[key])
+        self._save_cache()
+        print(f"Variants: {len(variants):,} ({replayed:,} replayed, {len(variants) - replayed:,} from cache)")
+
+        results = pd.DataFrame(rows)
+        variant_table = pd.concat([variants, results], axis=1)
+        weights = variant_table['count'].to_numpy(dtype=np.float64)
+
+        # pm4py log fitness: token totals summed over all cases
+        missing = (variant_table['missing_tokens'] * weights).sum()
+        consumed = (variant_table['consumed_tokens'] * weights).sum()
+        remaining = (variant_table['remaining_tokens'] * weights).sum()
+        produced = (variant_table['produced_tokens'] * weights).sum()
+        log_fitness = 0.5 * (1 - missing / consumed if consumed else 1) + 0.5 * (1 - remaining / produced if produced else 1)
+
+        total_cases = weights.sum()
+        fit_cases = weights[variant_table['trace_is_fit'].to_numpy()].sum()
+        average_fitness = (variant_table['trace_fitness'] * weights).sum() / total_cases
+
+        deviating_ids = variant_table.index[~variant_table['trace_is_fit']]
+        deviating_cases = case_variants[case_variants.isin(deviating_ids)].rename('variant_id').reset_index()
+        deviating_cases.columns = ['case_id', 'variant_id']
+        deviating_cases['trace_fitness'] = variant_table['trace_fitness'].to_numpy()[deviating_cases['variant_id']]
+        deviating_cases = deviating_cases.sort_values('trace_fitness')
+
+        report = {
+            'log_fitness': log_fitness,
+            'average_trace_fitness': average_fitness,
+            'percentage_fit_cases': fit_cases / total_cases * 100,
+            'total_cases': int(total_cases),
+            'total_variants': len(variant_table),
+            'variants': variant_table,
+            'deviating_cases': deviating_cases
+        }
+
+        print(f"✅ Log fitness: {log_fitness:.3f}")
+        print(f"Average trace fitness: {average_fitness:.3f}")
+        print(f"Fitting cases: {report['percentage_fit_cases']:.1f}% of {report['total_cases']:,}")
+        print(f"Deviating cases: {len(deviating_cases):,}")
+        return report
+
+
+def main():
+    """Check a new daily log against a model discovered from a reference log"""
+    from process_mining_pipeline import SystemCallProcessMiner
+
+    reference_csv = input("Enter reference CSV file name: ").strip()
+    new_csv = input("Enter new CSV file name to check: ").strip()
+
+    try:
+        miner = SystemCallProcessMiner()
+        miner.load_data(reference_csv)
+        miner.preprocess_data(min_case_length=5, max_case_length=200)
+        miner.convert_to_event_log()
+        miner.discover_processes(['inductive'])
+
+        report = miner.check_conformance(read_event_log(new_csv))
+        output_file = "deviating_cases.csv"
+        report['deviating_cases'].to_csv(output_file, index=False)
+        print(f"✅ Deviating cases saved to {output_file}")
+
+    except FileNotFoundError as e:
+        print(f"❌ File not found: {e}")
+    except Exception as e:
+        print(f"❌ Error: {e}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,309 @@
+import numpy as np
+import pandas as pd
+from collections import OrderedDict
+
+from event_index import DurationSketch, EventIndex, sketches_by_group
+from event_schema import read_event_log
+
+# Timeline bucket widths (ns) tried in order until the view fits max_points
+TIMELINE_WIDTHS = [
+    10**9, 5 * 10**9, 15 * 10**9, 60 * 10**9, 5 * 60 * 10**9, 15 * 60 * 10**9,
+    3600 * 10**9, 3 * 3600 * 10**9, 6 * 3600 * 10**9, 24 * 3600 * 10**9
+]
+TILE_BUCKETS = 256
+
+
+class DashboardAggregator:
+    def __init__(self, index, cache_size=512):
+        """
+        Server-side aggregation for the dashboard views
+
+        All views read from the shared EventIndex and DurationSketches and are
+        cached per filter combination, so the browser only ever receives
+        aggregated tables and downsampled timelines.
+        """
+        self.index = index
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+
+    def _cached(self, key, compute):
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+        value = compute()
+        self._cache[key] = value
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return value
+
+    def filter_options(self):
+        """Resources, activities and time bounds for the filter controls"""
+        first, last = self.index.time_bounds
+        return {
+            'resources': self.index.resources,
+            'activities': self.index.activities,
+            'start': first,
+            'end': last
+        }
+
+    def _combined_codes(self, positions):
+        n_activities = len(self.index.activities)
+        return (self.index.resource_codes[positions].astype(np.int64) * n_activities
+                + self.index.activity_codes[positions])
+
+    def _decode_combined(self, codes):
+        n_activities = len(self.index.activities)
+        return [(self.index.resources[c // n_activities], self.index.activities[c % n_activities]) for c in codes]
+
+    def baseline_view(self, resource=None, activity=None, start=None, end=None):
+        """Per (resource, activity) duration baselines from sketches"""
+        key = ('baseline', resource, activity, start, end)
+        return self._cached(key, lambda: self._baseline_view(resource, activity, start, end))
+
+    def _baseline_view(self, resource, activity, start, end):
+        positions = self.index.select(resource, activity, start, end)
+        codes = self._combined_codes(positions)
+        present, group_codes = np.unique(codes, return_inverse=True)
+        sketches = sketches_by_group(group_codes, self.index.durations[positions], len(present))
+
+        rows = []
+        for (res, act), sketch in zip(self._decode_combined(present), sketches):
+            p50, p95, p99 = sketch.quantile([0.5, 0.95, 0.99])
+            rows.append({
+                'resource': res, 'activity': act, 'count': sketch.count,
+                'mean_ms': sketch.mean, 'p50_ms': p50, 'p95_ms': p95, 'p99_ms': p99,
+                'total_s': sketch.total / 1000
+            })
+        columns = ['resource', 'activity', 'count', 'mean_ms', 'p50_ms', 'p95_ms', 'p99_ms', 'total_s']
+        return pd.DataFrame(rows, columns=columns).sort_values('total_s', ascending=False)
+
+    def bottleneck_view(self, resource=None, activity=None, start=None, end=None,
+                        threshold_percentile=95, top_n=15):
+        """Top (resource, activity) bottlenecks above the selection's percentile threshold"""
+        key = ('bottleneck', resource, activity, start, end, threshold_percentile, top_n)
+        return self._cached(key, lambda: self._bottleneck_view(resource, activity, start, end,
+                                                               threshold_percentile, top_n))
+
+    def _bottleneck_view(self, resource, activity, start, end, threshold_percentile, top_n):
+        positions = self.index.select(resource, activity, start, end)
+        durations = self.index.durations[positions]
+        threshold = DurationSketch().add(durations).quantile(threshold_percentile / 100)
+        slow = durations > threshold
+
+        codes = self._combined_codes(positions[slow])
+        present, inverse = np.unique(codes, return_inverse=True)
+        counts = np.bincount(inverse, minlength=len(present))
+        totals = np.bincount(inverse, weights=durations[slow], minlength=len(present))
+
+        table = pd.DataFrame(self._decode_combined(present), columns=['resource', 'activity'])
+        table['Count'] = counts
+        table['Mean_Duration'] = totals / np.maximum(counts, 1)
+        table['Total_Time_s'] = totals / 1000
+        table = table.sort_values('Count', ascending=False).head(top_n)
+        return {'threshold_ms': threshold, 'bottleneck_events': int(slow.sum()),
+                'total_events': len(positions), 'table': table}
+
+    def sequence_view(self, resource=None, start=None, end=None, top_n=20):
+        """Most frequent directly-follows transitions with the mean latency of the next call"""
+        key = ('sequence', resource, start, end, top_n)
+        return self._cached(key, lambda: self._sequence_view(resource, start, end, top_n))
+
+    def _sequence_view(self, resource, start, end, top_n):
+        positions = self.index.select(resource, None, start, end)
+        # Index order is time order; a stable sort by case keeps each case chronological
+        positions = positions[np.argsort(self.index.case_codes[positions], kind='stable')]
+        cases = self.index.case_codes[positions]
+        activities = self.index.activity_codes[positions].astype(np.int64)
+        same_case = cases[1:] == cases[:-1]
+
+        n_activities = len(self.index.activities)
+        pair_codes = (activities[:-1] * n_activities + activities[1:])[same_case]
+        next_durations = self.index.durations[positions][1:][same_case]
+        present, inverse = np.unique(pair_codes, return_inverse=True)
+        counts = np.bincount(inverse, minlength=len(present))
+        totals = np.bincount(inverse, weights=next_durations, minlength=len(present))
+
+        table = pd.DataFrame({
+            'from_activity': [self.index.activities[c // n_activities] for c in present],
+            'to_activity': [self.index.activities[c % n_activities] for c in present],
+            'count': counts,
+            'mean_next_ms': totals / np.maximum(counts, 1)
+        })
+        return table.sort_values('count', ascending=False).head(top_n)
+
+    def process_view(self, resource, start=None, end=None):
+        """Activity mix and duration distribution for one process"""
+        key = ('process', resource, start, end)
+        return self._cached(key, lambda: self._process_view(resource, start, end))
+
+    def _process_view(self, resource, start, end):
+        positions = self.index.select(resource, None, start, end)
+        activity_codes = self.index.activity_codes[positions]
+        durations = self.index.durations[positions]
+        n_activities = len(self.index.activities)
+        counts = np.bincount(activity_codes, minlength=n_activities)
+        totals = np.bincount(activity_codes, weights=durations, minlength=n_activities)
+        present = counts > 0
+
+        activities = pd.DataFrame({
+            'activity': np.array(self.index.activities, dtype=object)[present],
+            'count': counts[present],
+            'mean_ms': totals[present] / counts[present]
+        }).sort_values('count', ascending=False)
+        lower, upper, bucket_counts = DurationSketch().add(durations).histogram()
+        return {'activities': activities, 'duration_histogram': (lower, upper, bucket_counts),
+                'sessions': len(np.unique(self.index.case_codes[positions]))}
+
+    def timeline(self, resource=None, activity=None, start=None, end=None, max_points=500):
+        """
+        Downsampled event timeline (count, mean and max duration per bucket)
+
+        The bucket width is picked so the window fits max_points, and buckets are
+        computed in fixed, aligned tiles that are cached independently, so
+        panning and zooming only aggregates the tiles not seen before.
+        """
+        first, last = self.index.time_bounds
+        if first is None:
+            return pd.DataFrame(columns=['time', 'count', 'mean_ms', 'max_ms'])
+        start_ns = pd.Timestamp(start if start is not None else first).value
+        end_ns = pd.Timestamp(end if end is not None else last).value + 1
+
+        width = next((w for w in TIMELINE_WIDTHS if (end_ns - start_ns) / w <= max_points), TIMELINE_WIDTHS[-1])
+        tile_span = width * TILE_BUCKETS
+        tiles = [self._cached(('tile', resource, activity, width, tile),
+                              lambda tile=tile: self._timeline_tile(resource, activity, width, tile))
+                 for tile in range(start_ns // tile_span, end_ns // tile_span + 1)]
+
+        timeline = pd.concat(tiles, ignore_index=True)
+        in_window = (timeline['time_ns'] >= start_ns - width) & (timeline['time_ns'] < end_ns)
+        timeline = timeline[in_window & (timeline['count'] > 0)]
+        timeline.insert(0, 'time', pd.to_datetime(timeline['time_ns']))
+        return timeline.drop(columns='time_ns').reset_index(drop=True)
+
+    def _timeline_tile(self, resource, activity, width, tile):
+        tile_start = tile * width * TILE_BUCKETS
+        tile_end = tile_start + width * TILE_BUCKETS
+        positions = self.index.select(resource, activity, pd.Timestamp(tile_start), pd.Timestamp(tile_end))
+        buckets = (self.index.timestamps[positions] - tile_start) // width
+        durations = self.index.durations[positions]
+
+        counts = np.bincount(buckets, minlength=TILE_BUCKETS)
+        totals = np.bincount(buckets, weights=durations, minlength=TILE_BUCKETS)
+        maxima = np.zeros(TILE_BUCKETS)
+        np.maximum.at(maxima, buckets, durations)
+        return pd.DataFrame({
+            'time_ns': tile_start + np.arange(TILE_BUCKETS, dtype=np.int64) * width,
+            'count': counts,
+            'mean_ms': np.where(counts > 0, totals / np.maximum(counts, 1), np.nan),
+            'max_ms': maxima
+        })
+
+
+def create_app(aggregator):
+    """Build the Dash app (requires the optional dash/plotly dependencies)"""
+    try:
+        from dash import Dash, dcc, html, dash_table, Input, Output
+        import plotly.express as px
+    except ImportError as e:
+        raise ImportError("The dashboard requires dash and plotly: pip install dash plotly") from e
+
+    options = aggregator.filter_options()
+    app = Dash(__name__, title="System Call Bottleneck Dashboard")
+
+    app.layout = html.Div([
+        html.H2("System Call Process Mining Dashboard"),
+        html.Div([
+            dcc.Dropdown(id='resource', placeholder='All processes',
+                         options=[{'label': r, 'value': r} for r in options['resources']]),
+            dcc.Dropdown(id='activity', placeholder='All activities',
+                         options=[{'label': a, 'value': a} for a in options['activities']]),
+        ], style={'display': 'grid', 'gridTemplateColumns': '1fr 1fr', 'gap': '12px'}),
+        dcc.Graph(id='timeline'),
+        dcc.Store(id='window'),
+        dcc.Tabs(id='view', value='bottleneck', children=[
+            dcc.Tab(label='Bottlenecks', value='bottleneck'),
+            dcc.Tab(label='Baselines', value='baseline'),
+            dcc.Tab(label='Sequences', value='sequence'),
+            dcc.Tab(label='Process', value='process'),
+        ]),
+        html.Div(id='view-content')
+    ])
+
+    def table(df):
+        df = df.round(2)
+        return dash_table.DataTable(data=df.to_dict('records'), page_size=15,
+                                    columns=[{'name': c, 'id': c} for c in df.columns])
+
+    @app.callback(Output('window', 'data'), Input('timeline', 'relayoutData'))
+    def update_window(relayout):
+        # Zooming the timeline narrows every other view to the same window
+        if relayout and 'xaxis.range[0]' in relayout:
+            return [relayout['xaxis.range[0]'], relayout['xaxis.range[1]']]
+        return None
+
+    @app.callback(Output('timeline', 'figure'),
+                  Input('resource', 'value'), Input('activity', 'value'), Input('window', 'data'))
+    def update_timeline(resource, activity, window):
+        start, end = window if window else (None, None)
+        data = aggregator.timeline(resource, activity, start, end)
+        fig = px.line(data, x='time', y='count', hover_data=['mean_ms', 'max_ms'],
+                      title='Events over time (zoom to filter)')
+        fig.update_layout(uirevision=f"{resource}-{activity}")
+        return fig
+
+    @app.callback(Output('view-content', 'children'),
+                  Input('view', 'value'), Input('resource', 'value'),
+                  Input('activity', 'value'), Input('window', 'data'))
+    def update_view(view, resource, activity, window):
+        start, end = window if window else (None, None)
+        if view == 'bottleneck':
+            result = aggregator.bottleneck_view(resource, activity, start, end)
+            data = result['table'].assign(label=lambda d: d['resource'] + ' → ' + d['activity'])
+            fig = px.bar(data, x='Count', y='label', orientation='h',
+                         title=f"Bottlenecks above {result['threshold_ms']:.1f}ms "
+                               f"({result['bottleneck_events']:,} of {result['total_events']:,} events)")
+            return [dcc.Graph(figure=fig), table(result['table'])]
+        if view == 'baseline':
+            return [table(aggregator.baseline_view(resource, activity, start, end))]
+        if view == 'sequence':
+            data = aggregator.sequence_view(resource, start, end)
+            fig = px.bar(data.assign(transition=lambda d: d['from_activity'] + ' → ' + d['to_activity']),
+                         x='count', y='transition', orientation='h', color='mean_next_ms',
+                         title='Most frequent transitions')
+            return [dcc.Graph(figure=fig), table(data)]
+        if resource is None:
+            return [html.P("Select a process to see its activity profile.")]
+        result = aggregator.process_view(resource, start, end)
+        lower, upper, counts = result['duration_histogram']
+        histogram = px.bar(x=(lower + upper) / 2, y=counts, log_x=True,
+                           labels={'x': 'Duration (ms)', 'y': 'Events'}, title='Duration distribution')
+        activities = px.bar(result['activities'], x='activity', y='count', color='mean_ms',
+                            title=f"{resource} activity mix ({result['sessions']:,} sessions)")
+        return [dcc.Graph(figure=activities), dcc.Graph(figure=histogram)]
+
+    return app
+
+
+def main():
+    """Serve the dashboard locally"""
+    csv_file = input("Enter CSV file name (or press Enter for default): ").strip()
+    if not csv_file:
+        csv_file = 'system_call_log_large_373828_events.csv'
+
+    try:
+        print(f"Loading data from {csv_file}...")
+        raw_data = read_event_log(csv_file)
+        index = EventIndex(raw_data)
+        print(f"✅ Indexed {len(index):,} events")
+
+        app = create_app(DashboardAggregator(index))
+        print("🌐 Dashboard running at http://127.0.0.1:8050")
+        app.run(host='127.0.0.1', port=8050, debug=False)
+
+    except FileNotFoundError:
+        print(f"❌ File '{csv_file}' not found.")
+    except Exception as e:
+        print(f"❌ Error: {e}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+import numpy as np
+import pandas as pd
+
+
+class DurationSketch:
+    def __init__(self, relative_accuracy=0.01):
+        """
+        Mergeable log-bucket quantile sketch for durations (DDSketch style)
+
+        Every quantile is returned within relative_accuracy of the true value,
+        and the sketch size depends on the value range, not the event count.
+        """
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = np.log(self.gamma)
+        self.offset = 0
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.zero_count = 0
+        self.count = 0
+        self.total = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def bucket_index(self, values):
+        """Bucket index for each positive value"""
+        return np.ceil(np.log(values) / self.log_gamma).astype(np.int64)
+
+    def add(self, values):
+        """Add an array of durations"""
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return self
+        positive = values[values > 0]
+        self.zero_count += len(values) - len(positive)
+        if len(positive):
+            self._add_buckets(self.bucket_index(positive))
+        self.count += len(values)
+        self.total += float(values.sum())
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        return self
+
+    def _add_buckets(self, indexes, weights=None):
+        low, high = int(indexes.min()), int(indexes.max())
+        self._ensure_range(low, high)
+        np.add.at(self.counts, indexes - self.offset, 1 if weights is None else weights)
+
+    def _ensure_range(self, low, high):
+        if len(self.counts) == 0:
+            self.offset = low
+            self.counts = np.zeros(high - low + 1, dtype=np.int64)
+            return
+        new_low = min(low, self.offset)
+        new_high = max(high, self.offset + len(self.counts) - 1)
+        if new_low == self.offset and new_high == self.offset + len(self.counts) - 1:
+            return
+        counts = np.zeros(new_high - new_low + 1, dtype=np.int64)
+        counts[self.offset - new_low:self.offset - new_low + len(self.counts)] = self.counts
+        self.offset, self.counts = new_low, counts
+
+    def merge(self, other):
+        """Merge another sketch (same accuracy) into this one"""
+        if other.count == 0:
+            return self
+        if len(other.counts):
+            indexes = np.arange(other.offset, other.offset + len(other.counts))
+            nonzero = other.counts > 0
+            self._add_buckets(indexes[nonzero], other.counts[nonzero])
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else np.nan
+
+    def quantile(self, q):
+        """Approximate quantile (q in [0, 1], scalar or array)"""
+        if self.count == 0:
+            return np.nan if np.isscalar(q) else np.full(len(q), np.nan)
+        ranks = np.atleast_1d(np.asarray(q, dtype=np.float64)) * (self.count - 1)
+        cumulative = self.zero_count + np.cumsum(self.counts)
+        positions = np.searchsorted(cumulative, ranks, side='right')
+        values = 2 * self.gamma ** (positions + self.offset) / (self.gamma + 1)
+        values = np.where(ranks < self.zero_count, 0.0, values)
+        values = np.clip(values, self.min, self.max)
+        return float(values[0]) if np.isscalar(q) else values
+
+    def histogram(self):
+        """(bucket lower edges, bucket upper edges, counts) for the non-empty buckets"""
+        indexes = np.arange(self.offset, self.offset + len(self.counts))
+        nonzero = self.counts > 0
+        upper = self.gamma ** indexes[nonzero]
+        return upper / self.gamma, upper, self.counts[nonzero]
+
+    def sample(self, size, rng=None):
+        """Draw values from the sketched distribution (bucket midpoints)"""
+        rng = rng or np.random.default_rng()
+        lower, upper, counts = self.histogram()
+        values = np.concatenate([[0.0], (lower + upper) / 2])
+        weights = np.concatenate([[self.zero_count], counts]).astype(np.float64)
+        return rng.choice(values, size=size, p=weights / weights.sum())
+
+    def to_dict(self):
+        return {
+            'relative_accuracy': self.relative_accuracy, 'offset': self.offset,
+            'counts': self.counts, 'zero_count': self.zero_count, 'count': self.count,
+            'total': self.total, 'min': self.min, 'max': self.max
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(float(data['relative_accuracy']))
+        sketch.offset = int(data['offset'])
+        sketch.counts = np.asarray(data['counts'], dtype=np.int64)
+        sketch.zero_count = int(data['zero_count'])
+        sketch.count = int(data['count'])
+        sketch.total = float(data['total'])
+        sketch.min = float(data['min'])
+        sketch.max = float(data['max'])
+        return sketch
+
+
+def sketches_by_group(group_codes, values, n_groups, relative_accuracy=0.01):
+    """
+    Build one DurationSketch per group in a single vectorized pass
+
+    Parameters:
+    - group_codes: Integer group code per value (0..n_groups-1, negative = skip)
+    - values: Durations
+    - n_groups: Number of groups
+    """
+    group_codes = np.asarray(group_codes, dtype=np.int64)
+    values = np.asarray(values, dtype=np.float64)
+    valid = (group_codes >= 0) & ~np.isnan(values)
+    group_codes, values = group_codes[valid], values[valid]
+
+    sketches = [DurationSketch(relative_accuracy) for _ in range(n_groups)]
+    if len(values) == 0:
+        return sketches
+
+    template = sketches[0]
+    counts = np.bincount(group_codes, minlength=n_groups)
+    totals = np.bincount(group_codes, weights=values, minlength=n_groups)
+    mins = np.full(n_groups, np.inf)
+    maxs = np.full(n_groups, -np.inf)
+    np.minimum.at(mins, group_codes, values)
+    np.maximum.at(maxs, group_codes, values)
+    zeros = np.bincount(group_codes[values <= 0], minlength=n_groups)
+
+    positive = values > 0
+    buckets = template.bucket_index(values[positive])
+    pos_groups = group_codes[positive]
+    if len(buckets):
+        low = int(buckets.min())
+        width = int(buckets.max()) - low + 1
+        keys, key_counts = np.unique(pos_groups * width + (buckets - low), return_counts=True)
+        key_groups, key_buckets = keys // width, keys % width + low
+        boundaries = np.flatnonzero(np.diff(key_groups)) + 1
+        for start, end in zip(np.r_[0, boundaries], np.r_[boundaries, len(keys)]):
+            sketch = sketches[key_groups[start]]
+            sketch.offset = int(key_buckets[start])
+            sketch.counts = np.zeros(int(key_buckets[end - 1]) - sketch.offset + 1, dtype=np.int64)
+            sketch.counts[key_buckets[start:end] - sketch.offset] = key_counts[start:end]
+
+    for code, sketch in enumerate(sketches):
+        sketch.count = int(counts[code])
+        sketch.total = float(totals[code])
+        sketch.zero_count = int(zeros[code])
+        sketch.min = float(mins[code])
+        sketch.max = float(maxs[code])
+    return sketches
+
+
+class EventIndex:
+    def __init__(self, df):
+        """
+        Shared time-sorted, dictionary-encoded index over an event frame
+
+        Events are stored in timestamp order with integer codes for resource,
+        activity and case, so time-window and filter selections are a
+        searchsorted plus an integer mask instead of a scan over string columns.
+        """
+        timestamps = pd.to_datetime(df['timestamp'])
+        order = np.argsort(timestamps.values.astype('datetime64[ns]').astype(np.int64), kind='stable')
+
+        self.frame = df
+        self.order = order
+        self.timestamps = timestamps.values.astype('datetime64[ns]').astype(np.int64)[order]
+        self.durations = df['duration_ms'].to_numpy(dtype=np.float64)[order]
+
+        self.resource_codes, self.resources = self._encode(df['resource'], order)
+        self.activity_codes, self.activities = self._encode(df['activity'], order)
+        self.case_codes, self.cases = self._encode(df['case_id'], order)
+
+        # Per-resource positions for fast process-level slices
+        self.resource_positions = {
+            resource: np.flatnonzero(self.resource_codes == code)
+            for code, resource in enumerate(self.resources)
+        }
+
+    @staticmethod
+    def _encode(column, order):
+        codes, uniques = pd.factorize(column, sort=True)
+        return codes[order].astype(np.int32), list(uniques)
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    @property
+    def time_bounds(self):
+        """(first, last) event timestamp as pandas Timestamps"""
+        if len(self) == 0:
+            return None, None
+        return pd.Timestamp(self.timestamps[0]), pd.Timestamp(self.timestamps[-1])
+
+    def resource_code(self, resource):
+        return self.resources.index(resource) if resource in self.resources else -1
+
+    def activity_code(self, activity):
+        return self.activities.index(activity) if activity in self.activities else -1
+
+    def select(self, resource=None, activity=None, start=None, end=None):
+        """
+        Positions (in index order) of events matching the filters
+
+        Parameters:
+        - resource / activity: Exact match or None for all
+        - start / end: Time window (inclusive start, exclusive end)
+        """
+        low = 0 if start is None else np.searchsorted(self.timestamps, pd.Timestamp(start).value, side='left')
+        high = len(self) if end is None else np.searchsorted(self.timestamps, pd.Timestamp(end).value, side='left')
+
+        if resource is not None:
+            positions = self.resource_positions.get(resource, np.zeros(0, dtype=np.int64))
+            positions = positions[(positions >= low) & (positions < high)]
+        else:
+            positions = np.arange(low, high)
+
+        if activity is not None:
+            positions = positions[self.activity_codes[positions] == self.activity_code(activity)]
+        return positions
+
+    def rows(self, positions):
+        """Original frame rows for index positions"""
+        return self.frame.iloc[self.order[positions]]
@@ -0,0 +1,116 @@
+import numpy as np
+import pandas as pd
+
+
+# Column dtypes for generated and loaded event logs. Low-cardinality strings are
+# categoricals (one code per event instead of one Python string), numbers are
+# narrowed to the precision the generator actually produces.
+EVENT_LOG_SCHEMA = {
+    'case_id': 'category',
+    'activity': 'category',
+    'resource': 'category',
+    'workflow_type': 'category',
+    'business_process': 'category',
+    'process_stage': 'category',
+    'stage_description': 'category',
+    'pid': 'int32',
+    'tid': 'int32',
+    'file_path': 'category',
+    'operation_category': 'category',
+    'duration_ms': 'float32',
+    'result': 'category',
+    'is_bottleneck': 'bool',
+    'bottleneck_type': 'category',
+    'event_quality': 'category',
+    'anomaly_score': 'float32',
+    # Load profile simulation columns
+    'shared_resource': 'category',
+    'queue_wait_ms': 'float32',
+    'concurrency': 'int32'
+}
+
+# pm4py alias columns written by the generator; the analysers rebuild them
+# (as strings, which pm4py requires) only when converting to pm4py
+PM4PY_COLUMNS = ['case:concept:name', 'concept:name', 'time:timestamp', 'org:resource']
+
+TIMESTAMP_COLUMNS = ['timestamp']
+
+
+def apply_event_schema(df):
+    """Convert an event frame's columns to EVENT_LOG_SCHEMA dtypes (in place)"""
+    for column, dtype in EVENT_LOG_SCHEMA.items():
+        if column in df.columns and str(df[column].dtype) != dtype:
+            df[column] = df[column].astype(dtype)
+    return _parse_timestamps(df)
+
+
+def _csv_options(csv_file, keep_pm4py_columns, kwargs):
+    header = pd.read_csv(csv_file, nrows=0).columns
+    dtypes = {column: dtype for column, dtype in EVENT_LOG_SCHEMA.items() if column in header}
+    dtypes.update(kwargs.pop('dtype', {}))
+    if not keep_pm4py_columns and 'usecols' not in kwargs:
+        kwargs['usecols'] = [column for column in header if column not in PM4PY_COLUMNS]
+    return dict(kwargs, dtype=dtypes)
+
+
+def _parse_timestamps(df):
+    for column in TIMESTAMP_COLUMNS:
+        if column in df.columns:
+            df[column] = pd.to_datetime(df[column])
+    return df
+
+
+def read_event_log(csv_file, keep_pm4py_columns=False, **kwargs):
+    """
+    Read an event log CSV straight into the compact schema
+
+    The pm4py alias columns are skipped unless keep_pm4py_columns is set.
+    """
+    return _parse_timestamps(pd.read_csv(csv_file, **_csv_options(csv_file, keep_pm4py_columns, kwargs)))
+
+
+def iter_event_log(csv_file, chunksize=100000, keep_pm4py_columns=False, **kwargs):
+    """Read an event log CSV as a stream of schema-typed chunks"""
+    options = _csv_options(csv_file, keep_pm4py_columns, kwargs)
+    with pd.read_csv(csv_file, chunksize=chunksize, **options) as reader:
+        for chunk in reader:
+            yield _parse_timestamps(chunk)
+
+
+def compact_categories(df):
+    """Drop categories no longer present after filtering (in place)"""
+    for column in df.select_dtypes('category').columns:
+        df[column] = df[column].cat.remove_unused_categories()
+    return df
+
+
+def widen_floats(df):
+    """float32 columns of an aggregate table as float64, so rounding displays cleanly"""
+    float32_columns = df.select_dtypes('float32').columns
+    return df.astype({column: 'float64' for column in float32_columns}) if len(float32_columns) else df
+
+
+def memory_report(df, reference=None):
+    """
+    Per-column memory usage of an event frame
+
+    Parameters:
+    - reference: Optional frame with the same columns (e.g. the plain read_csv
+      result) to compare against
+
+    Returns a DataFrame with dtype and bytes per column, plus the reduction
+    factor when a reference is given.
+    """
+    usage = df.memory_usage(deep=True, index=False)
+    report = pd.DataFrame({'dtype': df.dtypes.astype(str), 'bytes': usage})
+    if reference is not None:
+        reference_usage = reference.memory_usage(deep=True, index=False)
+        report['reference_bytes'] = reference_usage.reindex(report.index)
+        report['reduction'] = report['reference_bytes'] / report['bytes'].replace(0, np.nan)
+
+    total = usage.sum()
+    print(f"Event frame memory: {total / 1024 ** 2:.2f} MB")
+    if reference is not None:
+        reference_total = reference_usage.sum()
+        print(f"Reference memory: {reference_total / 1024 ** 2:.2f} MB ({reference_total / total:.1f}x larger)")
+    return report.sort_values('bytes', ascending=False)
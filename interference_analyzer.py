@@ -0,0 +1,184 @@
+import numpy as np
+import pandas as pd
+
+from event_schema import read_event_log
+
+
+STATES = ['during', 'after', 'clear']
+
+
+class InterferenceAnalyzer:
+    def __init__(self, df, bottleneck_mask=None, threshold_model=None):
+        """
+        Relate events of different processes by time overlap
+
+        Every event is an interval [timestamp - duration_ms, timestamp]. For a
+        set of source ("aggressor") events, the starts and ends are sorted once;
+        the number of source calls active during any target event is then
+        count(source start < target end) - count(source end <= target start),
+        two binary searches per target event. The whole analysis is an
+        O(n log n) sort-and-search sweep with no pairwise comparisons.
+
+        Parameters:
+        - df: Event frame
+        - bottleneck_mask: Boolean array marking the bottleneck calls of df
+        - threshold_model: Fitted ThresholdModel deciding which source calls are
+          bottlenecks when no mask is given (None = the log's is_bottleneck
+          flag, or every call)
+        """
+        self.frame = df
+        self.end_us = df['timestamp'].values.astype('datetime64[us]').astype(np.int64)
+        self.start_us = self.end_us - np.round(df['duration_ms'].to_numpy(dtype=np.float64) * 1000).astype(np.int64)
+        if bottleneck_mask is not None:
+            self.slow = np.asarray(bottleneck_mask, dtype=bool)
+        elif threshold_model is not None:
+            self.slow = threshold_model.flag(df)
+        elif 'is_bottleneck' in df.columns:
+            self.slow = df['is_bottleneck'].to_numpy(dtype=bool)
+        else:
+            self.slow = np.ones(len(df), dtype=bool)
+        self._sources = {}
+
+    def _mask(self, resources=None, activities=None):
+        mask = np.ones(len(self.frame), dtype=bool)
+        if resources is not None:
+            mask &= self.frame['resource'].isin([resources] if isinstance(resources, str) else resources).to_numpy()
+        if activities is not None:
+            mask &= self.frame['activity'].isin([activities] if isinstance(activities, str) else activities).to_numpy()
+        return mask
+
+    def source_index(self, resource, activities=None, bottleneck_only=True):
+        """Sorted start and end arrays (µs) of the source calls, cached per selection"""
+        key = (resource, tuple(sorted([activities] if isinstance(activities, str) else activities or [])), bottleneck_only)
+        if key not in self._sources:
+            mask = self._mask(resource, activities)
+            if bottleneck_only:
+                mask &= self.slow
+            self._sources[key] = {
+                'positions': np.flatnonzero(mask),
+                'starts': np.sort(self.start_us[mask]),
+                'ends': np.sort(self.end_us[mask])
+            }
+        return self._sources[key]
+
+    def active_counts(self, source, target_mask):
+        """Number of source calls overlapping each target event"""
+        starts, ends = self.start_us[target_mask], self.end_us[target_mask]
+        return (np.searchsorted(source['starts'], ends, side='left') -
+                np.searchsorted(source['ends'], starts, side='right'))
+
+    def label_targets(self, source_resource, source_activities=None, target_resources=None,
+                      target_activities=None, bottleneck_only=True, window_ms=1000):
+        """
+        Target events labelled by their relation to the source calls
+
+        state is 'during' (overlaps at least one source call), 'after' (starts
+        within window_ms of a source call ending) or 'clear'. An as-of join
+        attaches the most recent source call that ended before each target
+        started: its activity and how long ago it ended.
+        """
+        source = self.source_index(source_resource, source_activities, bottleneck_only)
+        if target_resources is None:
+            target_resources = [r for r in self.frame['resource'].unique() if r != source_resource]
+        target_mask = self._mask(target_resources, target_activities)
+
+        targets = self.frame.loc[target_mask, ['case_id', 'resource', 'activity', 'duration_ms']].copy()
+        targets['start_us'] = self.start_us[target_mask]
+        targets['active_sources'] = self.active_counts(source, target_mask)
+
+        # As-of join: latest source call that ended at or before the target started
+        source_calls = pd.DataFrame({
+            'end_us': self.end_us[source['positions']],
+            'source_activity': self.frame['activity'].to_numpy()[source['positions']]
+        }).sort_values('end_us', kind='stable')
+        targets = pd.merge_asof(targets.sort_values('start_us', kind='stable'), source_calls,
+                                left_on='start_us', right_on='end_us', direction='backward')
+        targets['since_source_ms'] = (targets['start_us'] - targets['end_us']) / 1000
+
+        targets['state'] = pd.Categorical(
+            np.where(targets['active_sources'] > 0, 'during',
+                     np.where(targets['since_source_ms'] <= window_ms, 'after', 'clear')),
+            categories=STATES)
+        return targets.drop(columns=['end_us'])
+
+    def interference(self, source_resource, source_activities=None, target_resources=None,
+                     target_activities=None, by_activity=True, bottleneck_only=True, window_ms=1000):
+        """
+        Target latency distribution while source calls are active vs clear
+
+        Returns one row per target (resource[, activity]) with count, mean and
+        p50/p95/p99 duration per state, and the p95/mean uplift of 'during'
+        over 'clear', sorted by p95 uplift like scan().
+        """
+        targets = self.label_targets(source_resource, source_activities, target_resources,
+                                     target_activities, bottleneck_only, window_ms)
+        keys = ['resource', 'activity'] if by_activity else ['resource']
+        grouped = targets.groupby(keys + ['state'], observed=True)['duration_ms']
+        stats = pd.concat({
+            'count': grouped.size(),
+            'mean': grouped.mean(),
+            'p50': grouped.quantile(0.5),
+            'p95': grouped.quantile(0.95),
+            'p99': grouped.quantile(0.99)
+        }, axis=1).astype(np.float64).unstack('state')
+        stats.columns = [f"{state}_{metric}" for metric, state in stats.columns]
+
+        for metric in ['mean', 'p95']:
+            during, clear = f"during_{metric}", f"clear_{metric}"
+            if during in stats.columns and clear in stats.columns:
+                stats[f"{metric}_uplift"] = stats[during] / stats[clear]
+        ordered = [f"{state}_{metric}" for state in STATES for metric in ['count', 'mean', 'p50', 'p95', 'p99']]
+        uplift = [c for c in ['mean_uplift', 'p95_uplift'] if c in stats.columns]
+        stats = stats[[c for c in ordered if c in stats.columns] + uplift].round(2)
+        return stats.sort_values('p95_uplift', ascending=False) if 'p95_uplift' in stats.columns else stats
+
+    def scan(self, sources=None, bottleneck_only=True, min_events=30):
+        """
+        Process-to-process interference matrix
+
+        For every source process (its bottleneck calls) and every other
+        process, the mean and p95 uplift of the target's calls while the
+        source is active. Targets with fewer than min_events overlapping
+        calls are left out.
+        """
+        sources = sources or sorted(self.frame['resource'].unique())
+        rows = []
+        for source in sources:
+            stats = self.interference(source, by_activity=False, bottleneck_only=bottleneck_only)
+            if 'during_count' not in stats.columns:
+                continue
+            for target, row in stats[stats['during_count'] >= min_events].iterrows():
+                rows.append({'source': source, 'target': target, 'during_events': int(row['during_count']),
+                             'mean_uplift': row.get('mean_uplift', np.nan), 'p95_uplift': row.get('p95_uplift', np.nan)})
+        if not rows:
+            return pd.DataFrame(columns=['source', 'target', 'during_events', 'mean_uplift', 'p95_uplift'])
+        return pd.DataFrame(rows).sort_values('p95_uplift', ascending=False).reset_index(drop=True)
+
+
+def main():
+    """Show how other processes' file I/O behaves during guardian.exe scans"""
+    csv_file = input("Enter CSV file name: ").strip()
+    source = input("Source process (press Enter for guardian.exe): ").strip() or 'guardian.exe'
+    activities = input("Source activities, comma separated (press Enter for AnalyzeFile,ReadFile): ").strip()
+    activities = [a.strip() for a in (activities or 'AnalyzeFile,ReadFile').split(',')]
+
+    try:
+        df = read_event_log(csv_file)
+        analyzer = InterferenceAnalyzer(df)
+
+        print(f"\n=== Interference of {source} {'/'.join(activities)} bottlenecks ===")
+        stats = analyzer.interference(source, activities, ['notepad.exe', 'explorer.exe'],
+                                      ['ReadFile', 'WriteFile', 'CreateFile'])
+        print(stats)
+
+        print("\n=== Process-to-process interference (p95 uplift while source bottlenecks are active) ===")
+        print(analyzer.scan())
+        return stats
+
+    except FileNotFoundError as e:
+        print(f"❌ File not found: {e}")
+    except Exception as e:
+        print(f"❌ Error: {e}")
+
+if __name__ == "__main__":
+    main()
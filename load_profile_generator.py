@@ -0,0 +1,222 @@
+import heapq
+from collections import deque
+from datetime import datetime, timedelta
+
+from system_call_generator import EnhancedSystemCallGenerator
+
+
+# Relative arrival rate per hour of day (office-hours load with a lunch dip)
+DEFAULT_DIURNAL_CURVE = [
+    0.15, 0.10, 0.08, 0.08, 0.10, 0.20, 0.40, 0.70,
+    1.00, 1.20, 1.30, 1.20, 0.90, 1.10, 1.30, 1.25,
+    1.10, 0.90, 0.70, 0.60, 0.50, 0.40, 0.30, 0.20
+]
+
+# Shared resources: concurrent slots and how much each busy slot slows a call
+DEFAULT_RESOURCES = {
+    'disk': {'capacity': 4, 'load_sensitivity': 0.15},
+    'registry': {'capacity': 1, 'load_sensitivity': 0.0},
+    'network': {'capacity': 2, 'load_sensitivity': 0.05}
+}
+
+# Stages whose I/O and waits go over the network rather than the local disk
+NETWORK_STAGES = {'Network_Request', 'Definition_Update'}
+NETWORK_CALLS = {'CreateFile', 'ReadFile', 'WriteFile', 'WaitForSingleObject'}
+
+RESOURCE_BY_CATEGORY = {
+    'file_operations': 'disk',
+    'file_system': 'disk',
+    'registry_operations': 'registry'
+}
+
+
+class SharedResource:
+    def __init__(self, name, capacity, load_sensitivity=0.0):
+        """A FIFO-queued resource with a fixed number of concurrent slots"""
+        self.name = name
+        self.capacity = capacity
+        self.load_sensitivity = load_sensitivity
+        self.in_use = 0
+        self.queue = deque()
+        self.max_queue = 0
+        self.total_wait_ms = 0.0
+        self.served = 0
+
+
+class LoadProfileGenerator(EnhancedSystemCallGenerator):
+    def __init__(self, seed=None, diurnal_curve=None, resources=None, cpu_load_sensitivity=0.01):
+        """
+        Discrete-event load generator with overlapping cases and contention
+
+        Cases arrive following a diurnal curve and run concurrently on one
+        simulated timeline. Calls on the disk, the registry and the network
+        queue for a limited number of slots, slow down with the number of busy
+        slots, and all other calls slow down with the number of active cases.
+        A call's duration_ms is its queue wait plus service time.
+
+        Parameters:
+        - diurnal_curve: 24 relative arrival rates, one per hour of day
+        - resources: {name: {'capacity': slots, 'load_sensitivity': slowdown per busy slot}}
+        - cpu_load_sensitivity: Slowdown per additional active case for non-resource calls
+        """
+        super().__init__(seed=seed)
+        self.diurnal_curve = diurnal_curve or DEFAULT_DIURNAL_CURVE
+        if len(self.diurnal_curve) != 24:
+            raise ValueError("diurnal_curve needs one rate per hour (24 values)")
+        self.resource_config = resources or DEFAULT_RESOURCES
+        self.cpu_load_sensitivity = cpu_load_sensitivity
+
+    def _arrival_offsets(self, num_cases, base_time, time_span_hours):
+        """Case start offsets (ms from base_time) drawn from the diurnal curve"""
+        minutes = max(1, int(time_span_hours * 60))
+        weights = [self.diurnal_curve[(base_time + timedelta(minutes=m)).hour] for m in range(minutes)]
+        chosen = self.rng.choices(range(minutes), weights=weights, k=num_cases)
+        return sorted((m + self.rng.random()) * 60000 for m in chosen)
+
+    def _plan_case(self, workflow_type):
+        """The (stage, activity) sequence a case will execute"""
+        workflow = self.process_workflows[workflow_type]
+        plan = []
+        for stage in workflow['stages']:
+            for _ in range(self.rng.randint(2, 5)):
+                plan.append((stage, self._choose_activity(stage)))
+        return plan
+
+    def _resource_for(self, stage, activity):
+        if stage['stage_name'] in NETWORK_STAGES and activity in NETWORK_CALLS:
+            return 'network'
+        return RESOURCE_BY_CATEGORY.get(self._categorize_activity(activity))
+
+    def generate_load_profile(self, num_cases=1000, time_span_hours=24, base_time=None):
+        """
+        Simulate the timeline and return the event frame (same schema as the generator)
+
+        Also stores per-resource queueing statistics in self.resource_stats.
+        """
+        base_time = base_time or datetime.now() - timedelta(hours=time_span_hours)
+        resources = {name: SharedResource(name, **config) for name, config in self.resource_config.items()}
+        print(f"Simulating load profile with {num_cases} cases over {time_span_hours}h...")
+
+        timeline = []  # (time_ms, sequence, action, case)
+        sequence = 0
+        for case_id, offset in enumerate(self._arrival_offsets(num_cases, base_time, time_span_hours)):
+            workflow_type = self.rng.choices(
+                list(self.process_workflows.keys()),
+                weights=[w['weight'] for w in self.process_workflows.values()]
+            )[0]
+            case = {'case_id': case_id, 'workflow_type': workflow_type,
+                    'plan': self._plan_case(workflow_type), 'step': 0}
+            timeline.append((offset, sequence, 'arrive', case))
+            sequence += 1
+        heapq.heapify(timeline)
+
+        events = []
+        active_cases = 0
+        peak_active = 0
+
+        def schedule(time_ms, action, case):
+            nonlocal sequence
+            heapq.heappush(timeline, (time_ms, sequence, action, case))
+            sequence += 1
+
+        def start_service(now, resource, case, wait_ms):
+            resource.in_use += 1
+            case['wait_ms'] = wait_ms
+            case['service_ms'] = case['base_ms'] * (1 + resource.load_sensitivity * (resource.in_use - 1))
+            resource.total_wait_ms += wait_ms
+            resource.served += 1
+            schedule(now + case['service_ms'], 'complete', case)
+
+        while timeline:
+            now, _, action, case = heapq.heappop(timeline)
+
+            if action == 'arrive':
+                active_cases += 1
+                peak_active = max(peak_active, active_cases)
+                action = 'request'
+
+            if action == 'request':
+                workflow = self.process_workflows[case['workflow_type']]
+                stage, activity = case['plan'][case['step']]
+                is_bottleneck, _ = self._bottleneck_info(workflow, activity)
+                case['base_ms'] = self.rng.uniform(100, 1000) if is_bottleneck else self.rng.uniform(1, 50)
+                case['resource'] = self._resource_for(stage, activity)
+                case['concurrency'] = active_cases
+
+                resource = resources.get(case['resource'])
+                if resource is None:
+                    case['wait_ms'] = 0.0
+                    case['service_ms'] = case['base_ms'] * (1 + self.cpu_load_sensitivity * (active_cases - 1))
+                    schedule(now + case['service_ms'], 'complete', case)
+                elif resource.in_use < resource.capacity:
+                    start_service(now, resource, case, 0.0)
+                else:
+                    resource.queue.append((now, case))
+                    resource.max_queue = max(resource.max_queue, len(resource.queue))
+
+            elif action == 'complete':
+                workflow_type = case['workflow_type']
+                workflow = self.process_workflows[workflow_type]
+                stage, activity = case['plan'][case['step']]
+                is_bottleneck, bottleneck_type = self._bottleneck_info(workflow, activity)
+                delay = case['wait_ms'] + case['service_ms']
+
+                event = self._build_event(workflow_type, case['case_id'], stage, activity,
+                                          base_time + timedelta(milliseconds=now),
+                                          delay, is_bottleneck, bottleneck_type)
+                event['shared_resource'] = case['resource']
+                event['queue_wait_ms'] = round(case['wait_ms'], 2)
+                event['concurrency'] = case['concurrency']
+                events.append(event)
+
+                # Hand the slot to the next queued call
+                resource = resources.get(case['resource'])
+                if resource is not None:
+                    resource.in_use -= 1
+                    if resource.queue:
+                        queued_at, waiting = resource.queue.popleft()
+                        start_service(now, resource, waiting, now - queued_at)
+
+                case['step'] += 1
+                if case['step'] < len(case['plan']):
+                    schedule(now, 'request', case)
+                else:
+                    active_cases -= 1
+
+        self.resource_stats = {
+            name: {
+                'served': r.served,
+                'avg_wait_ms': r.total_wait_ms / r.served if r.served else 0.0,
+                'max_queue': r.max_queue
+            }
+            for name, r in resources.items()
+        }
+
+        df = self.events_to_frame(events)
+        print(f"Generated {len(df):,} events, peak concurrency {peak_active} active cases")
+        for name, stats in self.resource_stats.items():
+            print(f"  {name}: {stats['served']:,} calls, avg wait {stats['avg_wait_ms']:.1f}ms, "
+                  f"max queue {stats['max_queue']}")
+        return df
+
+
+def main():
+    """Generate a contention-aware load profile"""
+    print("Load Profile Generator")
+    print("=" * 50)
+
+    num_cases = int(input("Number of cases (default 2000): ").strip() or 2000)
+    time_span = float(input("Time span in hours (default 24): ").strip() or 24)
+    seed_input = input("Seed (press Enter for random): ").strip()
+
+    generator = LoadProfileGenerator(seed=int(seed_input) if seed_input else None)
+    event_log = generator.generate_load_profile(num_cases=num_cases, time_span_hours=time_span)
+    main_file = generator.save_enhanced_log(event_log, filename_prefix='load_profile_system_call_log')
+
+    print(f"Load profile generation complete!")
+    print(f"File: {main_file}")
+    return event_log
+
+
+if __name__ == "__main__":
+    main()
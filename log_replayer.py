@@ -0,0 +1,223 @@
+import queue
+import socket
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from event_schema import iter_event_log
+from event_index import DurationSketch
+
+
+END_OF_REPLAY = None
+
+
+class QueueSink:
+    def __init__(self, maxsize=64):
+        """
+        In-process sink: batches go onto a bounded queue.Queue
+
+        put() blocks while the queue is full, which is the backpressure that
+        slows the replay down to the consumer's pace.
+        """
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.max_depth = 0
+
+    def send(self, emitted_at, batch):
+        self.queue.put((emitted_at, batch))
+        self.max_depth = max(self.max_depth, self.queue.qsize())
+
+    def close(self):
+        self.queue.put(END_OF_REPLAY)
+
+
+class PipeSink:
+    def __init__(self, connection):
+        """Sink for a multiprocessing Pipe end; send() blocks when the pipe buffer is full"""
+        self.connection = connection
+
+    def send(self, emitted_at, batch):
+        self.connection.send((emitted_at, batch))
+
+    def close(self):
+        self.connection.send(END_OF_REPLAY)
+        self.connection.close()
+
+
+class SocketSink:
+    def __init__(self, host='127.0.0.1', port=9009):
+        """
+        TCP sink writing one JSON event per line
+
+        sendall() blocks while the receiver's window is full, so a slow reader
+        applies backpressure through TCP flow control.
+        """
+        self.sock = socket.create_connection((host, port))
+
+    def send(self, emitted_at, batch):
+        lines = batch.to_json(orient='records', lines=True, date_format='iso', date_unit='us')
+        self.sock.sendall(lines.encode() + (b'' if lines.endswith('\n') else b'\n'))
+
+    def close(self):
+        self.sock.close()
+
+
+class LogReplayer:
+    def __init__(self, source, speedup=1.0, batch_size=1000, chunksize=100000):
+        """
+        Replay a stored event log in timestamp order against the wall clock
+
+        Parameters:
+        - source: CSV file (streamed in chunks, expected time-ordered as the
+          generators write it) or an event DataFrame
+        - speedup: 1 = real time, 10 / 1000 = faster, None = as fast as possible
+        - batch_size: Maximum events per send (events due at the same moment
+          are batched together)
+        """
+        if speedup is not None and speedup <= 0:
+            raise ValueError("speedup must be positive or None")
+        self.source = source
+        self.speedup = speedup
+        self.batch_size = batch_size
+        self.chunksize = chunksize
+        self.stats = {}
+
+    def _chunks(self):
+        if isinstance(self.source, pd.DataFrame):
+            frame = self.source.sort_values('timestamp', kind='stable')
+            for start in range(0, len(frame), self.chunksize):
+                yield frame.iloc[start:start + self.chunksize]
+        else:
+            for chunk in iter_event_log(self.source, chunksize=self.chunksize):
+                yield chunk.sort_values('timestamp', kind='stable')
+
+    def replay(self, sink):
+        """
+        Stream every event into the sink and return replay statistics
+
+        Statistics: events, batches, achieved events/s, schedule lag (how far
+        sends fell behind the replay clock, which grows when the consumer
+        applies backpressure) and time spent blocked in the sink.
+        """
+        print(f"\n=== Replaying log at {'max speed' if self.speedup is None else f'{self.speedup:g}x'} ===")
+        events = batches = 0
+        blocked = 0.0
+        lag_sketch = DurationSketch()
+        started = time.perf_counter()
+        first_ts = None
+
+        try:
+            for chunk in self._chunks():
+                ts = chunk['timestamp'].values.astype('datetime64[ns]').astype(np.int64)
+                if first_ts is None and len(ts):
+                    first_ts = ts[0]
+                position = 0
+                while position < len(chunk):
+                    if self.speedup is None:
+                        end = min(position + self.batch_size, len(chunk))
+                        lag_ms = 0.0
+                    else:
+                        # Wait until the next event is due, then take everything due by now
+                        due = started + (ts[position] - first_ts) / 1e9 / self.speedup
+                        wait = due - time.perf_counter()
+                        if wait > 0:
+                            time.sleep(wait)
+                        now_ts = first_ts + (time.perf_counter() - started) * self.speedup * 1e9
+                        end = min(int(np.searchsorted(ts, now_ts, side='right')), position + self.batch_size)
+                        end = max(end, position + 1)
+                        lag_ms = max(0.0, (time.perf_counter() - due) * 1000)
+
+                    before = time.perf_counter()
+                    sink.send(time.time(), chunk.iloc[position:end])
+                    blocked += time.perf_counter() - before
+
+                    lag_sketch.add([lag_ms])
+                    events += end - position
+                    batches += 1
+                    position = end
+        finally:
+            sink.close()
+
+        elapsed = time.perf_counter() - started
+        self.stats = {
+            'events': events,
+            'batches': batches,
+            'elapsed_seconds': elapsed,
+            'events_per_second': events / elapsed if elapsed else 0.0,
+            'schedule_lag_p50_ms': lag_sketch.quantile(0.5),
+            'schedule_lag_p99_ms': lag_sketch.quantile(0.99),
+            'schedule_lag_max_ms': lag_sketch.max if lag_sketch.count else 0.0,
+            'blocked_seconds': blocked
+        }
+        if isinstance(sink, QueueSink):
+            self.stats['max_queue_depth'] = sink.max_depth
+
+        print(f"✅ Replayed {events:,} events in {elapsed:.1f}s ({self.stats['events_per_second']:,.0f} events/s)")
+        print(f"Schedule lag: p50 {self.stats['schedule_lag_p50_ms']:.1f}ms, "
+              f"p99 {self.stats['schedule_lag_p99_ms']:.1f}ms, max {self.stats['schedule_lag_max_ms']:.1f}ms")
+        print(f"Blocked on consumer: {blocked:.2f}s")
+        return self.stats
+
+
+def consume(source, handler):
+    """
+    Drain a QueueSink queue or Pipe connection, calling handler(batch) per batch
+
+    Returns consumer statistics: events, batches and consumer lag (time from
+    a batch being emitted to the handler finishing with it).
+    """
+    receive = source.get if isinstance(source, queue.Queue) else source.recv
+    lag_sketch = DurationSketch()
+    events = batches = 0
+    while True:
+        item = receive()
+        if item is END_OF_REPLAY:
+            break
+        emitted_at, batch = item
+        handler(batch)
+        lag_sketch.add([(time.time() - emitted_at) * 1000])
+        events += len(batch)
+        batches += 1
+    return {
+        'events': events,
+        'batches': batches,
+        'consumer_lag_p50_ms': lag_sketch.quantile(0.5),
+        'consumer_lag_p99_ms': lag_sketch.quantile(0.99),
+        'consumer_lag_max_ms': lag_sketch.max if lag_sketch.count else 0.0
+    }
+
+
+def main():
+    """Replay a stored log into an in-process consumer tracking per-process p95 latency"""
+    csv_file = input("Enter CSV file name to replay: ").strip()
+    speed_input = input("Speed-up (1, 10, 1000, or 'max'; default 1000): ").strip().lower() or '1000'
+    speedup = None if speed_input == 'max' else float(speed_input)
+
+    try:
+        sketches = {}
+
+        def track_latency(batch):
+            for resource, durations in batch.groupby('resource', observed=True)['duration_ms']:
+                sketches.setdefault(resource, DurationSketch()).add(durations.to_numpy())
+
+        sink = QueueSink(maxsize=64)
+        results = {}
+        consumer = threading.Thread(target=lambda: results.update(consume(sink.queue, track_latency)))
+        consumer.start()
+        LogReplayer(csv_file, speedup=speedup).replay(sink)
+        consumer.join()
+
+        print(f"Consumer lag: p50 {results['consumer_lag_p50_ms']:.1f}ms, "
+              f"p99 {results['consumer_lag_p99_ms']:.1f}ms")
+        print("\n=== Streaming p95 latency by process ===")
+        for resource, sketch in sorted(sketches.items()):
+            print(f"  {resource}: {sketch.quantile(0.95):.1f}ms over {sketch.count:,} events")
+
+    except FileNotFoundError as e:
+        print(f"❌ File not found: {e}")
+    except Exception as e:
+        print(f"❌ Error: {e}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+import os
+import json
+import pickle
+from datetime import datetime, timedelta
+
+import numpy as np
+import pm4py
+from pm4py.objects.petri_net.obj import PetriNet
+
+from artifact_cache import fingerprint, atomic_write
+from trace_variants import extract_variants
+
+
+def variant_profile(variants):
+    """Variant multiset as {variant tuple: count}"""
+    return dict(zip(variants['variant'], variants['count'].astype(int)))
+
+
+def profile_similarity(a, b):
+    """Weighted Jaccard similarity of two variant distributions (1.0 = identical)"""
+    total_a, total_b = sum(a.values()), sum(b.values())
+    if total_a == 0 or total_b == 0:
+        return 0.0
+    keys = set(a) | set(b)
+    share_a = np.array([a.get(k, 0) / total_a for k in keys])
+    share_b = np.array([b.get(k, 0) / total_b for k in keys])
+    return float(np.minimum(share_a, share_b).sum() / np.maximum(share_a, share_b).sum())
+
+
+def is_petri_net_model(model):
+    """True for a (net, initial marking, final marking) triple"""
+    return isinstance(model, tuple) and len(model) == 3 and isinstance(model[0], PetriNet)
+
+
+class ModelStore:
+    def __init__(self, root="model_store", max_entries=50, max_age_days=30, similarity_threshold=0.98):
+        """
+        Persistent cache of discovered process models
+
+        Models are keyed by a fingerprint of the variant multiset plus the
+        discovery parameters. Logs whose variant distribution is near-identical
+        to a stored one (weighted Jaccard >= similarity_threshold) reuse it too.
+        Petri nets are stored as PNML (pickling a large net recurses too
+        deeply); other models are pickled. Variant profiles live in one
+        sidecar file, so similarity lookups never load the models themselves.
+
+        Parameters:
+        - root: Directory holding the models, index.json and profiles.pkl
+        - max_entries: Keep at most this many models (least recently used evicted first)
+        - max_age_days: Evict models not used for this many days (None = never)
+        - similarity_threshold: Minimum similarity for near-identical reuse (None = exact only)
+        """
+        self.root = root
+        self.max_entries = max_entries
+        self.max_age_days = max_age_days
+        self.similarity_threshold = similarity_threshold
+        self.index_file = os.path.join(root, "index.json")
+        self.profiles_file = os.path.join(root, "profiles.pkl")
+        os.makedirs(root, exist_ok=True)
+        self.index = self._load_index()
+        self.profiles = self._load_profiles()
+        # Entries from before the model format was recorded carry no sidecar profile
+        self._drop([k for k, meta in self.index.items() if 'format' not in meta])
+
+    def _load_index(self):
+        if os.path.exists(self.index_file):
+            try:
+                with open(self.index_file) as f:
+                    return json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"⚠️  Ignoring unreadable model store index: {e}")
+        return {}
+
+    def _load_profiles(self):
+        if os.path.exists(self.profiles_file):
+            try:
+                with open(self.profiles_file, 'rb') as f:
+                    return pickle.load(f)
+            except (OSError, pickle.UnpicklingError, EOFError) as e:
+                print(f"⚠️  Ignoring unreadable model store profiles: {e}")
+        return {}
+
+    def _save_index(self):
+        def write(path):
+            with open(path, 'w') as f:
+                json.dump(self.index, f, indent=2)
+        atomic_write(self.index_file, write)
+
+    def _save_profiles(self):
+        def write(path):
+            with open(path, 'wb') as f:
+                pickle.dump(self.profiles, f)
+        atomic_write(self.profiles_file, write)
+
+    def _model_file(self, key, model_format=None):
+        model_format = model_format or self.index[key]['format']
+        return os.path.join(self.root, f"{key}.{'pnml' if model_format == 'pnml' else 'pkl'}")
+
+    def _load_model(self, key):
+        path = self._model_file(key)
+        if self.index[key]['format'] == 'pnml':
+            return pm4py.read_pnml(path)
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+
+    def _write_model(self, key, model):
+        """Write a model file; returns its format"""
+        if is_petri_net_model(model):
+            atomic_write(self._model_file(key, 'pnml'), lambda path: pm4py.write_pnml(*model, path))
+            return 'pnml'
+
+        def write(path):
+            with open(path, 'wb') as f:
+                pickle.dump(model, f)
+        atomic_write(self._model_file(key, 'pickle'), write)
+        return 'pickle'
+
+    def _drop(self, keys):
+        for key in keys:
+            self.index.pop(key, None)
+            self.profiles.pop(key, None)
+            for model_format in ('pnml', 'pickle'):
+                path = self._model_file(key, model_format)
+                if os.path.exists(path):
+                    os.remove(path)
+        if keys:
+            self._save_index()
+            self._save_profiles()
+
+    def _touch(self, key):
+        self.index[key]['last_used'] = datetime.now().isoformat(timespec='seconds')
+        self._save_index()
+
+    def model_key(self, algorithm, profile, params):
+        return fingerprint((algorithm, sorted(profile.items()), sorted(params.items())))
+
+    def lookup(self, algorithm, profile, params):
+        """Return (model, match) for a stored model, match being 'exact' or 'similar'"""
+        key = self.model_key(algorithm, profile, params)
+        if key in self.index:
+            model = self._read_or_drop(key)
+            if model is not None:
+                self._touch(key)
+                return model, 'exact'
+
+        if self.similarity_threshold is None:
+            return None, None
+        candidates = [k for k, meta in self.index.items()
+                      if meta['algorithm'] == algorithm and meta['params'] == params and k in self.profiles]
+        ranked = sorted(((profile_similarity(profile, self.profiles[k]), k) for k in candidates), reverse=True)
+        for similarity, candidate in ranked:
+            if similarity < self.similarity_threshold:
+                break
+            model = self._read_or_drop(candidate)
+            if model is not None:
+                self._touch(candidate)
+                return model, 'similar'
+        return None, None
+
+    def _read_or_drop(self, key):
+        """Load a stored model; unreadable entries are dropped from the store"""
+        try:
+            return self._load_model(key)
+        except Exception as e:
+            print(f"⚠️  Dropping unreadable stored model {key[:12]}: {e}")
+            self._drop([key])
+            return None
+
+    def save(self, algorithm, profile, params, model):
+        """Persist a model (Petri net + markings, heuristics net, ...) with its variant profile"""
+        key = self.model_key(algorithm, profile, params)
+        model_format = self._write_model(key, model)
+        now = datetime.now().isoformat(timespec='seconds')
+        self.profiles[key] = profile
+        self.index[key] = {
+            'algorithm': algorithm,
+            'format': model_format,
+            'params': params,
+            'cases': int(sum(profile.values())),
+            'variants': len(profile),
+            'created': now,
+            'last_used': now
+        }
+        self.evict()
+        return key
+
+    def evict(self):
+        """Drop expired models, then the least recently used ones beyond max_entries"""
+        expired = []
+        if self.max_age_days is not None:
+            cutoff = (datetime.now() - timedelta(days=self.max_age_days)).isoformat(timespec='seconds')
+            expired = [k for k, meta in self.index.items() if meta['last_used'] < cutoff]
+        by_age = sorted((k for k in self.index if k not in expired), key=lambda k: self.index[k]['last_used'])
+        if self.max_entries is not None and len(by_age) > self.max_entries:
+            expired += by_age[:len(by_age) - self.max_entries]
+
+        self._drop(expired)
+        self._save_index()
+        self._save_profiles()
+        return expired
+
+    def get_or_discover(self, algorithm, df, params, discover_fn,
+                        case_col='case_id', activity_col='activity', timestamp_col='timestamp'):
+        """
+        Load a stored model for this log's variant profile, or mine and store it
+
+        Returns (model, source) where source is 'exact', 'similar' or 'mined'.
+        """
+        variants, _ = extract_variants(df, case_col, activity_col, timestamp_col)
+        profile = variant_profile(variants)
+        model, match = self.lookup(algorithm, profile, params)
+        if model is not None:
+            print(f"♻️  Reusing stored {algorithm} model ({match} variant profile match)")
+            return model, match
+
+        model = discover_fn()
+        try:
+            self.save(algorithm, profile, params, model)
+        except Exception as e:
+            print(f"⚠️  Could not store the {algorithm} model: {e}")
+        return model, 'mined'
@@ -0,0 +1,157 @@
+import csv
+import heapq
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from system_call_generator import EnhancedSystemCallGenerator
+
+
+def _generate_partition(partition, case_start, case_end, seed_state, base_time, time_span_hours, output_file):
+    """Generate one case range into a time-ordered partition CSV (runs in a worker process)"""
+    generator = EnhancedSystemCallGenerator(seed=seed_state)
+    events, workflow_distribution = generator.generate_cases(range(case_start, case_end), base_time, time_span_hours)
+    df = generator.events_to_frame(events)
+    df.to_csv(output_file, index=False)
+    return {
+        'partition': partition,
+        'file': output_file,
+        'cases': case_end - case_start,
+        'events': len(df),
+        'workflow_distribution': workflow_distribution
+    }
+
+
+def merge_partitions(partition_files, output_file, timestamp_col='timestamp'):
+    """
+    Stream-merge time-ordered partition CSVs into one time-ordered CSV
+
+    Rows are merged with a k-way heap merge, so memory stays at one row per
+    partition regardless of the total event count.
+    """
+    readers, handles = [], []
+    try:
+        for path in partition_files:
+            handle = open(path, newline='')
+            handles.append(handle)
+            reader = csv.reader(handle)
+            header = next(reader)
+            readers.append(reader)
+        ts_index = header.index(timestamp_col)
+
+        rows = 0
+        with open(output_file, 'w', newline='') as out:
+            writer = csv.writer(out)
+            writer.writerow(header)
+            for row in heapq.merge(*readers, key=lambda row: datetime.fromisoformat(row[ts_index])):
+                writer.writerow(row)
+                rows += 1
+        return rows
+    finally:
+        for handle in handles:
+            handle.close()
+
+
+def generate_parallel(num_cases, time_span_hours=24, max_workers=None, seed=None,
+                      output_dir="generated_partitions", cases_per_partition=20000,
+                      merge=False, merged_file=None, start_time=None):
+    """
+    Generate a synthetic event log across worker processes
+
+    The case range is split into fixed partitions of cases_per_partition cases.
+    Every partition draws from its own random stream spawned from one
+    numpy SeedSequence, so a given seed yields the same partitions whatever
+    the number of workers. Each partition is written as its own time-ordered
+    CSV; merge=True additionally stream-merges them into one ordered file.
+
+    Parameters:
+    - max_workers: Pool size (None = CPU count, 0 = generate inline)
+    - seed: Root seed (None = fresh entropy, logged so a run can be repeated)
+    - cases_per_partition: Cases per partition file (bounds per-worker memory)
+    - start_time: Start of the generated time span (None = time_span_hours ago,
+      logged and returned with the seed so a run can be repeated)
+
+    Returns a dict with the partition results, totals and merged file (if any).
+    """
+    seed_sequence = np.random.SeedSequence(seed)
+    base_time = start_time or datetime.now() - timedelta(hours=time_span_hours)
+    os.makedirs(output_dir, exist_ok=True)
+
+    bounds = list(range(0, num_cases, cases_per_partition)) + [num_cases]
+    partitions = list(zip(bounds[:-1], bounds[1:]))
+    child_seeds = seed_sequence.spawn(len(partitions))
+
+    print(f"Generating {num_cases:,} cases in {len(partitions)} partitions "
+          f"(seed {seed_sequence.entropy}, start {base_time.isoformat()})...")
+    started = time.perf_counter()
+
+    jobs = [
+        (index, start, end, int(child.generate_state(2, dtype=np.uint64)[0]), base_time, time_span_hours,
+         os.path.join(output_dir, f"partition_{index:05d}.csv"))
+        for index, ((start, end), child) in enumerate(zip(partitions, child_seeds))
+    ]
+    if max_workers == 0:
+        results = [_generate_partition(*job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(_generate_partition, *job) for job in jobs]
+            results = [future.result() for future in futures]
+
+    elapsed = time.perf_counter() - started
+    total_events = sum(r['events'] for r in results)
+    workflow_distribution = {}
+    for r in results:
+        for workflow, count in r['workflow_distribution'].items():
+            workflow_distribution[workflow] = workflow_distribution.get(workflow, 0) + count
+
+    print(f"✅ Generated {total_events:,} events in {elapsed:.1f}s "
+          f"({total_events / elapsed if elapsed else 0:,.0f} events/s)")
+
+    summary = {
+        'seed': seed_sequence.entropy,
+        'start_time': base_time,
+        'partitions': results,
+        'total_events': total_events,
+        'workflow_distribution': workflow_distribution,
+        'elapsed_seconds': elapsed,
+        'merged_file': None
+    }
+
+    if merge:
+        merged_file = merged_file or f"enhanced_system_call_log_{total_events}_events_merged.csv"
+        print(f"Merging partitions into {merged_file}...")
+        merge_partitions([r['file'] for r in results], merged_file)
+        summary['merged_file'] = merged_file
+        print(f"✅ Merged log saved to: {merged_file}")
+
+    return summary
+
+
+def main():
+    """Generate a large partitioned dataset for capacity tests"""
+    print("Parallel System Call Event Log Generator")
+    print("=" * 50)
+
+    num_cases = int(input("Number of cases (default 100000): ").strip() or 100000)
+    time_span = float(input("Time span in hours (default 24): ").strip() or 24)
+    seed_input = input("Seed (press Enter for random): ").strip()
+    start_input = input("Start time, e.g. 2025-06-10T00:00:00 (press Enter for the last time span): ").strip()
+    merge = input("Merge partitions into one ordered file? (y/N): ").strip().lower() == 'y'
+
+    summary = generate_parallel(
+        num_cases,
+        time_span_hours=time_span,
+        seed=int(seed_input) if seed_input else None,
+        merge=merge,
+        start_time=datetime.fromisoformat(start_input) if start_input else None
+    )
+    print(f"Partitions written: {len(summary['partitions'])}")
+    print(f"Repeat with seed {summary['seed']} and start time {summary['start_time'].isoformat()}")
+    return summary
+
+
+if __name__ == "__main__":
+    main()
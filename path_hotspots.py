@@ -0,0 +1,195 @@
+import numpy as np
+import pandas as pd
+
+from event_index import sketches_by_group
+from event_schema import read_event_log
+
+
+PATH_SEPARATOR = '\\'
+HOTSPOT_QUANTILES = {'p50_ms': 0.5, 'p95_ms': 0.95, 'p99_ms': 0.99}
+
+
+class PathIndex:
+    def __init__(self, df, activities=None, bottleneck_mask=None, relative_accuracy=0.01):
+        """
+        File-path hotspot index with directory roll-ups
+
+        Paths are dictionary-encoded once (events without a file_path are
+        skipped) and every per-file statistic is a bincount or sketch over the
+        integer codes, so the events are only scanned once. Directories form a
+        trie over the distinct paths (split on backslashes); directory
+        statistics merge the duration sketches of the files below them, so the
+        roll-up costs depend on the number of distinct files, not events.
+
+        Parameters:
+        - df: Event frame
+        - activities: Only index these syscalls (e.g. ['ReadFile', 'WriteFile'])
+        - bottleneck_mask: Boolean array marking bottleneck events of df
+          (None = the log's is_bottleneck flag, if any)
+        - relative_accuracy: Accuracy of the duration percentiles
+        """
+        paths = df['file_path'].astype('string').fillna('').to_numpy(dtype=object)
+        mask = paths != ''
+        if activities is not None:
+            mask &= df['activity'].isin([activities] if isinstance(activities, str) else activities).to_numpy()
+        if bottleneck_mask is None and 'is_bottleneck' in df.columns:
+            bottleneck_mask = df['is_bottleneck'].to_numpy(dtype=bool)
+        slow = (np.zeros(mask.sum(), dtype=bool) if bottleneck_mask is None
+                else np.asarray(bottleneck_mask, dtype=bool)[mask])
+
+        self.file_codes, paths = pd.factorize(paths[mask])
+        self.paths = np.asarray(paths, dtype=object)
+        self.resource_codes, self.resources = pd.factorize(df['resource'].to_numpy()[mask])
+        self.durations = df['duration_ms'].to_numpy(dtype=np.float64)[mask]
+        end_us = df['timestamp'].values.astype('datetime64[us]').astype(np.int64)[mask]
+        self.start_us = end_us - np.round(self.durations * 1000).astype(np.int64)
+        self.slow = slow
+        n_files = len(self.paths)
+
+        self.file_sketches = sketches_by_group(self.file_codes, self.durations, n_files, relative_accuracy)
+        self.file_bottlenecks = np.bincount(self.file_codes[slow], minlength=n_files)
+        self.file_bottleneck_ms = np.bincount(self.file_codes[slow], weights=self.durations[slow], minlength=n_files)
+        # Distinct (file, process) pairs, shared by the file and directory process counts
+        pairs = np.unique(self.file_codes.astype(np.int64) * len(self.resources) + self.resource_codes)
+        self.file_process_pairs = (pairs // len(self.resources), pairs % len(self.resources))
+
+        self._build_trie()
+
+    def _build_trie(self):
+        """Directory nodes and the (directory, file) ancestor pairs of every file"""
+        directories = {}
+        ancestor_dirs, ancestor_files = [], []
+        for file_code, path in enumerate(self.paths):
+            parts = path.split(PATH_SEPARATOR)
+            for depth in range(1, len(parts)):
+                prefix = PATH_SEPARATOR.join(parts[:depth])
+                ancestor_dirs.append(directories.setdefault(prefix, len(directories)))
+                ancestor_files.append(file_code)
+        self.directories = np.array(list(directories), dtype=object)
+        self.directory_depth = np.array([d.count(PATH_SEPARATOR) + 1 for d in self.directories], dtype=np.int64)
+        self.ancestor_dirs = np.array(ancestor_dirs, dtype=np.int64)
+        self.ancestor_files = np.array(ancestor_files, dtype=np.int64)
+
+    def _stats_frame(self, sketches, bottlenecks, bottleneck_ms, processes):
+        counts = np.array([s.count for s in sketches], dtype=np.int64)
+        totals = np.array([s.total for s in sketches])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            frame = pd.DataFrame({
+                'events': counts,
+                'total_ms': totals,
+                'mean_ms': totals / counts,
+                **{name: [s.quantile(q) for s in sketches] for name, q in HOTSPOT_QUANTILES.items()},
+                'processes': processes,
+                'bottlenecks': bottlenecks,
+                'bottleneck_ms': bottleneck_ms,
+                'bottleneck_share': bottlenecks / counts
+            })
+        return frame.round(2).assign(bottleneck_share=frame['bottleneck_share'].round(4))
+
+    def files(self):
+        """Per-file statistics, sorted by time spent in bottleneck calls, then total time"""
+        processes = np.bincount(self.file_process_pairs[0], minlength=len(self.paths))
+        frame = self._stats_frame(self.file_sketches, self.file_bottlenecks, self.file_bottleneck_ms, processes)
+        frame.index = pd.Index(self.paths, name='file_path')
+        return frame.sort_values(['bottleneck_ms', 'total_ms'], ascending=False)
+
+    def directories_summary(self, min_depth=1, max_depth=None):
+        """
+        Per-directory statistics rolled up over every file below the directory
+
+        depth counts path components ('C:' = 1, 'C:\\Windows' = 2, ...).
+        """
+        n_dirs = len(self.directories)
+        sketches = [None] * n_dirs
+        for directory, file_code in zip(self.ancestor_dirs, self.ancestor_files):
+            sketch = self.file_sketches[file_code]
+            if sketches[directory] is None:
+                sketches[directory] = type(sketch)(sketch.relative_accuracy)
+            sketches[directory].merge(sketch)
+
+        bottlenecks = np.bincount(self.ancestor_dirs, weights=self.file_bottlenecks[self.ancestor_files],
+                                  minlength=n_dirs).astype(np.int64)
+        bottleneck_ms = np.bincount(self.ancestor_dirs, weights=self.file_bottleneck_ms[self.ancestor_files],
+                                    minlength=n_dirs)
+        # Distinct processes per directory: join ancestors with the (file, process) pairs
+        ancestors = pd.DataFrame({'directory': self.ancestor_dirs, 'file': self.ancestor_files})
+        file_processes = pd.DataFrame({'file': self.file_process_pairs[0], 'resource': self.file_process_pairs[1]})
+        dir_processes = ancestors.merge(file_processes, on='file')[['directory', 'resource']].drop_duplicates()
+        processes = np.bincount(dir_processes['directory'], minlength=n_dirs)
+
+        frame = self._stats_frame(sketches, bottlenecks, bottleneck_ms, processes)
+        frame.insert(0, 'files', np.bincount(self.ancestor_dirs, minlength=n_dirs))
+        frame.insert(0, 'depth', self.directory_depth)
+        frame.index = pd.Index(self.directories, name='directory')
+        keep = frame['depth'] >= min_depth
+        if max_depth is not None:
+            keep &= frame['depth'] <= max_depth
+        return frame[keep].sort_values(['bottleneck_ms', 'total_ms'], ascending=False)
+
+    def shared_files(self, window_ms=1000, min_processes=2):
+        """
+        Files touched by several processes within the same time window
+
+        Events are bucketed into fixed windows by start time; a window is
+        contended when at least min_processes distinct processes used the file
+        in it. Returns one row per file with contended windows, the maximum
+        number of processes in one window, the processes involved and the
+        first contended window.
+        """
+        columns = ['contended_windows', 'max_processes', 'processes', 'first_contention']
+        if len(self.file_codes) == 0:
+            return pd.DataFrame(columns=columns)
+        window_us = int(window_ms * 1000)
+        windows = (self.start_us - self.start_us.min()) // window_us
+        n_windows = int(windows.max()) + 1
+        n_resources = len(self.resources)
+
+        # Distinct (file, window, process) triples, then processes per (file, window)
+        triples = np.unique((self.file_codes.astype(np.int64) * n_windows + windows) * n_resources + self.resource_codes)
+        cells, cell_processes = np.unique(triples // n_resources, return_counts=True)
+        contended = cells[cell_processes >= min_processes]
+        if len(contended) == 0:
+            return pd.DataFrame(columns=columns)
+
+        contended_triples = triples[np.isin(triples // n_resources, contended)]
+        involved = np.unique(contended_triples // n_resources // n_windows * n_resources + contended_triples % n_resources)
+        process_names = pd.Series(np.asarray(self.resources)[involved % n_resources]).groupby(
+            involved // n_resources).agg(lambda names: ', '.join(sorted(names)))
+
+        contended_files = contended // n_windows
+        file_ids, first, counts = np.unique(contended_files, return_index=True, return_counts=True)
+        max_processes = np.maximum.reduceat(cell_processes[cell_processes >= min_processes], first)
+        result = pd.DataFrame({
+            'contended_windows': counts,
+            'max_processes': max_processes,
+            'processes': process_names.reindex(file_ids).to_numpy(),
+            'first_contention': pd.to_datetime(self.start_us.min() + contended[first] % n_windows * window_us, unit='us')
+        }, index=pd.Index(self.paths[file_ids], name='file_path'))
+        return result.sort_values(['contended_windows', 'max_processes'], ascending=False)
+
+
+def main():
+    """Find the files and directories behind slow file I/O"""
+    csv_file = input("Enter CSV file name: ").strip()
+    activities = input("Syscalls to index, comma separated (press Enter for ReadFile,WriteFile): ").strip()
+    activities = [a.strip() for a in (activities or 'ReadFile,WriteFile').split(',')]
+
+    try:
+        df = read_event_log(csv_file)
+        index = PathIndex(df, activities)
+
+        print(f"\n=== Directory hotspots ({'/'.join(activities)}) ===")
+        print(index.directories_summary().head(15))
+        print(f"\n=== File hotspots ===")
+        print(index.files().head(15))
+        print(f"\n=== Files shared by several processes (1s windows) ===")
+        print(index.shared_files().head(15))
+        return index
+
+    except FileNotFoundError as e:
+        print(f"❌ File not found: {e}")
+    except Exception as e:
+        print(f"❌ Error: {e}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+import numpy as np
+import pandas as pd
+
+from event_schema import read_event_log
+from trace_variants import case_sorted_codes
+
+
+PRECURSOR_COLUMNS = ['resource', 'activity', 'context', 'length', 'events', 'slow_events', 'slow_rate',
+                     'lift', 'coverage', 'mean_ms', 'mean_ms_without', 'latency_uplift']
+
+
+def preceding_codes(activity_codes, case_codes, k):
+    """
+    Preceding-k context of every event, from shifted copies of the code array
+
+    Returns a (n, k) array whose column j holds the activity code j+1 calls
+    earlier in the same case, or -1 where the case has fewer earlier calls.
+    Inputs must be in (case, time) order.
+    """
+    n = len(activity_codes)
+    context = np.full((n, k), -1, dtype=np.int64)
+    for lag in range(1, k + 1):
+        same_case = case_codes[lag:] == case_codes[:-lag] if n > lag else np.zeros(0, dtype=bool)
+        context[lag:, lag - 1] = np.where(same_case, activity_codes[:-lag], -1)
+    return context
+
+
+def precursor_patterns(df, targets=None, slow_mask=None, k=3, min_events=20, min_slow=5):
+    """
+    Which preceding calls predict a slow call
+
+    Every event of a target (resource, activity) pair gets its context of the
+    1..k calls right before it in the same case. For every (target, context)
+    combination:
+    - slow_rate: share of the target calls with this context that are slow
+    - lift: slow_rate / the target's overall slow rate
+    - coverage: share of the target's slow calls that had this context
+    - latency_uplift: mean duration with the context / mean duration without it
+
+    Parameters:
+    - df: Event frame
+    - targets: (resource, activity) pairs to explain (None = every pair)
+    - slow_mask: Boolean array marking slow events of df (None = the log's
+      is_bottleneck flag)
+    - k: Longest context to consider
+    - min_events: Minimum target calls with a context for it to be ranked
+    - min_slow: Minimum slow target calls with a context
+
+    Returns a DataFrame sorted by target and descending lift; context lists
+    the calls oldest first.
+    """
+    if slow_mask is None:
+        slow_mask = df['is_bottleneck'].to_numpy(dtype=bool)
+    order, case_codes, activity_codes, activities, case_starts, cases = case_sorted_codes(df)
+    if len(order) == 0:
+        return pd.DataFrame(columns=PRECURSOR_COLUMNS)
+    resource_codes, resources = pd.factorize(df['resource'].to_numpy()[order])
+    slow = np.asarray(slow_mask, dtype=bool)[order]
+    durations = df['duration_ms'].to_numpy(dtype=np.float64)[order]
+    n_items = len(activities)
+
+    # Target events: one integer per (resource, activity) pair
+    pair_codes = resource_codes.astype(np.int64) * n_items + activity_codes
+    if targets is not None:
+        resource_lookup = {name: code for code, name in enumerate(resources)}
+        activity_lookup = {name: code for code, name in enumerate(activities)}
+        wanted = [resource_lookup[r] * n_items + activity_lookup[a] for r, a in targets
+                  if r in resource_lookup and a in activity_lookup]
+        is_target = np.isin(pair_codes, wanted)
+    else:
+        is_target = np.ones(len(order), dtype=bool)
+
+    context = preceding_codes(activity_codes, case_codes, k)[is_target]
+    pair_codes, slow, durations = pair_codes[is_target], slow[is_target], durations[is_target]
+    if len(pair_codes) == 0:
+        return pd.DataFrame(columns=PRECURSOR_COLUMNS)
+
+    pair_ids, pair_index = np.unique(pair_codes, return_inverse=True)
+    pair_events = np.bincount(pair_index)
+    pair_slow = np.bincount(pair_index, weights=slow)
+    pair_total = np.bincount(pair_index, weights=durations)
+
+    rows = []
+    base = n_items + 1
+    for length in range(1, k + 1):
+        complete = (context[:, :length] >= 0).all(axis=1)
+        keys = pair_index[complete].astype(np.int64)
+        # Context key, oldest call first: lag length ... lag 1
+        for lag in range(length, 0, -1):
+            keys = keys * base + context[complete, lag - 1]
+        unique_keys, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+        slow_counts = np.bincount(inverse, weights=slow[complete])
+        totals = np.bincount(inverse, weights=durations[complete])
+        keep = (counts >= min_events) & (slow_counts >= min_slow)
+
+        for key, events, slow_events, total in zip(unique_keys[keep], counts[keep], slow_counts[keep], totals[keep]):
+            context_codes = [key // base ** (length - 1 - i) % base for i in range(length)]
+            pair = key // base ** length
+            resource_code, activity_code = divmod(int(pair_ids[pair]), n_items)
+            rest_events = pair_events[pair] - events
+            rows.append({
+                'resource': resources[resource_code],
+                'activity': activities[activity_code],
+                'context': tuple(activities[c] for c in context_codes),
+                'length': length,
+                'events': int(events),
+                'slow_events': int(slow_events),
+                'slow_rate': slow_events / events,
+                'lift': (slow_events / events) / (pair_slow[pair] / pair_events[pair]) if pair_slow[pair] else np.nan,
+                'coverage': slow_events / pair_slow[pair] if pair_slow[pair] else np.nan,
+                'mean_ms': total / events,
+                'mean_ms_without': (pair_total[pair] - total) / rest_events if rest_events else np.nan,
+            })
+
+    if not rows:
+        return pd.DataFrame(columns=PRECURSOR_COLUMNS)
+    patterns = pd.DataFrame(rows)
+    patterns['latency_uplift'] = patterns['mean_ms'] / patterns['mean_ms_without']
+    patterns = patterns.round({'slow_rate': 4, 'lift': 3, 'coverage': 4, 'mean_ms': 2,
+                               'mean_ms_without': 2, 'latency_uplift': 3})
+    return patterns.sort_values(['resource', 'activity', 'lift', 'events'],
+                                ascending=[True, True, False, False]).reset_index(drop=True)
+
+
+def top_precursors(patterns, n=3, min_lift=1.0):
+    """The n highest-lift contexts of every target that raise its slow rate above min_lift"""
+    ranked = patterns[patterns['lift'] > min_lift]
+    return ranked.groupby(['resource', 'activity'], sort=False).head(n)
+
+
+def describe_precursor(row):
+    """One-line description of a precursor pattern"""
+    return (f"{' → '.join(row['context'])} → {row['activity']}: {row['slow_rate']*100:.0f}% slow "
+            f"(lift ×{row['lift']:.2f}, {row['coverage']*100:.0f}% of slow calls, "
+            f"{(row['latency_uplift'] - 1)*100:+.0f}% latency)")
+
+
+def main():
+    """Rank the call contexts that precede slow ReadFile and RegQueryValue calls"""
+    csv_file = input("Enter CSV file name: ").strip()
+    k = input("Context length k (press Enter for 3): ").strip()
+    k = int(k) if k else 3
+    percentile = input("Slow-call percentile (press Enter for 95): ").strip()
+    percentile = float(percentile) if percentile else 95
+
+    try:
+        df = read_event_log(csv_file)
+        targets = [(resource, activity) for resource in df['resource'].unique()
+                   for activity in ['ReadFile', 'RegQueryValue']]
+        threshold = df['duration_ms'].quantile(percentile / 100)
+        slow = df['duration_ms'].to_numpy() > threshold
+        patterns = precursor_patterns(df, targets, slow, k=k)
+        ranked = top_precursors(patterns)
+        print(f"\n=== Precursors of slow calls (>{threshold:.1f}ms, k={k}) ===")
+        if len(ranked) == 0:
+            print("No call context raises the slow-call rate of ReadFile or RegQueryValue")
+        for _, row in ranked.iterrows():
+            print(f"• {row['resource']}: {describe_precursor(row)}")
+        return patterns
+
+    except FileNotFoundError as e:
+        print(f"❌ File not found: {e}")
+    except Exception as e:
+        print(f"❌ Error: {e}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+import numpy as np
+import pandas as pd
+
+
+PM4PY_ALIASES = {
+    'case:concept:name': 'case_id',
+    'concept:name': 'activity',
+    'time:timestamp': 'timestamp'
+}
+
+
+def preprocess_events(df, min_case_length=5, max_case_length=500, activity_threshold=10,
+                      case_col='case_id', activity_col='activity', timestamp_col='timestamp'):
+    """
+    Filter and order an event frame for process mining in a single pass
+
+    Cases outside [min_case_length, max_case_length] are dropped, then activities
+    occurring fewer than activity_threshold times among the remaining events.
+    Both filters are computed on integer codes into one boolean mask, and the
+    surviving rows are gathered in (case, timestamp) order one column at a time,
+    each source column being dropped from df as soon as it has been gathered.
+    The input frame is therefore consumed unless nothing needs to change; peak
+    memory stays close to the input size plus one column.
+
+    Returns (frame, stats) where stats holds the before/after counts.
+    """
+    df[timestamp_col] = pd.to_datetime(df[timestamp_col])
+    case_codes, n_cases = _codes(df[case_col], sort=True)
+    activity_codes, n_activities = _codes(df[activity_col], sort=True)
+
+    # Case length filter
+    case_lengths = np.bincount(case_codes, minlength=n_cases)
+    valid_cases = (case_lengths >= min_case_length) & (case_lengths <= max_case_length)
+    mask = valid_cases[case_codes]
+
+    # Activity frequency filter, counted over the events of valid cases only
+    activity_counts = np.bincount(activity_codes[mask], minlength=n_activities)
+    frequent_activities = activity_counts >= activity_threshold
+    mask &= frequent_activities[activity_codes]
+    del activity_codes
+
+    # Order the surviving rows by case, then timestamp (stable, like sort_values)
+    rows = np.flatnonzero(mask).astype(np.int32)
+    del mask
+    ts_values = df[timestamp_col].values.view(np.int64)
+    if len(rows) < len(df):
+        ts_values, case_codes = ts_values[rows], case_codes[rows]
+    order = np.lexsort((ts_values, case_codes))
+    del ts_values, case_codes
+    rows = rows[order]
+    del order
+
+    stats = {
+        'initial_cases': int((case_lengths > 0).sum()),
+        'valid_cases': int((valid_cases & (case_lengths > 0)).sum()),
+        'initial_activities': int((activity_counts > 0).sum()),
+        'frequent_activities': int((frequent_activities & (activity_counts > 0)).sum()),
+        'initial_events': len(df),
+        'events': len(rows)
+    }
+
+    if len(rows) == len(df) and np.array_equal(rows, np.arange(len(df))):
+        return df, stats  # Nothing filtered and already ordered
+
+    # Columns of one dtype share a block whose memory is only released once all
+    # of them are dropped, so gather them together
+    columns = list(df.columns)
+    result = pd.DataFrame(index=df.index.take(rows))
+    for column in sorted(columns, key=lambda column: str(df[column].dtype)):
+        result[column] = df[column].array.take(rows)
+        del df[column]
+    return result[columns], stats
+
+
+def _codes(values, sort=False):
+    """int32 codes and the number of distinct values (categories reuse their codes)"""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values.cat.codes.to_numpy(), len(values.cat.categories)
+    codes, uniques = pd.factorize(values, sort=sort)
+    return codes.astype(np.int32, copy=False), len(uniques)
+
+
+def add_pm4py_aliases(df):
+    """
+    Add the pm4py standard column names as aliases of case_id/activity/timestamp
+
+    With pandas copy-on-write the alias columns share the source column's
+    memory until one of them is modified, so no data is duplicated. pm4py only
+    accepts string case and activity columns, so categorical ones are
+    materialised as strings for the alias.
+    """
+    for alias, column in PM4PY_ALIASES.items():
+        df[alias] = _alias_values(df[column])
+    return df
+
+
+def _alias_values(values):
+    return values.astype(str) if isinstance(values.dtype, pd.CategoricalDtype) else values
+
+
+def pm4py_frame(df):
+    """
+    Case-sorted frame for pm4py's DataFrame-aware discovery and statistics
+
+    Missing pm4py alias columns are added (existing ones, such as a relabelled
+    concept:name, are kept) and events are ordered by case, in order of first
+    appearance, then timestamp. pm4py then reads traces straight from the
+    frame instead of building a Python EventLog object per event. A frame
+    that is already ordered is returned without copying.
+    """
+    missing = [alias for alias in PM4PY_ALIASES if alias not in df.columns]
+    if missing:
+        df = df.assign(**{alias: _alias_values(df[PM4PY_ALIASES[alias]]) for alias in missing})
+    case_codes, _ = pd.factorize(df['case:concept:name'])
+    ts_values = df['time:timestamp'].values.astype('datetime64[ns]').astype(np.int64)
+    order = np.lexsort((ts_values, case_codes))
+    if np.array_equal(order, np.arange(len(df))):
+        return df
+    return df.take(order)
+
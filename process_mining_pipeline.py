@@ -1,4 +1,3 @@
-import pandas as pd
 import pm4py
 from pm4py.objects.conversion.log import converter as log_converter
 from pm4py.objects.log.importer.xes import importer as xes_importer
@@ -7,21 +6,34 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 from datetime import datetime, timedelta
 import numpy as np
+from pm4py.visualization.petri_net import visualizer as pn_visualizer
+from pm4py.visualization.heuristics_net import visualizer as hn_visualizer
+from render_queue import RenderQueue
+from conformance_checker import ConformanceChecker
+from model_store import ModelStore
+from preprocessing import preprocess_events, add_pm4py_aliases, pm4py_frame
+from event_schema import read_event_log
+from adaptive_thresholds import ThresholdModel
+from trace_clustering import TraceClusterer
 
 class SystemCallProcessMiner:
-    def __init__(self):
+    def __init__(self, render_queue=None, model_store=None):
         self.raw_data = None
+        self.render_queue = render_queue or RenderQueue()
+        self.model_store = model_store or ModelStore()
+        self.preprocess_params = {}
         self.event_log = None
         self.filtered_log = None
         self.process_models = {}
         self.statistics = {}
+        self.trace_clusters = None
         
     def load_data(self, csv_file):
         """Load and validate the system call event log"""
         print(f"Loading data from {csv_file}...")
         
         try:
-            self.raw_data = pd.read_csv(csv_file)
+            self.raw_data = read_event_log(csv_file)
             print(f"✅ Loaded {len(self.raw_data):,} events")
             
             # Validate required columns
@@ -62,48 +74,38 @@ class SystemCallProcessMiner:
         - activity_threshold: Minimum frequency for activities to include
         """
         print("\n=== Data Preprocessing ===")
+        self.preprocess_params = {
+            'min_case_length': min_case_length,
+            'max_case_length': max_case_length,
+            'activity_threshold': activity_threshold
+        }
         
-        # Convert timestamp to datetime
-        self.raw_data['timestamp'] = pd.to_datetime(self.raw_data['timestamp'])
-        
-        # Sort by case and timestamp
-        self.raw_data = self.raw_data.sort_values(['case_id', 'timestamp'])
-        
-        # Remove cases that are too short or too long
-        case_lengths = self.raw_data.groupby('case_id').size()
-        valid_cases = case_lengths[(case_lengths >= min_case_length) & 
-                                  (case_lengths <= max_case_length)].index
-        
-        initial_cases = self.raw_data['case_id'].nunique()
-        self.raw_data = self.raw_data[self.raw_data['case_id'].isin(valid_cases)]
-        
-        print(f"Filtered cases by length: {initial_cases:,} → {len(valid_cases):,}")
-        
-        # Remove rare activities (noise reduction)
-        activity_counts = self.raw_data['activity'].value_counts()
-        frequent_activities = activity_counts[activity_counts >= activity_threshold].index
-        
-        initial_activities = self.raw_data['activity'].nunique()
-        self.raw_data = self.raw_data[self.raw_data['activity'].isin(frequent_activities)]
+        # Single-pass filter and (case, timestamp) ordering
+        self.raw_data, stats = preprocess_events(
+            self.raw_data, min_case_length, max_case_length, activity_threshold)
         
-        print(f"Filtered activities by frequency: {initial_activities} → {len(frequent_activities)}")
+        print(f"Filtered cases by length: {stats['initial_cases']:,} → {stats['valid_cases']:,}")
+        print(f"Filtered activities by frequency: {stats['initial_activities']} → {stats['frequent_activities']}")
         
         # Create pm4py compatible format
-        self.raw_data['case:concept:name'] = self.raw_data['case_id']
-        self.raw_data['concept:name'] = self.raw_data['activity']
-        self.raw_data['time:timestamp'] = self.raw_data['timestamp']
+        add_pm4py_aliases(self.raw_data)
         
         print(f"✅ Preprocessing complete: {len(self.raw_data):,} events remaining")
         
     def convert_to_event_log(self):
-        """Convert preprocessed data to pm4py event log format"""
+        """
+        Prepare the preprocessed data for pm4py
+        
+        The event log is kept as a case-sorted DataFrame that pm4py's discovery
+        and statistics functions read directly; no EventLog objects are built.
+        """
         print("\n=== Converting to Event Log Format ===")
         
         try:
-            # Convert to pm4py event log
-            self.event_log = pm4py.convert_to_event_log(self.raw_data)
+            self.event_log = pm4py_frame(self.raw_data)
+            self.statistics['total_cases'] = self.event_log['case:concept:name'].nunique()
             
-            print(f"✅ Event log created with {len(self.event_log)} cases")
+            print(f"✅ Event log created with {self.statistics['total_cases']} cases")
             
             # Calculate basic statistics
             self._calculate_basic_statistics()
@@ -117,16 +119,13 @@ class SystemCallProcessMiner:
         print("\n=== Basic Process Statistics ===")
         
         # Basic event log statistics
-        self.statistics['total_cases'] = len(self.event_log)
-        self.statistics['total_events'] = sum(len(trace) for trace in self.event_log)
+        case_lengths = self.event_log.groupby('case:concept:name', sort=False).size().to_numpy()
+        self.statistics['total_cases'] = len(case_lengths)
+        self.statistics['total_events'] = len(self.event_log)
         self.statistics['avg_case_length'] = self.statistics['total_events'] / self.statistics['total_cases']
         
         # Activity statistics
-        activities = set()
-        for trace in self.event_log:
-            for event in trace:
-                activities.add(event['concept:name'])
-        self.statistics['unique_activities'] = len(activities)
+        self.statistics['unique_activities'] = self.event_log['concept:name'].nunique()
         
         # Duration statistics (if duration available)
         if 'duration_ms' in self.raw_data.columns:
@@ -139,8 +138,7 @@ class SystemCallProcessMiner:
         print(f"Unique activities: {self.statistics['unique_activities']}")
         
         # Case length distribution
-        case_lengths = [len(trace) for trace in self.event_log]
-        print(f"Case length - Min: {min(case_lengths)}, Max: {max(case_lengths)}, Median: {sorted(case_lengths)[len(case_lengths)//2]}")
+        print(f"Case length - Min: {case_lengths.min()}, Max: {case_lengths.max()}, Median: {np.sort(case_lengths)[len(case_lengths)//2]}")
         
         return self.statistics
         
@@ -162,35 +160,53 @@ class SystemCallProcessMiner:
             try:
                 if algorithm == 'inductive':
                     # Inductive Miner - good for complex processes
-                    net, initial_marking, final_marking = pm4py.discover_petri_net_inductive(self.event_log)
-                    self.process_models[algorithm] = {
-                        'type': 'petri_net',
-                        'model': (net, initial_marking, final_marking)
-                    }
+                    discover_fn = lambda: pm4py.discover_petri_net_inductive(self.event_log)
+                    model_type = 'petri_net'
                     
                 elif algorithm == 'alpha':
                     # Alpha Miner - good for simple, structured processes
-                    net, initial_marking, final_marking = pm4py.discover_petri_net_alpha(self.event_log)
-                    self.process_models[algorithm] = {
-                        'type': 'petri_net',
-                        'model': (net, initial_marking, final_marking)
-                    }
+                    discover_fn = lambda: pm4py.discover_petri_net_alpha(self.event_log)
+                    model_type = 'petri_net'
                     
                 elif algorithm == 'heuristic':
                     # Heuristics Miner - handles noise well
-                    heu_net = pm4py.discover_heuristics_net(self.event_log)
-                    self.process_models[algorithm] = {
-                        'type': 'heuristic_net',
-                        'model': heu_net
-                    }
+                    discover_fn = lambda: pm4py.discover_heuristics_net(self.event_log)
+                    model_type = 'heuristic_net'
+                    
+                else:
+                    raise ValueError(f"Unknown algorithm '{algorithm}'")
+                
+                # Skip mining when the variant profile matches a stored model
+                model, source = self.model_store.get_or_discover(
+                    algorithm, self.raw_data, self.preprocess_params, discover_fn)
+                self.process_models[algorithm] = {
+                    'type': model_type,
+                    'model': tuple(model) if model_type == 'petri_net' else model
+                }
                 
-                print(f"✅ {algorithm.title()} model discovered successfully")
+                print(f"✅ {algorithm.title()} model {'discovered' if source == 'mined' else 'loaded'} successfully")
                 
             except Exception as e:
                 print(f"❌ Error with {algorithm} miner: {e}")
                 
         print(f"\n✅ Process discovery complete. Generated {len(self.process_models)} models.")
         
+    def check_conformance(self, new_data, algorithm='inductive', max_workers=None):
+        """
+        Replay a new event log against a discovered Petri net
+        
+        Parameters:
+        - new_data: DataFrame of new events (same columns as the input CSV)
+        - algorithm: Which discovered Petri net to check against ('inductive' or 'alpha')
+        - max_workers: Replay pool size (None = CPU count, 0 = inline)
+        """
+        if algorithm not in self.process_models or self.process_models[algorithm]['type'] != 'petri_net':
+            raise ValueError(f"No {algorithm} Petri net discovered. Call discover_processes() first.")
+            
+        net, initial_marking, final_marking = self.process_models[algorithm]['model']
+        checker = ConformanceChecker(net, initial_marking, final_marking, max_workers=max_workers)
+        return checker.check(new_data)
+        
     def visualize_processes(self, save_dir="process_models"):
         """Visualize discovered process models"""
         print(f"\n=== Visualizing Process Models ===")
@@ -204,57 +220,89 @@ class SystemCallProcessMiner:
             try:
                 if model_data['type'] == 'petri_net':
                     net, initial_marking, final_marking = model_data['model']
-                    gviz = pm4py.vis.view_petri_net(net, initial_marking, final_marking, format="png")
+                    gviz = pn_visualizer.apply(net, initial_marking, final_marking)
                     
                 elif model_data['type'] == 'heuristic_net':
-                    gviz = pm4py.vis.view_heuristics_net(model_data['model'], format="png")
+                    gviz = hn_visualizer.apply(model_data['model'])
                 
-                # Save visualization with absolute path
+                # Queue visualization with absolute path
                 output_path = os.path.abspath(f"{save_dir}/{algorithm}_process_model")
-                gviz.render(output_path, format='png', cleanup=True)
+                self.render_queue.submit_graphviz('process_model', gviz, output_path)
                 
-                print(f"✅ Saved {algorithm} model to {output_path}.png")
+                print(f"✅ Queued {algorithm} model for {output_path}")
                 
             except Exception as e:
                 print(f"❌ Error visualizing {algorithm} model: {e}")
                 print("Note: Visualization requires Graphviz to be installed on your system")
                 
-    def analyze_process_variants(self, top_n=10):
-        """Analyze most common process variants"""
-        print(f"\n=== Process Variant Analysis ===")
+    def analyze_process_variants(self, top_n=10, mode='exact', clusterer=None):
+        """
+        Analyze most common process variants
+        
+        Parameters:
+        - top_n: Number of variants to print
+        - mode: 'exact' = identical traces, 'clustered' = near-identical traces grouped
+          with MinHash/LSH (for noisy logs where almost every case is its own variant)
+        - clusterer: TraceClusterer for mode='clustered' (None = default settings)
+        """
+        print(f"\n=== Process Variant Analysis ({mode}) ===")
         
         if self.event_log is None:
             raise ValueError("Event log not loaded.")
+        if mode not in ('exact', 'clustered'):
+            raise ValueError("mode must be 'exact' or 'clustered'")
             
-        # Get trace variants
-        variants = pm4py.get_variants(self.event_log)
-        
-        # Convert to list format for easier handling
-        variants_list = []
-        for variant, cases in variants.items():
-            variants_list.append({
-                'variant': ' → '.join(variant),
-                'count': len(cases)
-            })
-        
-        variants_sorted = sorted(variants_list, key=lambda x: x['count'], reverse=True)
+        if mode == 'clustered':
+            clusterer = (clusterer or TraceClusterer()).fit(self.event_log)
+            clusters = clusterer.clusters(self.event_log)
+            variants_sorted = [{
+                'variant': ' → '.join(row['representative']),
+                'count': int(row['cases']),
+                'distinct_variants': int(row['distinct_variants']),
+                'p95_throughput_ms': row['p95_throughput_ms']
+            } for _, row in clusters.iterrows()]
+            self.trace_clusters = clusterer.case_clusters
+        else:
+            # Get trace variants (variant → case count, straight from the frame)
+            variants = pm4py.get_variants(self.event_log)
+            
+            # Convert to list format for easier handling
+            variants_list = []
+            for variant, count in variants.items():
+                variants_list.append({
+                    'variant': ' → '.join(variant),
+                    'count': count
+                })
+            
+            variants_sorted = sorted(variants_list, key=lambda x: x['count'], reverse=True)
         
-        print(f"Total variants: {len(variants_sorted)}")
-        print(f"Top {min(top_n, len(variants_sorted))} variants:")
+        label = 'clusters' if mode == 'clustered' else 'variants'
+        print(f"Total {label}: {len(variants_sorted)}")
+        print(f"Top {min(top_n, len(variants_sorted))} {label}:")
         
         for i, variant in enumerate(variants_sorted[:top_n]):
-            print(f"{i+1:2d}. {variant['variant']} (Count: {variant['count']})")
+            if mode == 'clustered':
+                print(f"{i+1:2d}. {variant['variant']} (Count: {variant['count']}, "
+                      f"{variant['distinct_variants']} variants, p95 throughput {variant['p95_throughput_ms']:.0f}ms)")
+            else:
+                print(f"{i+1:2d}. {variant['variant']} (Count: {variant['count']})")
             
         # Calculate variant coverage
-        total_cases = len(self.event_log)
+        total_cases = self.statistics['total_cases']
         top_10_coverage = sum(v['count'] for v in variants_sorted[:10]) / total_cases * 100
         
-        print(f"\nTop 10 variants cover {top_10_coverage:.1f}% of all cases")
+        print(f"\nTop 10 {label} cover {top_10_coverage:.1f}% of all cases")
         
         return variants_sorted
         
-    def identify_bottlenecks(self):
-        """Identify potential bottlenecks in the process"""
+    def identify_bottlenecks(self, threshold_model=None):
+        """
+        Identify potential bottlenecks in the process
+        
+        Parameters:
+        - threshold_model: ThresholdModel for per-resource/activity thresholds
+          (None = one global 95th percentile)
+        """
         print(f"\n=== Bottleneck Analysis ===")
         
         if 'duration_ms' not in self.raw_data.columns:
@@ -262,7 +310,7 @@ class SystemCallProcessMiner:
             return
             
         # Activity-level bottlenecks
-        activity_performance = self.raw_data.groupby('activity')['duration_ms'].agg([
+        activity_performance = self.raw_data.groupby('activity', observed=True)['duration_ms'].agg([
             'count', 'mean', 'median', 'std', 'max'
         ]).sort_values('mean', ascending=False)
         
@@ -270,7 +318,7 @@ class SystemCallProcessMiner:
         print(activity_performance.head(10))
         
         # Resource-level bottlenecks
-        resource_performance = self.raw_data.groupby('resource')['duration_ms'].agg([
+        resource_performance = self.raw_data.groupby('resource', observed=True)['duration_ms'].agg([
             'count', 'mean', 'median', 'std', 'max'
         ]).sort_values('mean', ascending=False)
         
@@ -278,21 +326,28 @@ class SystemCallProcessMiner:
         print(resource_performance)
         
         # Combined bottlenecks (resource + activity)
-        combined_performance = self.raw_data.groupby(['resource', 'activity'])['duration_ms'].agg([
+        combined_performance = self.raw_data.groupby(['resource', 'activity'], observed=True)['duration_ms'].agg([
             'count', 'mean', 'median'
         ]).sort_values('mean', ascending=False)
+        if threshold_model is not None:
+            if threshold_model.thresholds is None:
+                threshold_model.fit(self.raw_data)
+            combined_performance = combined_performance.join(threshold_model.thresholds['threshold'])
         
         print("\n=== Combined Bottlenecks (Resource + Activity) ===")
         print(combined_performance.head(15))
         
         # Statistical bottleneck detection
-        duration_threshold = self.raw_data['duration_ms'].quantile(0.95)  # 95th percentile
-        bottleneck_events = self.raw_data[self.raw_data['duration_ms'] > duration_threshold]
-        
-        print(f"\n=== Statistical Bottlenecks (>{duration_threshold:.1f}ms) ===")
+        if threshold_model is None:
+            duration_threshold = self.raw_data['duration_ms'].quantile(0.95)  # 95th percentile
+            bottleneck_events = self.raw_data[self.raw_data['duration_ms'] > duration_threshold]
+            print(f"\n=== Statistical Bottlenecks (>{duration_threshold:.1f}ms) ===")
+        else:
+            bottleneck_events = self.raw_data[threshold_model.flag(self.raw_data)]
+            print(f"\n=== Statistical Bottlenecks ({threshold_model.describe()}) ===")
         print(f"Bottleneck events: {len(bottleneck_events):,} ({len(bottleneck_events)/len(self.raw_data)*100:.1f}%)")
         
-        bottleneck_activities = bottleneck_events['activity'].value_counts()
+        bottleneck_activities = bottleneck_events['activity'].value_counts().loc[lambda counts: counts > 0]
         print("Most problematic activities:")
         print(bottleneck_activities.head(10))
         
@@ -352,15 +407,18 @@ def main():
         # Phase 3.2: Process Discovery
         miner.discover_processes(['inductive', 'heuristic'])  # Skip alpha for large datasets
         
-        # Phase 3.3: Process Analysis
-        miner.analyze_process_variants(top_n=15)
-        bottlenecks = miner.identify_bottlenecks()
-        
-        # Visualization
+        # Visualization (renders in the background while the analysis continues)
         miner.visualize_processes()
         
+        # Phase 3.3: Process Analysis
+        mode = input("Variant report - 'exact' or 'clustered' near-identical traces (press Enter for exact): ").strip().lower()
+        miner.analyze_process_variants(top_n=15, mode='clustered' if mode == 'clustered' else 'exact')
+        mode = input("Bottleneck thresholds - 'global' 95th percentile or 'adaptive' per process/syscall (press Enter for global): ").strip().lower()
+        bottlenecks = miner.identify_bottlenecks(threshold_model=ThresholdModel() if mode == 'adaptive' else None)
+        
         # Final report
         miner.generate_summary_report()
+        miner.render_queue.shutdown()
         
         print(f"\n✅ Process mining pipeline completed successfully!")
         print(f"Check the 'process_models/' directory for visualizations.")
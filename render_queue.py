@@ -0,0 +1,192 @@
+import os
+import json
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+matplotlib.use('Agg')
+
+from artifact_cache import ArtifactCache, canonical_dot_source, fingerprint
+
+# Resolution and format for every rendered output, keyed by output name.
+# Entries not listed here fall back to 'default'.
+RENDER_CONFIG = {
+    'default': {'dpi': 300, 'format': 'png'},
+    'baseline_analysis': {'dpi': 300, 'format': 'png'},
+    'bottleneck_analysis_dashboard': {'dpi': 300, 'format': 'png'},
+    'bottleneck_heatmap': {'dpi': 300, 'format': 'png'},
+    'bottleneck_chart': {'dpi': 300, 'format': 'png'},
+    'flow_diagram': {'dpi': 300, 'format': 'png'},
+    'all_processes_overview': {'dpi': 300, 'format': 'png'},
+    'activity_analysis': {'dpi': 300, 'format': 'png'},
+    'timeline_analysis': {'dpi': 300, 'format': 'png'},
+    'thread_concurrency': {'dpi': 300, 'format': 'png'},
+    'process_model': {'dpi': 150, 'format': 'png'},
+}
+
+
+def load_render_config(config_file="render_config.json"):
+    """Load RENDER_CONFIG overrides from a JSON file, if present"""
+    config = {name: dict(settings) for name, settings in RENDER_CONFIG.items()}
+    if config_file and os.path.exists(config_file):
+        with open(config_file) as f:
+            for name, settings in json.load(f).items():
+                config.setdefault(name, {}).update(settings)
+    return config
+
+
+def _init_render_worker():
+    """Force the non-interactive backend in every render worker"""
+    import matplotlib
+    matplotlib.use('Agg')
+
+
+def _run_plot_job(plot_fn, data, output_stem, dpi, fmt, savefig_kwargs):
+    """Build a matplotlib figure from plot data and save it"""
+    import matplotlib.pyplot as plt
+
+    fig = plot_fn(data)
+    output_path = f"{output_stem}.{fmt}"
+    kwargs = dict(savefig_kwargs or {})
+    if fmt != 'png':
+        kwargs.pop('metadata', None)
+    fig.savefig(output_path, dpi=dpi, format=fmt, bbox_inches='tight', **kwargs)
+    plt.close(fig)
+    return output_path
+
+
+def _run_graphviz_job(source, engine, output_stem, fmt):
+    """Render a graphviz source string"""
+    import graphviz
+
+    graphviz.Source(source, engine=engine).render(output_stem, format=fmt, cleanup=True)
+    return f"{output_stem}.{fmt}"
+
+
+def graphviz_source(gviz, dpi=None):
+    """Extract the dot source from a graphviz or pydotplus graph"""
+    if hasattr(gviz, 'source'):
+        if dpi is not None:
+            gviz.attr(dpi=str(dpi))
+        return gviz.source, getattr(gviz, 'engine', 'dot')
+    if hasattr(gviz, 'to_string'):
+        if dpi is not None:
+            gviz.set_dpi(str(dpi))
+        return gviz.to_string(), 'dot'
+    raise TypeError(f"Unsupported graph type: {type(gviz).__name__}")
+
+
+class RenderQueue:
+    def __init__(self, max_workers=None, config=None, cache=None, use_cache=True):
+        """
+        Queue matplotlib and graphviz jobs onto a process pool
+
+        Parameters:
+        - max_workers: Pool size (None = CPU count, 0 = render inline on the caller)
+        - config: Per-output render settings (defaults to RENDER_CONFIG / render_config.json)
+        - cache: ArtifactCache used to skip charts whose input data is unchanged
+        - use_cache: Set False to force every output to re-render
+        """
+        self.max_workers = max_workers
+        self.config = config if config is not None else load_render_config()
+        self.cache = (cache or ArtifactCache()) if use_cache else None
+        self.executor = None
+        self.pending = []
+        self.results = []
+
+    def settings_for(self, output_name):
+        """Get dpi/format for a named output"""
+        settings = dict(self.config.get('default', RENDER_CONFIG['default']))
+        settings.update(self.config.get(output_name, {}))
+        return settings
+
+    def _get_executor(self):
+        if self.executor is None and self.max_workers != 0:
+            self.executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                initializer=_init_render_worker)
+        return self.executor
+
+    def _submit(self, output_path, fp, fn, *args):
+        if self.cache is not None and self.cache.is_fresh(output_path, fp):
+            self.cache.mark_reused(output_path, fp)
+            self.results.append({'output': output_path, 'path': output_path, 'status': 'reused'})
+            return
+        
+        executor = self._get_executor()
+        if executor is None:
+            self._record(output_path, fp, fn, args)
+            return
+        try:
+            future = executor.submit(fn, *args)
+        except Exception as e:
+            print(f"⚠️  Render pool unavailable ({e}), rendering {output_path} inline")
+            self._record(output_path, fp, fn, args)
+            return
+        self.pending.append((output_path, fp, future))
+
+    def _record(self, output_path, fp, fn, args):
+        try:
+            self._finish(output_path, fp, fn(*args), None)
+        except Exception as e:
+            self._finish(output_path, fp, None, e)
+
+    def _finish(self, output_path, fp, path, error):
+        if error is None:
+            if self.cache is not None:
+                self.cache.mark_rendered(output_path, fp)
+            self.results.append({'output': output_path, 'path': path, 'status': 'rendered'})
+        else:
+            print(f"❌ Error rendering {output_path}: {error}")
+            if self.cache is not None:
+                self.cache.mark_failed(output_path, fp)
+            self.results.append({'output': output_path, 'path': None, 'status': 'failed', 'error': str(error)})
+
+    def submit_plot(self, output_name, plot_fn, data, output_stem, savefig_kwargs=None):
+        """
+        Queue a matplotlib chart
+
+        Parameters:
+        - output_name: Key into the render config
+        - plot_fn: Module-level function building a figure from data
+        - data: Pre-aggregated plot data (kept small, it is pickled to the worker)
+        - output_stem: Output path without extension
+        """
+        settings = self.settings_for(output_name)
+        output_path = f"{output_stem}.{settings['format']}"
+        fp = fingerprint((plot_fn, data, settings, savefig_kwargs))
+        self._submit(output_path, fp, _run_plot_job, plot_fn, data, output_stem,
+                     settings['dpi'], settings['format'], savefig_kwargs)
+
+    def submit_graphviz(self, output_name, gviz, output_stem):
+        """Queue a graphviz model render"""
+        settings = self.settings_for(output_name)
+        source, engine = graphviz_source(gviz, settings['dpi'])
+        output_path = f"{output_stem}.{settings['format']}"
+        fp = fingerprint((canonical_dot_source(source), engine, settings))
+        self._submit(output_path, fp, _run_graphviz_job, source, engine, output_stem, settings['format'])
+
+    def wait(self):
+        """Block until every queued job has finished and return the job results"""
+        for output_path, fp, future in self.pending:
+            try:
+                self._finish(output_path, fp, future.result(), None)
+            except Exception as e:
+                self._finish(output_path, fp, None, e)
+        self.pending = []
+
+        if self.cache is not None:
+            self.cache.save()
+
+        rendered = sum(1 for r in self.results if r['status'] == 'rendered')
+        reused = sum(1 for r in self.results if r['status'] == 'reused')
+        if self.results:
+            print(f"🎨 Render queue finished: {rendered} rendered, {reused} reused, "
+                  f"{len(self.results) - rendered - reused} failed")
+        return self.results
+
+    def shutdown(self):
+        """Wait for outstanding jobs and stop the worker pool"""
+        results = self.wait()
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+        return results
@@ -0,0 +1,225 @@
+import numpy as np
+import pandas as pd
+
+from event_schema import read_event_log
+from trace_variants import case_sorted_codes
+
+
+PATTERN_COLUMNS = ['resource', 'pattern', 'length', 'support', 'support_share', 'occurrences',
+                   'mean_span_ms', 'p50_span_ms', 'p95_span_ms', 'mean_service_ms']
+
+
+class EncodedTraces:
+    def __init__(self, df):
+        """
+        Integer-encoded traces of an event frame
+
+        Events are ordered by (case, timestamp) once; a trace is a slice of
+        the flat activity code array between consecutive case starts. Start
+        and end times (µs) and durations are kept aligned for latency
+        statistics of pattern occurrences.
+
+        Parameters:
+        - df: Event frame (usually the events of one process)
+        """
+        order, case_codes, self.codes, self.activities, self.case_starts, self.cases = case_sorted_codes(df)
+        self.case_ends = np.r_[self.case_starts[1:], len(order)].astype(np.int64)
+        self.case_of = np.repeat(np.arange(len(self.case_starts)), self.case_ends - self.case_starts)
+        self.durations = df['duration_ms'].to_numpy(dtype=np.float64)[order]
+        self.end_us = df['timestamp'].values.astype('datetime64[us]').astype(np.int64)[order]
+        self.start_us = self.end_us - np.round(self.durations * 1000).astype(np.int64)
+        self.n_items = len(self.activities)
+
+    def __len__(self):
+        return len(self.case_starts)
+
+    def decode(self, codes):
+        return tuple(self.activities[c] for c in codes)
+
+
+def _pattern_stats(traces, resource, pattern_codes, case_ids, first_pos, last_pos, service, occurrences):
+    """Support and latency statistics of one pattern from its occurrences"""
+    spans = (traces.end_us[last_pos] - traces.start_us[first_pos]) / 1000
+    support = len(np.unique(case_ids))
+    return {
+        'resource': resource,
+        'pattern': traces.decode(pattern_codes),
+        'length': len(pattern_codes),
+        'support': support,
+        'support_share': support / len(traces),
+        'occurrences': occurrences,
+        'mean_span_ms': spans.mean(),
+        'p50_span_ms': np.percentile(spans, 50),
+        'p95_span_ms': np.percentile(spans, 95),
+        'mean_service_ms': service.mean()
+    }
+
+
+def frequent_ngrams(traces, lengths=(2, 3, 4), min_support=0.05, resource=None, top_k=None):
+    """
+    Frequent contiguous n-grams
+
+    Every n-gram is one integer key built from shifted code arrays
+    (code[i] * base^(n-1) + ... + code[i+n-1]), so counting is a single
+    np.unique per length. Support is the number of cases containing the
+    n-gram; span is first start to last end of an occurrence, service the
+    summed durations of its calls.
+
+    Parameters:
+    - traces: EncodedTraces
+    - lengths: n-gram lengths to mine
+    - min_support: Minimum share of cases containing the n-gram
+    - top_k: Keep only the k most supported n-grams per length
+    """
+    rows = []
+    codes = traces.codes.astype(np.int64)
+    service_cumsum = np.r_[0, np.cumsum(traces.durations)]
+    min_cases = max(1, int(np.ceil(min_support * len(traces))))
+    for n in lengths:
+        positions = np.flatnonzero(np.arange(len(codes)) + n <= traces.case_ends[traces.case_of])
+        if len(positions) == 0:
+            continue
+        keys = np.zeros(len(positions), dtype=np.int64)
+        for shift in range(n):
+            keys = keys * traces.n_items + codes[positions + shift]
+        case_keys = np.unique(traces.case_of[positions] * (traces.n_items ** n) + keys)
+        patterns, supports = np.unique(case_keys % (traces.n_items ** n), return_counts=True)
+        frequent = patterns[supports >= min_cases]
+        if top_k is not None:
+            frequent = frequent[np.argsort(-supports[supports >= min_cases], kind='stable')[:top_k]]
+
+        order = np.argsort(keys, kind='stable')
+        sorted_keys = keys[order]
+        for key in frequent:
+            hits = positions[order[np.searchsorted(sorted_keys, key, 'left'):np.searchsorted(sorted_keys, key, 'right')]]
+            pattern_codes = [key // traces.n_items ** (n - 1 - k) % traces.n_items for k in range(n)]
+            rows.append(_pattern_stats(traces, resource, pattern_codes, traces.case_of[hits], hits, hits + n - 1,
+                                       service_cumsum[hits + n] - service_cumsum[hits], len(hits)))
+    return _pattern_frame(rows)
+
+
+def _first_occurrences(traces, owners, starts):
+    """
+    First position of every item in every projected suffix
+
+    owners/starts give the case and the first flat position of each suffix.
+    Returns (suffix index, item, flat position) for every distinct item.
+    """
+    lengths = traces.case_ends[owners] - starts
+    lengths = np.maximum(lengths, 0)
+    suffix = np.repeat(np.arange(len(starts)), lengths)
+    positions = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths) + np.repeat(starts, lengths)
+    keys = suffix.astype(np.int64) * traces.n_items + traces.codes[positions]
+    unique_keys, first = np.unique(keys, return_index=True)
+    return unique_keys // traces.n_items, unique_keys % traces.n_items, positions[first]
+
+
+def prefixspan(traces, min_support=0.2, max_length=8, resource=None):
+    """
+    Frequent (gapped) sequential patterns with PrefixSpan
+
+    Projected databases are pseudo-projections: (case, start position) arrays
+    into the flat code array, and each projection step finds the first
+    occurrence of every item in every suffix with one vectorized np.unique.
+    Support counts cases; latency statistics use the leftmost embedding of
+    the pattern in each supporting case.
+
+    Parameters:
+    - traces: EncodedTraces
+    - min_support: Minimum share of cases containing the pattern
+    - max_length: Longest pattern to grow
+    """
+    min_cases = max(1, int(np.ceil(min_support * len(traces))))
+    rows = []
+    # Projection state per supporting case: case, next start, first match position, summed service
+    stack = [((), np.arange(len(traces)), traces.case_starts.astype(np.int64),
+              np.full(len(traces), -1, dtype=np.int64), np.zeros(len(traces)))]
+    while stack:
+        prefix, owners, starts, first_pos, service = stack.pop()
+        if len(prefix) >= max_length:
+            continue
+        suffix, items, positions = _first_occurrences(traces, owners, starts)
+        supports = np.bincount(items, minlength=traces.n_items)
+        for item in np.flatnonzero(supports >= min_cases):
+            hit = items == item
+            hit_suffix, hit_pos = suffix[hit], positions[hit]
+            pattern = prefix + (item,)
+            new_first = np.where(first_pos[hit_suffix] < 0, hit_pos, first_pos[hit_suffix])
+            new_service = service[hit_suffix] + traces.durations[hit_pos]
+            if len(pattern) > 1:
+                rows.append(_pattern_stats(traces, resource, pattern, owners[hit_suffix], new_first, hit_pos,
+                                           new_service, len(hit_pos)))
+            stack.append((pattern, owners[hit_suffix], hit_pos + 1, new_first, new_service))
+    return _pattern_frame(rows)
+
+
+def _pattern_frame(rows):
+    if not rows:
+        return pd.DataFrame(columns=PATTERN_COLUMNS)
+    frame = pd.DataFrame(rows, columns=PATTERN_COLUMNS)
+    return frame.sort_values(['support', 'length'], ascending=False).reset_index(drop=True)
+
+
+def representative_sequence(patterns, min_support=0.2, max_length=8):
+    """
+    Most informative frequent pattern: the longest one with at least
+    min_support case share (ties go to the higher support)
+    """
+    frequent = patterns[(patterns['support_share'] >= min_support) & (patterns['length'] <= max_length)]
+    if len(frequent) == 0:
+        return list(patterns['pattern'].iloc[0]) if len(patterns) else []
+    best = frequent.sort_values(['length', 'support'], ascending=False).iloc[0]
+    return list(best['pattern'])
+
+
+def mine_sequences(df, group_col='resource', ngram_lengths=(2, 3, 4), ngram_support=0.05,
+                   pattern_support=0.2, max_length=8, min_trace_length=3):
+    """
+    Frequent n-grams and sequential patterns per group (process)
+
+    Returns {group: {'cases', 'ngrams', 'patterns', 'sequence'}} where
+    sequence is the representative pattern of the group.
+    """
+    results = {}
+    for group, group_data in df.groupby(group_col, observed=True, sort=True):
+        case_sizes = group_data.groupby('case_id', observed=True)['activity'].transform('size')
+        group_data = group_data[case_sizes.to_numpy() >= min_trace_length]
+        if len(group_data) == 0:
+            continue
+        traces = EncodedTraces(group_data)
+        patterns = prefixspan(traces, pattern_support, max_length, resource=group)
+        results[group] = {
+            'cases': len(traces),
+            'ngrams': frequent_ngrams(traces, ngram_lengths, ngram_support, resource=group),
+            'patterns': patterns,
+            'sequence': representative_sequence(patterns, pattern_support, max_length)
+        }
+    return results
+
+
+def main():
+    """Mine frequent syscall n-grams and sequential patterns per process"""
+    csv_file = input("Enter CSV file name: ").strip()
+    support = input("Minimum pattern support as a share of cases (press Enter for 0.2): ").strip()
+    support = float(support) if support else 0.2
+
+    try:
+        df = read_event_log(csv_file)
+        results = mine_sequences(df, pattern_support=support)
+        for process, result in results.items():
+            print(f"\n=== {process} ({result['cases']:,} cases) ===")
+            print(f"Representative sequence: {' → '.join(result['sequence'])}")
+            print("Top n-grams:")
+            print(result['ngrams'].head(10)[['pattern', 'support', 'occurrences', 'mean_span_ms', 'p95_span_ms']])
+            print("Longest frequent patterns:")
+            print(result['patterns'].sort_values(['length', 'support'], ascending=False)
+                  .head(10)[['pattern', 'support_share', 'mean_span_ms', 'p95_span_ms']])
+        return results
+
+    except FileNotFoundError as e:
+        print(f"❌ File not found: {e}")
+    except Exception as e:
+        print(f"❌ Error: {e}")
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,27 @@
-import pandas as pd
 import pm4py
 import matplotlib.pyplot as plt
 import seaborn as sns
+import numpy as np
 from datetime import datetime
 import os
+from pm4py.visualization.petri_net import visualizer as pn_visualizer
+from pm4py.visualization.bpmn import visualizer as bpmn_visualizer
+from render_queue import RenderQueue
+from event_schema import read_event_log, compact_categories, widen_floats
+from time_rollups import RollupCube
+from preprocessing import add_pm4py_aliases, pm4py_frame
+from model_store import ModelStore
+from stage_analytics import analyze_stages
 
 class SingleProcessAnalyzer:
-    def __init__(self):
+    def __init__(self, render_queue=None, model_store=None):
         self.raw_data = None
+        self.rollups = None
+        self.render_queue = render_queue or RenderQueue()
+        self.model_store = model_store or ModelStore()
         self.filtered_data = None
         self.event_log = None
+        self.case_count = 0
         self.selected_process = None
         self.process_stats = {}
         
@@ -18,8 +30,8 @@ class SingleProcessAnalyzer:
         print(f"Loading data from {csv_file}...")
         
         try:
-            self.raw_data = pd.read_csv(csv_file)
-            self.raw_data['timestamp'] = pd.to_datetime(self.raw_data['timestamp'])
+            self.raw_data = read_event_log(csv_file)
+            self.rollups = RollupCube(self.raw_data)
             print(f"✅ Loaded {len(self.raw_data):,} events")
             
             # Show available processes
@@ -32,11 +44,11 @@ class SingleProcessAnalyzer:
     def _show_available_processes(self):
         """Display available processes for selection"""
         print("\n=== Available Processes ===")
-        process_stats = self.raw_data.groupby('resource').agg({
+        process_stats = self.raw_data.groupby('resource', observed=True).agg({
             'case_id': 'nunique',
             'activity': 'count',
             'duration_ms': ['mean', 'sum']
-        }).round(2)
+        }).pipe(widen_floats).round(2)
         
         process_stats.columns = ['Sessions', 'Total_Events', 'Avg_Duration_ms', 'Total_Time_ms']
         process_stats = process_stats.sort_values('Total_Events', ascending=False)
@@ -67,6 +79,7 @@ class SingleProcessAnalyzer:
             
         self.selected_process = process_name
         self.filtered_data = self.raw_data[self.raw_data['resource'] == process_name].copy()
+        compact_categories(self.filtered_data)
         
         print(f"\n=== Selected Process: {process_name} ===")
         print(f"Total events: {len(self.filtered_data):,}")
@@ -74,13 +87,12 @@ class SingleProcessAnalyzer:
         print(f"Time span: {self.filtered_data['timestamp'].min()} to {self.filtered_data['timestamp'].max()}")
         
         # Prepare for pm4py
-        self.filtered_data['case:concept:name'] = self.filtered_data['case_id']
-        self.filtered_data['concept:name'] = self.filtered_data['activity']
-        self.filtered_data['time:timestamp'] = self.filtered_data['timestamp']
+        add_pm4py_aliases(self.filtered_data)
         
-        # Convert to event log
-        self.event_log = pm4py.convert_to_event_log(self.filtered_data)
-        print(f"✅ Created event log with {len(self.event_log)} cases")
+        # Case-sorted frame that pm4py reads directly
+        self.event_log = pm4py_frame(self.filtered_data)
+        self.case_count = self.event_log['case:concept:name'].nunique()
+        print(f"✅ Created event log with {self.case_count} cases")
         
     def analyze_process_behavior(self):
         """Analyze the selected process behavior in detail"""
@@ -90,10 +102,10 @@ class SingleProcessAnalyzer:
         print(f"\n=== {self.selected_process} Behavior Analysis ===")
         
         # Activity frequency analysis
-        activity_stats = self.filtered_data.groupby('activity').agg({
+        activity_stats = self.filtered_data.groupby('activity', observed=True).agg({
             'duration_ms': ['count', 'mean', 'median', 'std', 'min', 'max'],
             'case_id': 'nunique'
-        }).round(2)
+        }).pipe(widen_floats).round(2)
         
         activity_stats.columns = ['Count', 'Mean_Duration', 'Median_Duration', 'Std_Duration', 'Min_Duration', 'Max_Duration', 'Cases_Used']
         activity_stats = activity_stats.sort_values('Count', ascending=False)
@@ -102,8 +114,7 @@ class SingleProcessAnalyzer:
         print(activity_stats)
         
         # Temporal patterns
-        self.filtered_data['hour'] = self.filtered_data['timestamp'].dt.hour
-        hourly_activity = self.filtered_data.groupby('hour').size()
+        hourly_activity = self.rollups.by_hour_of_day(resource=self.selected_process)
         
         print(f"\n🕐 Most active hour: {hourly_activity.idxmax()}:00 ({hourly_activity.max()} events)")
         print(f"🕐 Least active hour: {hourly_activity.idxmin()}:00 ({hourly_activity.min()} events)")
@@ -121,6 +132,28 @@ class SingleProcessAnalyzer:
             'slow_operations': slow_operations if 'duration_ms' in self.filtered_data.columns else None
         }
         
+    def analyze_stages(self, top_n=10):
+        """Time-in-stage ranking and stage transitions for the selected process"""
+        if self.selected_process is None:
+            raise ValueError("No process selected. Call select_process() first.")
+            
+        print(f"\n=== {self.selected_process} Stage Analysis ===")
+        
+        if 'process_stage' not in self.filtered_data.columns:
+            print("⚠️  No process_stage column - stage analysis skipped")
+            return None
+            
+        stages = analyze_stages(self.filtered_data)
+        
+        print("🧭 Stage ranking by total time in stage:")
+        print(stages['stages'].head(top_n))
+        print("\n🔀 Stage transitions:")
+        print(stages['transitions'].head(top_n))
+        
+        self.process_stats['stage_ranking'] = stages['stages']
+        self.process_stats['stage_transitions'] = stages['transitions']
+        return stages['stages']
+        
     def discover_process_model(self):
         """Discover process model for the selected process"""
         if self.event_log is None:
@@ -129,27 +162,30 @@ class SingleProcessAnalyzer:
         print(f"\n=== Process Discovery for {self.selected_process} ===")
         
         try:
-            # Use Inductive Miner (best for single process)
-            net, initial_marking, final_marking = pm4py.discover_petri_net_inductive(self.event_log)
+            # Use Inductive Miner (best for single process), reusing a stored
+            # model when the process's variant profile has not changed
+            (net, initial_marking, final_marking), _ = self.model_store.get_or_discover(
+                'inductive', self.filtered_data, {'process': self.selected_process},
+                lambda: pm4py.discover_petri_net_inductive(self.event_log))
             
             # Create output directory
             output_dir = f"single_process_analysis/{self.selected_process.replace('.exe', '')}"
             os.makedirs(output_dir, exist_ok=True)
             
-            # Visualize and save
-            gviz = pm4py.vis.view_petri_net(net, initial_marking, final_marking, format="png")
+            # Visualize and queue for rendering
+            gviz = pn_visualizer.apply(net, initial_marking, final_marking)
             output_path = f"{output_dir}/process_model"
-            gviz.render(output_path, format='png', cleanup=True)
+            self.render_queue.submit_graphviz('process_model', gviz, output_path)
             
-            print(f"✅ Process model saved to {output_path}.png")
+            print(f"✅ Process model queued for {output_path}")
             
             # Also try BPMN for better readability
             try:
                 bpmn_model = pm4py.convert_to_bpmn(net, initial_marking, final_marking)
-                gviz_bpmn = pm4py.vis.view_bpmn(bpmn_model, format="png")
+                gviz_bpmn = bpmn_visualizer.apply(bpmn_model)
                 bpmn_path = f"{output_dir}/process_model_bpmn"
-                gviz_bpmn.render(bpmn_path, format='png', cleanup=True)
-                print(f"✅ BPMN model saved to {bpmn_path}.png")
+                self.render_queue.submit_graphviz('process_model', gviz_bpmn, bpmn_path)
+                print(f"✅ BPMN model queued for {bpmn_path}")
             except:
                 print("⚠️  BPMN conversion not available")
             
@@ -167,11 +203,11 @@ class SingleProcessAnalyzer:
         
         # Convert to list for easier handling
         variants_list = []
-        for variant, cases in variants.items():
+        for variant, count in variants.items():
             variants_list.append({
                 'variant': ' → '.join(variant),
-                'count': len(cases),
-                'percentage': len(cases) / len(self.event_log) * 100
+                'count': count,
+                'percentage': count / self.case_count * 100
             })
         
         variants_sorted = sorted(variants_list, key=lambda x: x['count'], reverse=True)
@@ -185,8 +221,8 @@ class SingleProcessAnalyzer:
             print()
             
         # Coverage analysis
-        top_5_coverage = sum(v['count'] for v in variants_sorted[:5]) / len(self.event_log) * 100
-        top_10_coverage = sum(v['count'] for v in variants_sorted[:10]) / len(self.event_log) * 100
+        top_5_coverage = sum(v['count'] for v in variants_sorted[:5]) / self.case_count * 100
+        top_10_coverage = sum(v['count'] for v in variants_sorted[:10]) / self.case_count * 100
         
         print(f"📊 Top 5 variants cover {top_5_coverage:.1f}% of cases")
         print(f"📊 Top 10 variants cover {top_10_coverage:.1f}% of cases")
@@ -201,44 +237,25 @@ class SingleProcessAnalyzer:
         output_dir = f"single_process_analysis/{self.selected_process.replace('.exe', '')}"
         os.makedirs(output_dir, exist_ok=True)
         
-        # Set up plotting style
-        plt.style.use('default')
-        sns.set_palette("husl")
-        
-        # 1. Activity frequency chart
-        plt.figure(figsize=(12, 6))
-        activity_counts = self.filtered_data['activity'].value_counts()
-        plt.subplot(1, 2, 1)
-        activity_counts.plot(kind='bar')
-        plt.title(f'{self.selected_process} - Activity Frequency')
-        plt.xlabel('Activity')
-        plt.ylabel('Count')
-        plt.xticks(rotation=45)
-        
-        # 2. Duration distribution
+        # Aggregate chart inputs here; drawing happens in the render queue
+        activity_data = {
+            'process': self.selected_process,
+            'activity_counts': self.filtered_data['activity'].value_counts(),
+            'duration_hist': None
+        }
         if 'duration_ms' in self.filtered_data.columns:
-            plt.subplot(1, 2, 2)
-            self.filtered_data['duration_ms'].hist(bins=50)
-            plt.title(f'{self.selected_process} - Duration Distribution')
-            plt.xlabel('Duration (ms)')
-            plt.ylabel('Frequency')
-            
-        plt.tight_layout()
-        plt.savefig(f'{output_dir}/activity_analysis.png', dpi=300, bbox_inches='tight')
-        plt.close()
-        
-        # 3. Timeline activity
-        plt.figure(figsize=(14, 6))
-        hourly_activity = self.filtered_data.groupby(self.filtered_data['timestamp'].dt.hour).size()
-        plt.plot(hourly_activity.index, hourly_activity.values, marker='o')
-        plt.title(f'{self.selected_process} - Activity Timeline (24-hour)')
-        plt.xlabel('Hour of Day')
-        plt.ylabel('Number of Events')
-        plt.grid(True, alpha=0.3)
-        plt.savefig(f'{output_dir}/timeline_analysis.png', dpi=300, bbox_inches='tight')
-        plt.close()
-        
-        print(f"✅ Visualizations saved in {output_dir}/")
+            activity_data['duration_hist'] = np.histogram(self.filtered_data['duration_ms'].dropna(), bins=50)
+        self.render_queue.submit_plot('activity_analysis', _plot_activity_analysis,
+                                      activity_data, f'{output_dir}/activity_analysis')
+        
+        timeline_data = {
+            'process': self.selected_process,
+            'hourly_activity': self.rollups.by_hour_of_day(resource=self.selected_process)
+        }
+        self.render_queue.submit_plot('timeline_analysis', _plot_timeline_analysis,
+                                      timeline_data, f'{output_dir}/timeline_analysis')
+        
+        print(f"✅ Visualizations queued in {output_dir}/")
         
     def generate_process_report(self):
         """Generate a comprehensive report for the selected process"""
@@ -267,16 +284,62 @@ class SingleProcessAnalyzer:
         print(f"Most Common Activity: {most_common_activity} ({most_common_count:,} times)")
         
         if 'duration_ms' in self.filtered_data.columns:
-            slowest_activity = self.filtered_data.groupby('activity')['duration_ms'].mean().idxmax()
-            slowest_duration = self.filtered_data.groupby('activity')['duration_ms'].mean().max()
+            slowest_activity = self.filtered_data.groupby('activity', observed=True)['duration_ms'].mean().idxmax()
+            slowest_duration = self.filtered_data.groupby('activity', observed=True)['duration_ms'].mean().max()
             print(f"Slowest Activity: {slowest_activity} ({slowest_duration:.2f}ms avg)")
             
+        if 'stage_ranking' in self.process_stats:
+            (workflow, stage), slowest = next(self.process_stats['stage_ranking'].iterrows())
+            print(f"Slowest Stage: {stage} in {workflow} ({slowest['mean_ms']:.1f}ms avg, p95 {slowest['p95_ms']:.1f}ms)")
+            
         print(f"\n📁 OUTPUT FILES")
         print(f"Process Model: {output_dir}/process_model.png")
         print(f"BPMN Model: {output_dir}/process_model_bpmn.png (if available)")
         print(f"Activity Charts: {output_dir}/activity_analysis.png")
         print(f"Timeline Chart: {output_dir}/timeline_analysis.png")
 
+def _plot_activity_analysis(data):
+    """Draw activity frequency and duration distribution (runs in a render worker)"""
+    # Set up plotting style
+    plt.style.use('default')
+    sns.set_palette("husl")
+    
+    # 1. Activity frequency chart
+    fig = plt.figure(figsize=(12, 6))
+    plt.subplot(1, 2, 1)
+    data['activity_counts'].plot(kind='bar')
+    plt.title(f"{data['process']} - Activity Frequency")
+    plt.xlabel('Activity')
+    plt.ylabel('Count')
+    plt.xticks(rotation=45)
+    
+    # 2. Duration distribution (pre-binned)
+    if data['duration_hist'] is not None:
+        plt.subplot(1, 2, 2)
+        counts, edges = data['duration_hist']
+        plt.stairs(counts, edges, fill=True)
+        plt.grid(True)
+        plt.title(f"{data['process']} - Duration Distribution")
+        plt.xlabel('Duration (ms)')
+        plt.ylabel('Frequency')
+        
+    plt.tight_layout()
+    return fig
+
+def _plot_timeline_analysis(data):
+    """Draw the hourly activity timeline (runs in a render worker)"""
+    plt.style.use('default')
+    
+    # 3. Timeline activity
+    fig = plt.figure(figsize=(14, 6))
+    hourly_activity = data['hourly_activity']
+    plt.plot(hourly_activity.index, hourly_activity.values, marker='o')
+    plt.title(f"{data['process']} - Activity Timeline (24-hour)")
+    plt.xlabel('Hour of Day')
+    plt.ylabel('Number of Events')
+    plt.grid(True, alpha=0.3)
+    return fig
+
 def main():
     analyzer = SingleProcessAnalyzer()
     
@@ -295,10 +358,12 @@ def main():
         # Run complete analysis
         print("\n🔍 Running comprehensive analysis...")
         analyzer.analyze_process_behavior()
+        analyzer.analyze_stages()
         analyzer.discover_process_model()
         analyzer.analyze_variants(top_n=15)
         analyzer.create_visualizations()
         analyzer.generate_process_report()
+        analyzer.render_queue.shutdown()
         
         print(f"\n✅ Single process analysis completed!")
         print(f"Check the 'single_process_analysis/{analyzer.selected_process.replace('.exe', '')}/' directory for all outputs.")
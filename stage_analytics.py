@@ -0,0 +1,110 @@
+import numpy as np
+import pandas as pd
+
+from baseline_engine import sorted_quantiles
+
+
+STAGE_QUANTILES = {'p50_ms': 0.5, 'p95_ms': 0.95, 'p99_ms': 0.99}
+
+
+def stage_visits(df, stage_col='process_stage', case_col='case_id', timestamp_col='timestamp',
+                 duration_col='duration_ms'):
+    """
+    One row per stage visit: a run of consecutive events of a case in the same stage
+
+    Events are ordered by (case, start) once (start = timestamp - duration_ms)
+    and visits are cut where the case or the stage changes. Each visit has
+    its time in stage (first start to last end), summed service time, event
+    count, the stage that follows it in the case and the transition latency
+    to that stage (next visit start - this visit end, 0 when they overlap).
+    """
+    case_codes, cases = pd.factorize(df[case_col])
+    stage_codes, stages = pd.factorize(df[stage_col], sort=True)
+    end_us = df[timestamp_col].values.astype('datetime64[us]').astype(np.int64)
+    durations = df[duration_col].to_numpy(dtype=np.float64)
+    start_us = end_us - np.round(durations * 1000).astype(np.int64)
+
+    order = np.lexsort((start_us, case_codes))
+    case_codes, stage_codes = case_codes[order], stage_codes[order]
+    start_us, end_us, durations = start_us[order], end_us[order], durations[order]
+
+    bounds = np.flatnonzero(np.r_[True, (case_codes[1:] != case_codes[:-1]) | (stage_codes[1:] != stage_codes[:-1])])
+    visit_case, visit_stage = case_codes[bounds], stage_codes[bounds]
+    visit_start = np.minimum.reduceat(start_us, bounds)
+    visit_end = np.maximum.reduceat(end_us, bounds)
+
+    has_next = np.r_[visit_case[1:] == visit_case[:-1], False]
+    next_stage = np.where(has_next, np.r_[visit_stage[1:], -1], -1)
+    transition = np.where(has_next, np.maximum(np.r_[visit_start[1:], 0] - visit_end, 0) / 1000, np.nan)
+
+    visits = pd.DataFrame({
+        case_col: np.asarray(cases)[visit_case],
+        'stage': pd.Categorical.from_codes(visit_stage, stages),
+        'start': pd.to_datetime(visit_start, unit='us'),
+        'end': pd.to_datetime(visit_end, unit='us'),
+        'time_in_stage_ms': (visit_end - visit_start) / 1000,
+        'service_ms': np.add.reduceat(durations, bounds),
+        'events': np.diff(np.r_[bounds, len(case_codes)]),
+        'next_stage': pd.Categorical.from_codes(next_stage, stages),
+        'transition_ms': transition
+    })
+    for column in ['resource', 'workflow_type']:
+        if column in df.columns:
+            visits.insert(1, column, df[column].to_numpy()[order][bounds])
+    return visits
+
+
+def _grouped_distribution(frame, keys, value_col):
+    """Count, mean, total and exact percentiles of value_col per group, from one sort"""
+    codes = frame.groupby(keys, observed=True, sort=False).ngroup().to_numpy()
+    values = frame[value_col].to_numpy(dtype=np.float64)
+    order = np.lexsort((values, codes))
+    sorted_values = values[order]
+    group_ids, starts, counts = np.unique(codes[order], return_index=True, return_counts=True)
+    totals = np.add.reduceat(sorted_values, starts) if len(starts) else np.zeros(0)
+
+    first_rows = frame.iloc[order[starts]]
+    result = pd.DataFrame({
+        'count': counts,
+        'mean_ms': totals / counts,
+        'total_ms': totals,
+        **{name: sorted_quantiles(sorted_values, starts, counts, q) for name, q in STAGE_QUANTILES.items()}
+    }, index=pd.MultiIndex.from_frame(first_rows[keys]) if len(keys) > 1 else pd.Index(first_rows[keys[0]]))
+    return result
+
+
+def stage_summary(visits):
+    """
+    Stage-level bottleneck ranking
+
+    Time-in-stage distribution per (workflow_type, stage), with each stage's
+    share of its workflow's total stage time, sorted by total time.
+    """
+    keys = ['workflow_type', 'stage'] if 'workflow_type' in visits.columns else ['stage']
+    summary = _grouped_distribution(visits, keys, 'time_in_stage_ms')
+    service = visits.groupby(keys, observed=True)['service_ms'].sum()
+    summary['service_share'] = (service.reindex(summary.index) / summary['total_ms']).to_numpy()
+    if len(keys) > 1:
+        workflow_total = summary.groupby(level=0, observed=True)['total_ms'].transform('sum')
+        summary['share_of_workflow'] = summary['total_ms'] / workflow_total
+    summary = summary.rename(columns={'count': 'visits'})
+    return summary.round(2).sort_values('total_ms', ascending=False)
+
+
+def transition_summary(visits):
+    """Stage-to-stage transition latency distribution, most frequent transitions first"""
+    transitions = visits[visits['next_stage'].notna()]
+    if len(transitions) == 0:
+        return pd.DataFrame(columns=['count', 'mean_ms', 'total_ms', *STAGE_QUANTILES])
+    summary = _grouped_distribution(transitions, ['stage', 'next_stage'], 'transition_ms')
+    return summary.round(2).sort_values('count', ascending=False)
+
+
+def analyze_stages(df, stage_col='process_stage'):
+    """Stage visits, the stage ranking and transition latencies of an event frame"""
+    visits = stage_visits(df, stage_col)
+    return {
+        'visits': visits,
+        'stages': stage_summary(visits),
+        'transitions': transition_summary(visits)
+    }
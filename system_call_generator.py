@@ -2,9 +2,14 @@ import pandas as pd
 import random
 from datetime import datetime, timedelta
 import uuid
+from event_schema import apply_event_schema, memory_report
+from preprocessing import add_pm4py_aliases
 
 class EnhancedSystemCallGenerator:
-    def __init__(self):
+    def __init__(self, seed=None):
+        # Random stream: the shared module-level one, or an independent seeded one
+        self.rng = random if seed is None else random.Random(seed)
+        
         # Define meaningful process workflows with clear business context
         self.process_workflows = {
             'document_editing': {
@@ -260,69 +265,81 @@ class EnhancedSystemCallGenerator:
             stage_start_time = current_time
             
             # Generate 2-5 events per stage
-            stage_events = random.randint(2, 5)
+            stage_events = self.rng.randint(2, 5)
             
             for i in range(stage_events):
-                # Choose activity from stage-specific activities
-                if random.random() < 0.8:  # 80% follow stage pattern
-                    activity = random.choice(stage['activities'])
-                else:  # 20% can be any system call (noise)
-                    all_calls = [call for calls in self.system_calls.values() for call in calls]
-                    activity = random.choice(all_calls)
-                
-                # Determine if this is a bottleneck operation
-                is_bottleneck = any(activity in bottleneck_ops 
-                                  for bottleneck_ops in workflow['bottleneck_patterns'].values())
+                activity = self._choose_activity(stage)
+                is_bottleneck, bottleneck_type = self._bottleneck_info(workflow, activity)
                 
                 # Calculate realistic delay
                 if is_bottleneck:
-                    delay = random.uniform(100, 1000)  # Bottleneck: 100-1000ms
-                    bottleneck_type = next((pattern for pattern, ops in workflow['bottleneck_patterns'].items() 
-                                          if activity in ops), 'unknown')
+                    delay = self.rng.uniform(100, 1000)  # Bottleneck: 100-1000ms
                 else:
-                    delay = random.uniform(1, 50)     # Normal: 1-50ms
-                    bottleneck_type = None
+                    delay = self.rng.uniform(1, 50)     # Normal: 1-50ms
                 
                 current_time += timedelta(milliseconds=delay)
                 
-                # Select appropriate file path based on activity
-                file_path = self._get_contextual_file_path(activity, workflow_type)
-                
-                # Create enhanced event record
-                event = {
-                    # Core process mining attributes
-                    'case_id': f"{workflow_type}_{case_id}",
-                    'activity': activity,
-                    'timestamp': current_time,
-                    'resource': workflow['executable'],
-                    
-                    # Process context
-                    'workflow_type': workflow_type,
-                    'business_process': workflow['description'],
-                    'process_stage': stage['stage_name'],
-                    'stage_description': stage['description'],
-                    
-                    # Technical details
-                    'pid': 2000 + case_id,
-                    'tid': random.randint(100, 999),
-                    'file_path': file_path,
-                    'operation_category': self._categorize_activity(activity),
-                    
-                    # Performance metrics
-                    'duration_ms': round(delay, 2),
-                    'result': 'SUCCESS' if random.random() > 0.03 else 'ERROR',  # 3% error rate
-                    'is_bottleneck': is_bottleneck,
-                    'bottleneck_type': bottleneck_type,
-                    
-                    # Quality labels
-                    'event_quality': self._assess_event_quality(delay, is_bottleneck),
-                    'anomaly_score': self._calculate_anomaly_score(delay, activity, workflow_type)
-                }
-                
-                events.append(event)
+                events.append(self._build_event(workflow_type, case_id, stage, activity, current_time,
+                                                delay, is_bottleneck, bottleneck_type))
         
         return events
     
+    def _choose_activity(self, stage):
+        """Choose the next system call of a stage"""
+        if self.rng.random() < 0.8:  # 80% follow stage pattern
+            return self.rng.choice(stage['activities'])
+        # 20% can be any system call (noise)
+        all_calls = [call for calls in self.system_calls.values() for call in calls]
+        return self.rng.choice(all_calls)
+    
+    def _bottleneck_info(self, workflow, activity):
+        """(is_bottleneck, bottleneck_type) of an activity within a workflow"""
+        is_bottleneck = any(activity in bottleneck_ops 
+                          for bottleneck_ops in workflow['bottleneck_patterns'].values())
+        if not is_bottleneck:
+            return False, None
+        bottleneck_type = next((pattern for pattern, ops in workflow['bottleneck_patterns'].items() 
+                              if activity in ops), 'unknown')
+        return True, bottleneck_type
+    
+    def _build_event(self, workflow_type, case_id, stage, activity, timestamp, delay,
+                     is_bottleneck, bottleneck_type):
+        """Create an enhanced event record for a completed call"""
+        workflow = self.process_workflows[workflow_type]
+        
+        # Select appropriate file path based on activity
+        file_path = self._get_contextual_file_path(activity, workflow_type)
+        
+        return {
+            # Core process mining attributes
+            'case_id': f"{workflow_type}_{case_id}",
+            'activity': activity,
+            'timestamp': timestamp,
+            'resource': workflow['executable'],
+            
+            # Process context
+            'workflow_type': workflow_type,
+            'business_process': workflow['description'],
+            'process_stage': stage['stage_name'],
+            'stage_description': stage['description'],
+            
+            # Technical details
+            'pid': 2000 + case_id,
+            'tid': self.rng.randint(100, 999),
+            'file_path': file_path,
+            'operation_category': self._categorize_activity(activity),
+            
+            # Performance metrics
+            'duration_ms': round(delay, 2),
+            'result': 'SUCCESS' if self.rng.random() > 0.03 else 'ERROR',  # 3% error rate
+            'is_bottleneck': is_bottleneck,
+            'bottleneck_type': bottleneck_type,
+            
+            # Quality labels
+            'event_quality': self._assess_event_quality(delay, is_bottleneck),
+            'anomaly_score': self._calculate_anomaly_score(delay, activity, workflow_type)
+        }
+    
     def _get_contextual_file_path(self, activity, workflow_type):
         """Get contextually appropriate file path based on activity and workflow"""
         if 'File' not in activity and 'Directory' not in activity:
@@ -338,8 +355,8 @@ class EnhancedSystemCallGenerator:
         }
         
         available_contexts = context_mapping.get(workflow_type, ['temp_files'])
-        chosen_context = random.choice(available_contexts)
-        return random.choice(self.file_contexts[chosen_context])
+        chosen_context = self.rng.choice(available_contexts)
+        return self.rng.choice(self.file_contexts[chosen_context])
     
     def _categorize_activity(self, activity):
         """Categorize system call into functional groups"""
@@ -380,16 +397,25 @@ class EnhancedSystemCallGenerator:
     def generate_enhanced_event_log(self, num_cases=1000, time_span_hours=24):
         """Generate enhanced event log with better labeling"""
         base_time = datetime.now() - timedelta(hours=time_span_hours)
-        all_events = []
         
         print(f"Generating enhanced event log with {num_cases} cases...")
         
+        all_events, workflow_distribution = self.generate_cases(range(num_cases), base_time, time_span_hours)
+        df = self.events_to_frame(all_events)
+        
+        print(f"Generated {len(all_events):,} events across {len(workflow_distribution)} workflow types")
+        return df
+    
+    def generate_cases(self, case_ids, base_time, time_span_hours):
+        """Generate the events of the given case ids, returning (events, workflow distribution)"""
+        all_events = []
+        
         # Track workflow distribution
         workflow_distribution = {}
         
-        for case_id in range(num_cases):
+        for case_id in case_ids:
             # Choose workflow type based on weights
-            workflow_type = random.choices(
+            workflow_type = self.rng.choices(
                 list(self.process_workflows.keys()),
                 weights=[w['weight'] for w in self.process_workflows.values()]
             )[0]
@@ -397,26 +423,29 @@ class EnhancedSystemCallGenerator:
             workflow_distribution[workflow_type] = workflow_distribution.get(workflow_type, 0) + 1
             
             # Randomize start time
-            start_offset = random.uniform(0, time_span_hours * 3600)
+            start_offset = self.rng.uniform(0, time_span_hours * 3600)
             start_time = base_time + timedelta(seconds=start_offset)
             
             # Generate workflow events
             workflow_events = self.generate_process_workflow(workflow_type, case_id, start_time)
             all_events.extend(workflow_events)
         
+        return all_events, workflow_distribution
+    
+    def events_to_frame(self, all_events):
+        """Time-ordered event frame in the compact schema with pm4py columns"""
         # Sort by timestamp
         all_events.sort(key=lambda x: x['timestamp'])
         
         # Create DataFrame with enhanced structure
         df = pd.DataFrame(all_events)
         
+        # Compact dtypes (categoricals, int32/float32) shared with the loaders
+        apply_event_schema(df)
+        
         # Add pm4py compatibility columns
-        df['case:concept:name'] = df['case_id']
-        df['concept:name'] = df['activity']
-        df['time:timestamp'] = df['timestamp']
+        add_pm4py_aliases(df)
         df['org:resource'] = df['resource']
-        
-        print(f"Generated {len(all_events):,} events across {len(workflow_distribution)} workflow types")
         return df
     
     def save_enhanced_log(self, df, filename_prefix='enhanced_system_call_log'):
@@ -478,6 +507,7 @@ def main():
     print(f"Unique Cases: {event_log['case_id'].nunique():,}")
     print(f"Unique Activities: {event_log['activity'].nunique()}")
     print(f"Workflow Types: {event_log['workflow_type'].nunique()}")
+    memory_report(event_log)
     
     # Save the enhanced dataset
     main_file = generator.save_enhanced_log(event_log)
@@ -0,0 +1,325 @@
+import os
+
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+
+from event_schema import read_event_log
+from render_queue import RenderQueue
+
+
+def merge_intervals(group_codes, start_us, end_us):
+    """
+    Union of the intervals of every group
+
+    Inputs must be sorted by (group, start). A new segment begins where an
+    interval starts after the latest end of the group's earlier intervals.
+    Returns (group, segment start, segment end) arrays.
+    """
+    if len(group_codes) == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, empty
+    first = np.r_[True, group_codes[1:] != group_codes[:-1]]
+    dense = np.cumsum(first) - 1
+    base = start_us[first][dense]
+    # Running latest end within each group: offset every group past the previous one's range
+    relative_end = end_us - base
+    stride = int(max(relative_end.max(), 0)) + 1
+    running_end = np.maximum.accumulate(dense * stride + relative_end) - dense * stride + base
+    new_segment = first | (start_us > np.r_[0, running_end[:-1]])
+    bounds = np.flatnonzero(new_segment)
+    return group_codes[bounds], start_us[bounds], np.maximum.reduceat(running_end, bounds)
+
+
+class ThreadTimeline:
+    def __init__(self, df):
+        """
+        Per-thread interval timeline
+
+        Events are grouped by (resource, pid, tid) and stored as flat interval
+        arrays sorted by (thread, start) with CSR-style thread offsets: one
+        int64 start/end pair and one activity code per event, plus one row per
+        thread. The busy periods of each thread (the union of its calls) are
+        the basis of the concurrency sweeps.
+
+        Parameters:
+        - df: Event frame with pid and tid columns
+        """
+        threads = df.groupby(['resource', 'pid', 'tid'], observed=True, sort=True)
+        thread_codes = threads.ngroup().to_numpy()
+        end_us = df['timestamp'].values.astype('datetime64[us]').astype(np.int64)
+        durations = df['duration_ms'].to_numpy(dtype=np.float64)
+        start_us = end_us - np.round(durations * 1000).astype(np.int64)
+        activity_codes, self.activities = pd.factorize(df['activity'], sort=True)
+
+        order = np.lexsort((start_us, thread_codes))
+        self.event_threads = thread_codes[order].astype(np.int32)
+        self.start_us = start_us[order]
+        self.end_us = end_us[order]
+        self.durations = durations[order]
+        self.activity_codes = activity_codes[order].astype(np.int32)
+        self.positions = order
+        self.offsets = np.r_[0, np.cumsum(np.bincount(self.event_threads, minlength=threads.ngroups))]
+
+        self.thread_keys = threads.size().index.to_frame(index=False)
+        self.resource_codes, self.resources = pd.factorize(self.thread_keys['resource'], sort=True)
+        self.busy = merge_intervals(self.event_threads, self.start_us, self.end_us)
+
+    def _activity_mask(self, activities):
+        codes = self.activities.get_indexer([activities] if isinstance(activities, str) else activities)
+        return np.isin(self.activity_codes, codes[codes >= 0])
+
+    def threads(self):
+        """One row per thread: events, first start, last end, busy and blocked time"""
+        busy_threads, busy_start, busy_end = self.busy
+        n_threads = len(self.thread_keys)
+        frame = self.thread_keys.copy()
+        frame['events'] = np.diff(self.offsets)
+        frame['first_start'] = pd.to_datetime(np.minimum.reduceat(self.start_us, self.offsets[:-1]), unit='us')
+        frame['last_end'] = pd.to_datetime(np.maximum.reduceat(self.end_us, self.offsets[:-1]), unit='us')
+        frame['busy_ms'] = np.bincount(busy_threads, weights=busy_end - busy_start, minlength=n_threads) / 1000
+        frame['blocked_ms'] = self.blocked_per_thread()
+        return frame
+
+    def blocked_per_thread(self, activities='WaitForSingleObject'):
+        """Time each thread spent blocked in wait calls (overlapping waits counted once)"""
+        mask = self._activity_mask(activities)
+        threads, starts, ends = merge_intervals(self.event_threads[mask], self.start_us[mask], self.end_us[mask])
+        return np.bincount(threads, weights=ends - starts, minlength=len(self.thread_keys)) / 1000
+
+    def blocked_time(self, activities='WaitForSingleObject'):
+        """Per-process blocked time and its share of the threads' busy time"""
+        busy_threads, busy_start, busy_end = self.busy
+        busy = np.bincount(busy_threads, weights=busy_end - busy_start, minlength=len(self.thread_keys)) / 1000
+        blocked = self.blocked_per_thread(activities)
+        summary = pd.DataFrame({
+            'threads': np.bincount(self.resource_codes),
+            'blocked_threads': np.bincount(self.resource_codes, weights=blocked > 0).astype(np.int64),
+            'blocked_ms': np.bincount(self.resource_codes, weights=blocked),
+            'busy_ms': np.bincount(self.resource_codes, weights=busy)
+        }, index=pd.Index(self.resources, name='resource'))
+        summary['blocked_share'] = (summary['blocked_ms'] / summary['busy_ms']).round(4)
+        return summary.sort_values('blocked_ms', ascending=False)
+
+    def _sweep(self, group_codes, starts, ends):
+        """
+        Step function of active intervals per group
+
+        Returns (group, time, level) sorted by (group, time): level is the
+        number of the group's intervals active right after that time.
+        """
+        groups = np.r_[group_codes, group_codes]
+        times = np.r_[starts, ends]
+        deltas = np.r_[np.ones(len(starts), dtype=np.int64), -np.ones(len(ends), dtype=np.int64)]
+        # Ends sort before starts at the same instant, so touching intervals never overlap
+        order = np.lexsort((deltas, times, groups))
+        groups, times, deltas = groups[order], times[order], deltas[order]
+        levels = np.cumsum(deltas)
+        return groups, times, levels
+
+    def active_at(self, group_codes, starts, ends, query_groups, query_times):
+        """Number of a group's intervals active at each query time, by binary search"""
+        key_scale = int(max(ends.max(), query_times.max(), 0)) + 1 if len(ends) else 1
+        start_keys = np.sort(group_codes.astype(np.int64) * key_scale + starts)
+        end_keys = np.sort(group_codes.astype(np.int64) * key_scale + ends)
+        query_keys = query_groups.astype(np.int64) * key_scale + query_times
+        return np.searchsorted(start_keys, query_keys, side='right') - np.searchsorted(end_keys, query_keys, side='right')
+
+    def concurrency(self, freq='1s'):
+        """
+        Per-process thread concurrency profile
+
+        The busy periods of all threads of a process are swept once; for every
+        time bucket the result has the time-weighted mean and the peak number
+        of the process's threads running at once.
+        """
+        busy_threads, busy_start, busy_end = self.busy
+        if len(busy_threads) == 0:
+            return pd.DataFrame(columns=['resource', 'bucket', 'mean_threads', 'peak_threads'])
+        bucket_us = pd.Timedelta(freq).value // 1000
+        origin = busy_start.min() // bucket_us * bucket_us
+        resources = self.resource_codes[busy_threads]
+
+        # Time-weighted mean: split every busy period at bucket edges
+        first_bucket = (busy_start - origin) // bucket_us
+        last_bucket = (np.maximum(busy_end - 1, busy_start) - origin) // bucket_us
+        pieces = last_bucket - first_bucket + 1
+        piece_owner = np.repeat(np.arange(len(busy_start)), pieces)
+        piece_bucket = first_bucket[piece_owner] + np.arange(len(piece_owner)) - np.repeat(np.cumsum(pieces) - pieces, pieces)
+        bucket_start = origin + piece_bucket * bucket_us
+        overlap = (np.minimum(busy_end[piece_owner], bucket_start + bucket_us) -
+                   np.maximum(busy_start[piece_owner], bucket_start))
+        n_buckets = int((busy_end.max() - origin) // bucket_us) + 1
+        cells = resources[piece_owner].astype(np.int64) * n_buckets + piece_bucket
+        mean_threads = np.bincount(cells, weights=overlap, minlength=len(self.resources) * n_buckets) / bucket_us
+
+        # Peak: highest level reached in a bucket, or the level carried into it
+        groups, times, levels = self._sweep(resources, busy_start, busy_end)
+        change_cells = groups.astype(np.int64) * n_buckets + (times - origin) // bucket_us
+        peak_threads = np.zeros(len(self.resources) * n_buckets, dtype=np.int64)
+        np.maximum.at(peak_threads, change_cells, levels)
+        carried = self.active_at(resources, busy_start, busy_end,
+                                 np.repeat(np.arange(len(self.resources)), n_buckets),
+                                 np.tile(origin + np.arange(n_buckets) * bucket_us, len(self.resources)))
+        peak_threads = np.maximum(peak_threads, carried)
+
+        profile = pd.DataFrame({
+            'resource': np.repeat(np.asarray(self.resources), n_buckets),
+            'bucket': pd.to_datetime(np.tile(origin + np.arange(n_buckets) * bucket_us, len(self.resources)), unit='us'),
+            'mean_threads': mean_threads.round(3),
+            'peak_threads': peak_threads
+        })
+        return profile[(profile['peak_threads'] > 0)].reset_index(drop=True)
+
+    def concurrency_summary(self, freq='1s'):
+        """Per-process mean and peak thread concurrency over the buckets where the process ran"""
+        profile = self.concurrency(freq)
+        summary = profile.groupby('resource').agg(
+            active_buckets=('bucket', 'size'),
+            mean_threads=('mean_threads', 'mean'),
+            p95_threads=('peak_threads', lambda p: p.quantile(0.95)),
+            peak_threads=('peak_threads', 'max')
+        )
+        return summary.round(2).sort_values('mean_threads', ascending=False)
+
+    def allocation_overlap(self, alloc='VirtualAlloc', free='VirtualFree'):
+        """
+        Overlapping memory allocation calls per process
+
+        For every allocation call, the number of other threads of the same
+        process that were inside an allocation call when it started, plus the
+        peak number of allocations outstanding (allocations minus frees, in
+        time order) per process.
+        """
+        thread_resources = self.resource_codes[self.event_threads]
+        alloc_mask, free_mask = self._activity_mask(alloc), self._activity_mask(free)
+        alloc_resources = thread_resources[alloc_mask]
+        alloc_start, alloc_end = self.start_us[alloc_mask], self.end_us[alloc_mask]
+
+        in_flight = self.active_at(alloc_resources, alloc_start, alloc_end, alloc_resources, alloc_start) - 1
+        durations = self.durations[alloc_mask]
+
+        # Outstanding allocations: +1 at every allocation end, -1 at every free end
+        groups = np.r_[alloc_resources, thread_resources[free_mask]]
+        times = np.r_[alloc_end, self.end_us[free_mask]]
+        deltas = np.r_[np.ones(alloc_mask.sum(), dtype=np.int64), -np.ones(free_mask.sum(), dtype=np.int64)]
+        order = np.lexsort((times, groups))
+        groups, deltas = groups[order], deltas[order]
+        group_sizes = np.bincount(groups, minlength=len(self.resources))
+        carried = np.r_[0, np.cumsum(deltas)][np.cumsum(group_sizes) - group_sizes]
+        running = np.cumsum(deltas) - np.repeat(carried, group_sizes)
+        peak_outstanding = np.zeros(len(self.resources), dtype=np.int64)
+        np.maximum.at(peak_outstanding, groups, running)
+        max_in_flight = np.zeros(len(self.resources), dtype=np.int64)
+        np.maximum.at(max_in_flight, alloc_resources, in_flight)
+
+        n = len(self.resources)
+        counts = np.bincount(alloc_resources, minlength=n)
+        overlapped = in_flight > 0
+        with np.errstate(divide='ignore', invalid='ignore'):
+            summary = pd.DataFrame({
+                'allocs': counts,
+                'frees': np.bincount(thread_resources[free_mask], minlength=n),
+                'overlapped_share': np.bincount(alloc_resources, weights=overlapped, minlength=n) / counts,
+                'mean_in_flight': np.bincount(alloc_resources, weights=in_flight, minlength=n) / counts,
+                'max_in_flight': max_in_flight,
+                'peak_outstanding': peak_outstanding,
+                'mean_ms_overlapped': np.bincount(alloc_resources[overlapped], weights=durations[overlapped], minlength=n) /
+                                      np.bincount(alloc_resources[overlapped], minlength=n),
+                'mean_ms_alone': np.bincount(alloc_resources[~overlapped], weights=durations[~overlapped], minlength=n) /
+                                 np.bincount(alloc_resources[~overlapped], minlength=n)
+            }, index=pd.Index(self.resources, name='resource'))
+        return summary.round(3).sort_values('allocs', ascending=False)
+
+    def fan_out(self, activities, slow_mask=None):
+        """
+        Thread fan-out around slow calls
+
+        For every call of the given syscalls, the number of the same process's
+        threads busy when it started. Compares slow calls (slow_mask over the
+        original frame, default: above the syscall's 95th percentile) with the
+        rest, per process. A clearly higher concurrency for slow calls points
+        at thread fan-out rather than slow individual calls.
+        """
+        mask = self._activity_mask(activities)
+        thread_resources = self.resource_codes[self.event_threads]
+        busy_threads, busy_start, busy_end = self.busy
+        busy_resources = self.resource_codes[busy_threads]
+
+        call_resources = thread_resources[mask]
+        active = self.active_at(busy_resources, busy_start, busy_end, call_resources, self.start_us[mask])
+        durations = self.durations[mask]
+        if slow_mask is None:
+            calls = pd.DataFrame({'resource': call_resources, 'activity': self.activity_codes[mask], 'duration': durations})
+            slow = (durations > calls.groupby(['resource', 'activity'])['duration'].transform(
+                lambda d: d.quantile(0.95)).to_numpy())
+        else:
+            slow = np.asarray(slow_mask, dtype=bool)[self.positions][mask]
+
+        frame = pd.DataFrame({'resource': np.asarray(self.resources)[call_resources], 'slow': slow,
+                              'active_threads': active})
+        summary = frame.groupby(['resource', 'slow'])['active_threads'].mean().unstack('slow')
+        summary = summary.rename(columns={True: 'threads_when_slow', False: 'threads_otherwise'})
+        summary['calls'] = frame.groupby('resource').size()
+        summary['slow_calls'] = frame.groupby('resource')['slow'].sum()
+        if {'threads_when_slow', 'threads_otherwise'} <= set(summary.columns):
+            summary['fan_out_ratio'] = summary['threads_when_slow'] / summary['threads_otherwise']
+        return summary.round(2)
+
+    def queue_concurrency_chart(self, render_queue, output_stem, freq='1min'):
+        """Queue the per-process concurrency profile chart"""
+        profile = self.concurrency(freq)
+        chart_data = {
+            'mean': profile.pivot(index='bucket', columns='resource', values='mean_threads').fillna(0),
+            'peak': profile.pivot(index='bucket', columns='resource', values='peak_threads').fillna(0),
+            'freq': freq
+        }
+        render_queue.submit_plot('thread_concurrency', _plot_concurrency_profile, chart_data, output_stem)
+
+
+def _plot_concurrency_profile(data):
+    """Draw mean and peak thread concurrency per process (runs in a render worker)"""
+    fig, axes = plt.subplots(2, 1, figsize=(14, 8), sharex=True)
+    data['mean'].plot(ax=axes[0], linewidth=1)
+    axes[0].set_title(f"Mean Concurrent Threads per Process ({data['freq']} buckets)")
+    axes[0].set_ylabel('Threads')
+    data['peak'].plot(ax=axes[1], linewidth=1, legend=False)
+    axes[1].set_title('Peak Concurrent Threads per Process')
+    axes[1].set_ylabel('Threads')
+    axes[1].set_xlabel('Time')
+    plt.tight_layout()
+    return fig
+
+
+def main():
+    """Thread concurrency, blocking and allocation overlap per process"""
+    csv_file = input("Enter CSV file name: ").strip()
+    output_dir = "thread_analysis"
+
+    try:
+        df = read_event_log(csv_file)
+        timeline = ThreadTimeline(df)
+        print(f"✅ {len(timeline.thread_keys):,} threads, {len(timeline.busy[0]):,} busy periods")
+
+        print(f"\n=== Thread concurrency per process ===")
+        print(timeline.concurrency_summary())
+        print(f"\n=== Time blocked in WaitForSingleObject ===")
+        print(timeline.blocked_time())
+        print(f"\n=== Overlapping VirtualAlloc/VirtualFree ===")
+        print(timeline.allocation_overlap())
+        print(f"\n=== Thread fan-out around slow memory calls ===")
+        print(timeline.fan_out(['VirtualAlloc', 'VirtualFree', 'HeapAlloc']))
+
+        os.makedirs(output_dir, exist_ok=True)
+        render_queue = RenderQueue()
+        timeline.queue_concurrency_chart(render_queue, f"{output_dir}/thread_concurrency")
+        render_queue.shutdown()
+        return timeline
+
+    except FileNotFoundError as e:
+        print(f"❌ File not found: {e}")
+    except Exception as e:
+        print(f"❌ Error: {e}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+import numpy as np
+import pandas as pd
+
+from event_index import DurationSketch, sketches_by_group
+
+
+MINUTE_NS = 60 * 10**9
+
+# Bucket width of each level in minutes, finest first
+LEVELS = {'minute': 1, 'hour': 60, 'day': 1440}
+
+
+class RollupCube:
+    def __init__(self, df, relative_accuracy=0.01):
+        """
+        Precomputed time-bucket rollups by resource and activity
+
+        Events are counted and summed once per (minute, resource, activity)
+        cell; hour and day cells are rolled up from the minute cells, and carry
+        a DurationSketch per cell for latency quantiles. Temporal queries
+        (hourly profiles, peak hours, events per hour) read these cells
+        instead of re-deriving timestamp.dt.hour from the events.
+        """
+        timestamps = pd.to_datetime(df['timestamp']).values.astype('datetime64[ns]').astype(np.int64)
+        durations = df['duration_ms'].to_numpy(dtype=np.float64)
+        resource_codes, resources = pd.factorize(df['resource'], sort=True)
+        activity_codes, activities = pd.factorize(df['activity'], sort=True)
+
+        self.resources = list(resources)
+        self.activities = list(activities)
+        self.total_events = len(df)
+        self.start = int(timestamps.min()) if len(df) else 0
+        self.end = int(timestamps.max()) if len(df) else 0
+        self.levels = {}
+
+        n_resources, n_activities = max(len(resources), 1), max(len(activities), 1)
+        minutes = timestamps // MINUTE_NS
+        event_cells = None
+
+        for level, width in LEVELS.items():
+            if level == 'minute':
+                buckets = minutes
+            else:
+                # Roll up the finer level's cells rather than the raw events
+                finer = self.levels[previous]
+                buckets = finer['bucket'] // (width // LEVELS[previous])
+            origin = int(buckets.min()) if len(buckets) else 0
+
+            source_resource = resource_codes if level == 'minute' else finer['resource']
+            source_activity = activity_codes if level == 'minute' else finer['activity']
+            keys = ((buckets - origin) * n_resources + source_resource) * n_activities + source_activity
+            unique_keys, inverse = np.unique(keys, return_inverse=True)
+
+            if level == 'minute':
+                counts = np.bincount(inverse, minlength=len(unique_keys))
+                sums = np.bincount(inverse, weights=durations, minlength=len(unique_keys))
+                event_cells = inverse
+            else:
+                counts = np.bincount(inverse, weights=finer['count'], minlength=len(unique_keys)).astype(np.int64)
+                sums = np.bincount(inverse, weights=finer['sum'], minlength=len(unique_keys))
+                event_cells = inverse[event_cells]
+
+            cells = {
+                'bucket': unique_keys // (n_resources * n_activities) + origin,
+                'resource': (unique_keys // n_activities) % n_resources,
+                'activity': unique_keys % n_activities,
+                'count': counts,
+                'sum': sums,
+                'sketches': None
+            }
+            if level != 'minute':
+                cells['sketches'] = sketches_by_group(event_cells, durations, len(unique_keys), relative_accuracy)
+            self.levels[level] = cells
+            previous = level
+
+    def _mask(self, level, resource=None, activity=None):
+        cells = self.levels[level]
+        mask = np.ones(len(cells['count']), dtype=bool)
+        if resource is not None:
+            code = self.resources.index(resource) if resource in self.resources else -1
+            mask &= cells['resource'] == code
+        if activity is not None:
+            code = self.activities.index(activity) if activity in self.activities else -1
+            mask &= cells['activity'] == code
+        return mask
+
+    def _bucket_start(self, level, buckets):
+        return pd.to_datetime(buckets * LEVELS[level] * MINUTE_NS)
+
+    def counts(self, level='hour', resource=None, activity=None):
+        """Event count per non-empty bucket, indexed by bucket start time"""
+        cells = self.levels[level]
+        mask = self._mask(level, resource, activity)
+        buckets, inverse = np.unique(cells['bucket'][mask], return_inverse=True)
+        counts = np.bincount(inverse, weights=cells['count'][mask], minlength=len(buckets)).astype(np.int64)
+        return pd.Series(counts, index=self._bucket_start(level, buckets), name='count')
+
+    def totals(self, level='hour', resource=None, activity=None):
+        """Summed duration_ms per non-empty bucket, indexed by bucket start time"""
+        cells = self.levels[level]
+        mask = self._mask(level, resource, activity)
+        buckets, inverse = np.unique(cells['bucket'][mask], return_inverse=True)
+        sums = np.bincount(inverse, weights=cells['sum'][mask], minlength=len(buckets))
+        return pd.Series(sums, index=self._bucket_start(level, buckets), name='total_ms')
+
+    def by_hour_of_day(self, resource=None, activity=None):
+        """Event count per hour of day (0-23), only hours with events"""
+        cells = self.levels['hour']
+        mask = self._mask('hour', resource, activity)
+        hours = cells['bucket'][mask] % 24
+        counts = np.bincount(hours, weights=cells['count'][mask], minlength=24).astype(np.int64)
+        present = np.flatnonzero(counts)
+        return pd.Series(counts[present], index=pd.Index(present, name='hour'), name='count')
+
+    def peak_hour(self, resource=None, activity=None):
+        """(hour of day, event count) of the busiest hour of day"""
+        hourly = self.by_hour_of_day(resource, activity)
+        if len(hourly) == 0:
+            return None, 0
+        return int(hourly.idxmax()), int(hourly.max())
+
+    @property
+    def span_hours(self):
+        """Observed time span of the log in hours"""
+        return (self.end - self.start) / (3600 * 10**9)
+
+    def events_per_hour(self, resource=None, activity=None):
+        """Event rate over the log's real time span"""
+        count = int(self.levels['day']['count'][self._mask('day', resource, activity)].sum())
+        return count / self.span_hours if self.span_hours > 0 else float(count)
+
+    def sketch(self, level='hour', resource=None, activity=None, start=None, end=None):
+        """Merged DurationSketch over the matching cells (optionally within [start, end))"""
+        cells = self.levels[level]
+        if cells['sketches'] is None:
+            raise ValueError(f"No sketches kept at {level} level")
+        mask = self._mask(level, resource, activity)
+        bucket_starts = cells['bucket'] * LEVELS[level] * MINUTE_NS
+        if start is not None:
+            mask &= bucket_starts >= pd.Timestamp(start).value
+        if end is not None:
+            mask &= bucket_starts < pd.Timestamp(end).value
+        merged = DurationSketch(cells['sketches'][0].relative_accuracy if cells['sketches'] else 0.01)
+        for position in np.flatnonzero(mask):
+            merged.merge(cells['sketches'][position])
+        return merged
+
+    def quantiles(self, q, level='hour', resource=None, activity=None):
+        """Approximate duration quantile per non-empty bucket"""
+        cells = self.levels[level]
+        mask = self._mask(level, resource, activity)
+        buckets = np.unique(cells['bucket'][mask])
+        values = []
+        for bucket in buckets:
+            merged = DurationSketch(cells['sketches'][0].relative_accuracy)
+            for position in np.flatnonzero(mask & (cells['bucket'] == bucket)):
+                merged.merge(cells['sketches'][position])
+            values.append(merged.quantile(q))
+        return pd.Series(values, index=self._bucket_start(level, buckets), name=f'p{q * 100:g}')
@@ -0,0 +1,254 @@
+import numpy as np
+import pandas as pd
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+
+from case_analytics import case_metrics
+from event_schema import read_event_log
+from trace_variants import case_sorted_codes
+
+
+# Mersenne prime for the universal hash family h(x) = (a * x + b) mod p
+HASH_PRIME = (1 << 31) - 1
+
+
+class TraceClusterer:
+    def __init__(self, ngram=2, num_perm=64, bands=16, threshold=0.3, seed=42, chunk_size=500_000,
+                 stage_col='process_stage'):
+        """
+        Near-duplicate trace clustering with MinHash and LSH banding
+
+        Every case becomes a set of shingles. When the log has a stage column,
+        the shingles are the n-grams of the case's stage sequence (consecutive
+        calls in the same stage collapsed into one step) plus its distinct
+        (stage, activity) pairs: the calls inside a stage vary from case to
+        case, so activity n-grams of two runs of the same workflow share
+        almost nothing, while their stage structure is identical. Without a
+        stage column the shingles are activity n-grams. Either way the
+        n-grams carry start/end markers, so sequences that only differ in
+        order still differ. A MinHash
+        signature of num_perm values estimates the Jaccard similarity of two
+        sets; the signature is cut into bands and traces that agree on a whole
+        band land in the same bucket. Bucket mates whose estimated similarity
+        reaches the threshold are linked, and clusters are the connected
+        components of those links. Hash values are computed once per distinct
+        n-gram, so the cost is linear in the number of (case, n-gram) pairs.
+
+        Parameters:
+        - ngram: Length of the activity n-grams forming a trace's set
+        - num_perm: Number of MinHash permutations (must be divisible by bands)
+        - bands: Number of LSH bands; rows per band = num_perm / bands
+        - threshold: Minimum estimated Jaccard similarity to link two traces
+        - seed: Seed of the hash functions
+        - chunk_size: (case, n-gram) pairs hashed per block (bounds memory)
+        - stage_col: Stage column for stage-aware shingles (None or missing = activity n-grams)
+        """
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.ngram = ngram
+        self.num_perm = num_perm
+        self.bands = bands
+        self.threshold = threshold
+        self.seed = seed
+        self.chunk_size = chunk_size
+        self.stage_col = stage_col
+        rng = np.random.default_rng(seed)
+        self.hash_a = rng.integers(1, HASH_PRIME, num_perm, dtype=np.int64)
+        self.hash_b = rng.integers(0, HASH_PRIME, num_perm, dtype=np.int64)
+        self.signatures = None
+        self.labels = None
+
+    def shingles(self, activity_codes, case_starts, n_items):
+        """
+        Distinct (case, n-gram) pairs from shifted code arrays
+
+        Codes are padded with a start marker before and an end marker after
+        every trace. Returns (case index, n-gram id, n-gram keys) with pairs
+        sorted by case.
+        """
+        n_cases = len(case_starts)
+        case_lengths = np.diff(np.r_[case_starts, len(activity_codes)])
+        base = n_items + 2
+        start_marker, end_marker = n_items, n_items + 1
+
+        # Padded layout: ngram-1 start markers, the trace, one end marker
+        pad = self.ngram - 1
+        padded_lengths = case_lengths + pad + 1
+        padded_starts = np.r_[0, np.cumsum(padded_lengths)[:-1]]
+        padded = np.full(int(padded_lengths.sum()), start_marker, dtype=np.int64)
+        trace_positions = np.repeat(padded_starts + pad - case_starts, case_lengths) + np.arange(len(activity_codes))
+        padded[trace_positions] = activity_codes
+        padded[padded_starts + padded_lengths - 1] = end_marker
+
+        windows = padded_lengths - self.ngram + 1
+        owners = np.repeat(np.arange(n_cases), windows)
+        positions = np.repeat(padded_starts, windows) + np.arange(windows.sum()) - np.repeat(np.cumsum(windows) - windows, windows)
+        keys = np.zeros(len(positions), dtype=np.int64)
+        for shift in range(self.ngram):
+            keys = keys * base + padded[positions + shift]
+
+        pairs = np.unique(owners * base ** self.ngram + keys)
+        vocabulary, shingle_ids = np.unique(pairs % base ** self.ngram, return_inverse=True)
+        return pairs // base ** self.ngram, shingle_ids, vocabulary
+
+    def stage_shingles(self, stage_codes, activity_codes, case_starts, n_stages, n_items):
+        """
+        Distinct (case, shingle) pairs of stage-run n-grams and (stage, activity) pairs
+
+        Shingle keys of the two kinds are kept apart by their lowest bit.
+        Returns the same layout as shingles().
+        """
+        n_cases, n = len(case_starts), len(stage_codes)
+        case_of = np.repeat(np.arange(n_cases), np.diff(np.r_[case_starts, n]))
+        new_run = np.r_[True, (stage_codes[1:] != stage_codes[:-1]) | (case_of[1:] != case_of[:-1])]
+        run_positions = np.flatnonzero(new_run)
+        run_case_starts = np.searchsorted(run_positions, case_starts)
+        run_owners, run_ids, run_vocabulary = self.shingles(stage_codes[run_positions], run_case_starts, n_stages)
+
+        pair_codes = stage_codes.astype(np.int64) * n_items + activity_codes
+        pairs = np.unique(case_of.astype(np.int64) * (n_stages * n_items) + pair_codes)
+        owners = np.r_[run_owners, pairs // (n_stages * n_items)]
+        keys = np.r_[run_vocabulary[run_ids] * 2, pairs % (n_stages * n_items) * 2 + 1]
+        order = np.argsort(owners, kind='stable')
+        vocabulary, shingle_ids = np.unique(keys[order], return_inverse=True)
+        return owners[order], shingle_ids, vocabulary
+
+    def minhash(self, owners, shingle_ids, vocabulary, n_cases):
+        """MinHash signature matrix (cases x num_perm) of the (case, n-gram) pairs"""
+        # One hash row per distinct n-gram, then a grouped minimum over each case's n-grams
+        vocab_hashes = ((self.hash_a[None, :] * (vocabulary[:, None] % HASH_PRIME) + self.hash_b[None, :])
+                        % HASH_PRIME).astype(np.int32)
+        signatures = np.full((n_cases, self.num_perm), HASH_PRIME, dtype=np.int32)
+        case_bounds = np.flatnonzero(np.r_[True, owners[1:] != owners[:-1]])
+        pair_bounds = np.r_[case_bounds, len(owners)]
+        cases_per_block = max(1, self.chunk_size * len(case_bounds) // max(1, len(owners)))
+        for first in range(0, len(case_bounds), cases_per_block):
+            last = min(first + cases_per_block, len(case_bounds))
+            low, high = pair_bounds[first], pair_bounds[last]
+            hashes = vocab_hashes[shingle_ids[low:high]]
+            signatures[owners[case_bounds[first:last]]] = np.minimum.reduceat(hashes, case_bounds[first:last] - low, axis=0)
+        return signatures
+
+    def fit(self, df):
+        """Cluster the cases of an event frame; returns self"""
+        order, case_codes, activity_codes, activities, case_starts, cases = case_sorted_codes(df)
+        self.cases = np.asarray(cases)[case_codes[case_starts]] if len(order) else np.zeros(0, dtype=object)
+        self.activities = activities
+        self.traces = np.split(activity_codes, case_starts[1:]) if len(order) else []
+        n_cases = len(case_starts)
+        if n_cases == 0:
+            self.signatures = np.zeros((0, self.num_perm), dtype=np.int32)
+            self.labels = np.zeros(0, dtype=np.int64)
+            self.centrality = np.zeros(0)
+            return self
+
+        if self.stage_col is not None and self.stage_col in df.columns:
+            stage_codes, stages = pd.factorize(df[self.stage_col].to_numpy()[order], use_na_sentinel=False)
+            owners, shingle_ids, vocabulary = self.stage_shingles(stage_codes, activity_codes, case_starts,
+                                                                  len(stages), len(activities))
+        else:
+            owners, shingle_ids, vocabulary = self.shingles(activity_codes, case_starts, len(activities))
+        self.signatures = self.minhash(owners, shingle_ids, vocabulary, n_cases)
+
+        # LSH: per band, link every case to the first case of its bucket if similar enough
+        rows = self.num_perm // self.bands
+        edge_from, edge_to = [], []
+        self.centrality = np.zeros(n_cases)
+        for band in range(self.bands):
+            band_rows = self.signatures[:, band * rows:(band + 1) * rows]
+            _, buckets, bucket_sizes = np.unique(band_rows, axis=0, return_inverse=True, return_counts=True)
+            buckets = buckets.ravel()
+            self.centrality += bucket_sizes[buckets]
+            leaders = np.full(len(bucket_sizes), -1, dtype=np.int64)
+            leaders[buckets[::-1]] = np.arange(n_cases)[::-1]
+            candidates = np.flatnonzero(leaders[buckets] != np.arange(n_cases))
+            edge_from.append(candidates)
+            edge_to.append(leaders[buckets[candidates]])
+        edge_from, edge_to = np.concatenate(edge_from), np.concatenate(edge_to)
+        if len(edge_from):
+            pairs = np.unique(np.c_[edge_from, edge_to], axis=0)
+            edge_from, edge_to = pairs[:, 0], pairs[:, 1]
+            similarity = (self.signatures[edge_from] == self.signatures[edge_to]).mean(axis=1)
+            keep = similarity >= self.threshold
+            edge_from, edge_to = edge_from[keep], edge_to[keep]
+
+        graph = coo_matrix((np.ones(len(edge_from)), (edge_from, edge_to)), shape=(n_cases, n_cases))
+        _, labels = connected_components(graph, directed=False)
+        # Cluster ids by descending size
+        sizes = np.bincount(labels)
+        rank = np.empty_like(sizes)
+        rank[np.argsort(-sizes, kind='stable')] = np.arange(len(sizes))
+        self.labels = rank[labels]
+        print(f"✅ Clustered {n_cases:,} traces into {len(sizes):,} clusters "
+              f"(MinHash {self.num_perm}, {self.bands} bands, Jaccard ≥ {self.threshold})")
+        return self
+
+    @property
+    def case_clusters(self):
+        """Series mapping every case id to its cluster id"""
+        return pd.Series(self.labels, index=pd.Index(self.cases, name='case_id'), name='cluster')
+
+    def clusters(self, df=None):
+        """
+        One row per cluster: size, share, representative trace and, when the
+        event frame is given, the latency profile of its cases
+
+        The representative is the member trace whose LSH buckets are shared
+        with the most other traces, i.e. the most central member.
+        """
+        if self.labels is None:
+            raise ValueError("Trace clusterer not fitted. Call fit() first.")
+        n_clusters = int(self.labels.max()) + 1 if len(self.labels) else 0
+        order = np.lexsort((-self.centrality, self.labels))
+        representatives = order[np.searchsorted(self.labels[order], np.arange(n_clusters))]
+        sizes = np.bincount(self.labels, minlength=n_clusters)
+        distinct = pd.Series([tuple(t) for t in self.traces]).groupby(self.labels).nunique().to_numpy()
+
+        summary = pd.DataFrame({
+            'cases': sizes,
+            'share': sizes / len(self.labels),
+            'distinct_variants': distinct,
+            'representative': [tuple(self.activities[a] for a in self.traces[i]) for i in representatives],
+            'representative_case': self.cases[representatives]
+        }, index=pd.RangeIndex(n_clusters, name='cluster'))
+
+        if df is not None:
+            metrics = case_metrics(df).reindex(self.cases)
+            grouped = metrics.groupby(self.labels)
+            summary['mean_events'] = grouped['events'].mean()
+            summary['mean_throughput_ms'] = grouped['throughput_ms'].mean()
+            summary['p50_throughput_ms'] = grouped['throughput_ms'].median()
+            summary['p95_throughput_ms'] = grouped['throughput_ms'].quantile(0.95)
+            summary['mean_service_ms'] = grouped['service_ms'].mean()
+        return summary.round(4)
+
+
+def cluster_variants(df, **options):
+    """Fit a TraceClusterer on df and return (cluster summary, case → cluster Series)"""
+    clusterer = TraceClusterer(**options).fit(df)
+    return clusterer.clusters(df), clusterer.case_clusters
+
+
+def main():
+    """Group near-identical traces and show the largest clusters"""
+    csv_file = input("Enter CSV file name: ").strip()
+    threshold = input("Minimum Jaccard similarity (press Enter for 0.3): ").strip()
+    threshold = float(threshold) if threshold else 0.3
+
+    try:
+        df = read_event_log(csv_file)
+        clusters, _ = cluster_variants(df, threshold=threshold)
+        print(f"\n=== Largest trace clusters ===")
+        for cluster, row in clusters.head(15).iterrows():
+            print(f"{cluster+1:2d}. {row['cases']:,} cases ({row['distinct_variants']:,} variants), "
+                  f"p95 throughput {row['p95_throughput_ms']:.0f}ms")
+            print(f"    {' → '.join(row['representative'])}")
+        return clusters
+
+    except FileNotFoundError as e:
+        print(f"❌ File not found: {e}")
+    except Exception as e:
+        print(f"❌ Error: {e}")
+
+if __name__ == "__main__":
+    main()
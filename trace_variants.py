@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+
+
+def case_sorted_codes(df, case_col='case_id', activity_col='activity', timestamp_col='timestamp'):
+    """
+    Integer-encode a frame in (case, timestamp) order
+
+    Returns (order, case_codes, activity_codes, activities, case_starts, cases)
+    where order is the row permutation, case_codes/activity_codes are aligned
+    with it, case_starts holds the first position of every case and cases maps
+    case codes back to case ids.
+    """
+    case_codes, cases = pd.factorize(df[case_col], sort=True)
+    activity_codes, activities = pd.factorize(df[activity_col], sort=True)
+    timestamps = pd.to_datetime(df[timestamp_col]).values.astype('datetime64[ns]').astype(np.int64)
+
+    order = np.lexsort((timestamps, case_codes))
+    case_codes = case_codes[order]
+    case_starts = np.flatnonzero(np.r_[True, case_codes[1:] != case_codes[:-1]]) if len(order) else np.zeros(0, dtype=np.int64)
+    return order, case_codes, activity_codes[order], list(activities), case_starts, cases
+
+
+def extract_variants(df, case_col='case_id', activity_col='activity', timestamp_col='timestamp'):
+    """
+    Variant multiset of an event frame without building a pm4py EventLog
+
+    Returns:
+    - variants: DataFrame with 'variant' (tuple of activities) and 'count', most frequent first
+    - case_variants: Series mapping every case id to its row in variants
+    """
+    order, case_codes, activity_codes, activities, case_starts, cases = case_sorted_codes(
+        df, case_col, activity_col, timestamp_col)
+    if len(order) == 0:
+        return pd.DataFrame(columns=['variant', 'count']), pd.Series(dtype=np.int64)
+
+    traces = [tuple(trace) for trace in np.split(activity_codes, case_starts[1:])]
+    trace_ids, trace_index = pd.factorize(pd.Series(traces, dtype=object))
+    counts = np.bincount(trace_ids)
+
+    by_frequency = np.argsort(-counts, kind='stable')
+    rank = np.empty_like(by_frequency)
+    rank[by_frequency] = np.arange(len(by_frequency))
+
+    variants = pd.DataFrame({
+        'variant': [tuple(activities[a] for a in trace_index[i]) for i in by_frequency],
+        'count': counts[by_frequency]
+    })
+    case_variants = pd.Series(rank[trace_ids], index=cases[case_codes[case_starts]], name='variant_id')
+    return variants, case_variants
@@ -0,0 +1,290 @@
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from baseline_engine import compute_baselines
+from case_analytics import case_metrics
+from event_schema import read_event_log
+from time_rollups import RollupCube
+
+
+BASELINE_METRICS = ['mean_duration', 'p95_duration', 'p99_duration', 'total_time_impact']
+CAP_RULE = re.compile(r'^cap\s+(?P<targets>.*?)\s+at\s+(?P<value>\d+(?:\.\d+)?)\s*ms$', re.IGNORECASE)
+SCALE_RULE = re.compile(r'^(?P<targets>.*?)\s*duration\s*[×xX*]\s*(?P<value>\d+(?:\.\d+)?)$')
+
+
+def parse_rule(text):
+    """
+    Parse one what-if rule
+
+    Two forms are understood:
+    - "<targets> duration × <factor>" (x or * also work): multiply durations
+    - "cap <targets> at <n>ms": limit durations to n milliseconds
+
+    targets is a space separated list of process and/or syscall names
+    (e.g. "guardian.exe ReadFile WriteFile"); an empty list targets every
+    event. Names are resolved against the log when the rule is applied.
+
+    Returns {'text', 'op', 'targets', 'value'}.
+    """
+    text = text.strip()
+    for op, pattern in (('cap', CAP_RULE), ('scale', SCALE_RULE)):
+        match = pattern.match(text)
+        if match:
+            value = float(match.group('value'))
+            return {'text': text, 'op': op, 'targets': match.group('targets').split(), 'value': value}
+    raise ValueError(f"Cannot parse what-if rule '{text}' "
+                     "(expected '<targets> duration × <factor>' or 'cap <targets> at <n>ms')")
+
+
+def _run_worker_scenario(name, rules):
+    """Evaluate one scenario against the engine set up by _init_worker (runs in a worker process)"""
+    return _worker_engine.evaluate(name, rules)
+
+
+def _init_worker(engine):
+    global _worker_engine
+    _worker_engine = engine
+
+
+class WhatIfEngine:
+    def __init__(self, df, threshold_model=None, threshold_percentile=95, max_workers=None):
+        """
+        What-if simulation of proposed optimisations on an event log
+
+        A scenario is a list of rules that rewrite call durations (scale by a
+        factor, or cap at a limit). Rules are compiled to boolean masks over
+        integer process/syscall codes and applied with np.where, so a scenario
+        costs a few array passes over the log. Events in a case are treated as
+        running back to back: every call finishes earlier by the time saved on
+        itself and on the case's earlier calls, which keeps the idle gaps
+        between calls intact. Case throughput, total bottleneck time (against
+        the thresholds of the original log) and the baseline metrics of the
+        affected process/syscall pairs are then recomputed per scenario.
+
+        Parameters:
+        - df: Event frame
+        - threshold_model: Fitted or unfitted ThresholdModel for per-process/syscall
+          bottleneck thresholds (None = global percentile threshold)
+        - threshold_percentile: Global percentile threshold (used when threshold_model is None)
+        - max_workers: Worker processes for run() (None = CPU count, 0 = run serially)
+        """
+        columns = ['case_id', 'resource', 'activity', 'timestamp', 'duration_ms']
+        if 'queue_wait_ms' in df.columns:
+            columns.append('queue_wait_ms')
+        self.resource_codes, self.resources = pd.factorize(df['resource'])
+        self.activity_codes, self.activities = pd.factorize(df['activity'])
+        self.frame = df[columns].reset_index(drop=True)
+
+        self.durations = self.frame['duration_ms'].to_numpy(dtype=np.float64)
+        self.end_us = self.frame['timestamp'].values.astype('datetime64[us]').astype(np.int64)
+        case_codes, _ = pd.factorize(self.frame['case_id'])
+        # (case, start) order for the cumulative time shift within each case
+        self.order = np.lexsort((self.end_us - np.round(self.durations * 1000).astype(np.int64), case_codes))
+        sorted_cases = case_codes[self.order]
+        self.case_bounds = np.flatnonzero(np.r_[True, sorted_cases[1:] != sorted_cases[:-1]])
+
+        if threshold_model is None:
+            self.thresholds = np.full(len(df), df['duration_ms'].quantile(threshold_percentile / 100))
+        else:
+            if threshold_model.thresholds is None:
+                threshold_model.fit(df)
+            self.thresholds = threshold_model.thresholds_for(df)
+        self.rollups = RollupCube(self.frame)
+        self.max_workers = max_workers
+        self.baseline = self.evaluate('baseline', [])
+
+    def compile_rule(self, rule):
+        """Boolean event mask of a parsed rule"""
+        mask = np.ones(len(self.durations), dtype=bool)
+        resource_lookup = {name: code for code, name in enumerate(self.resources)}
+        activity_lookup = {name: code for code, name in enumerate(self.activities)}
+        resources, activities = [], []
+        for target in rule['targets']:
+            if target in resource_lookup:
+                resources.append(resource_lookup[target])
+            elif target in activity_lookup:
+                activities.append(activity_lookup[target])
+            else:
+                raise ValueError(f"Unknown process or syscall '{target}' in rule '{rule['text']}'")
+        if resources:
+            mask &= np.isin(self.resource_codes, resources)
+        if activities:
+            mask &= np.isin(self.activity_codes, activities)
+        return mask
+
+    def apply(self, rules):
+        """
+        Rewritten (durations, changed mask) after applying rules in order
+
+        rules may be rule strings or parse_rule() dicts.
+        """
+        durations = self.durations
+        changed = np.zeros(len(durations), dtype=bool)
+        for rule in rules:
+            rule = parse_rule(rule) if isinstance(rule, str) else rule
+            mask = self.compile_rule(rule)
+            if rule['op'] == 'scale':
+                rewritten = np.where(mask, durations * rule['value'], durations)
+            else:
+                rewritten = np.where(mask, np.minimum(durations, rule['value']), durations)
+            changed |= rewritten != durations
+            durations = rewritten
+        return durations, changed
+
+    def scenario_frame(self, durations):
+        """
+        Event frame with the rewritten durations and the shifted completion times
+
+        queue_wait_ms keeps its share of the call duration.
+        """
+        saved = self.durations[self.order] - durations[self.order]
+        cumulative = np.cumsum(saved)
+        # Restart the running saving at every case boundary
+        offsets = np.repeat(cumulative[self.case_bounds] - saved[self.case_bounds],
+                            np.diff(np.r_[self.case_bounds, len(saved)]))
+        shift_us = np.empty(len(saved), dtype=np.int64)
+        shift_us[self.order] = np.round((cumulative - offsets) * 1000).astype(np.int64)
+
+        frame = self.frame.copy()
+        frame['duration_ms'] = durations
+        frame['timestamp'] = pd.to_datetime(self.end_us - shift_us, unit='us')
+        if 'queue_wait_ms' in frame.columns:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                ratio = np.where(self.durations > 0, durations / self.durations, 1.0)
+            frame['queue_wait_ms'] = frame['queue_wait_ms'].to_numpy(dtype=np.float64) * ratio
+        return frame
+
+    def evaluate(self, name, rules):
+        """
+        Apply one scenario and recompute the headline metrics
+
+        Returns a dict with the scenario's throughput, bottleneck and time
+        saved figures plus 'targets': the baseline metrics of every
+        (process, syscall) pair whose calls the rules changed.
+        """
+        rules = [parse_rule(rule) if isinstance(rule, str) else rule for rule in rules]
+        durations, changed = self.apply(rules)
+        frame = self.scenario_frame(durations)
+        throughput = case_metrics(frame)['throughput_ms']
+        slow = durations > self.thresholds
+
+        pairs = np.unique(self.resource_codes[changed].astype(np.int64) * len(self.activities)
+                          + self.activity_codes[changed])
+        targets = [(self.resources[p // len(self.activities)], self.activities[p % len(self.activities)])
+                   for p in pairs]
+        baselines = compute_baselines(frame, targets, self.rollups) if targets else {}
+
+        return {
+            'scenario': name,
+            'rules': '; '.join(rule['text'] for rule in rules),
+            'events_changed': int(changed.sum()),
+            'time_saved_ms': float((self.durations - durations).sum()),
+            'bottleneck_events': int(slow.sum()),
+            'bottleneck_ms': float(durations[slow].sum()),
+            'mean_throughput_ms': float(throughput.mean()),
+            'p95_throughput_ms': float(throughput.quantile(0.95)),
+            'targets': {pair: {metric: float(metrics[metric]) for metric in BASELINE_METRICS}
+                        for pair, metrics in baselines.items()}
+        }
+
+    def run(self, scenarios, rank_by='mean_throughput_change'):
+        """
+        Evaluate many scenarios and rank them against the original log
+
+        Parameters:
+        - scenarios: {name: [rules]}
+        - rank_by: Comparison column to sort by (ascending, so the largest
+          reduction comes first)
+
+        Returns (comparison, target_effects): one row per scenario with the
+        relative change of every headline metric (negative = faster), and one
+        row per (scenario, process, syscall) with its baseline metrics before
+        and after. A change is NaN when the original log has none of the
+        metric (e.g. no bottleneck time).
+        """
+        print(f"\n=== What-if simulation ({len(scenarios)} scenarios) ===")
+        workers = self.max_workers if self.max_workers is not None else (os.cpu_count() or 1)
+        if workers == 0 or len(scenarios) == 1:
+            results = [self.evaluate(name, rules) for name, rules in scenarios.items()]
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(self,)) as executor:
+                futures = [executor.submit(_run_worker_scenario, name, rules) for name, rules in scenarios.items()]
+                results = [future.result() for future in futures]
+
+        comparison = pd.DataFrame([{k: v for k, v in result.items() if k != 'targets'} for result in results])
+        for metric in ['bottleneck_ms', 'mean_throughput_ms', 'p95_throughput_ms']:
+            before = self.baseline[metric]
+            change = (comparison[metric] - before) / before if before else np.nan
+            comparison[metric.replace('_ms', '_change')] = change
+        comparison = comparison.sort_values(rank_by, kind='stable').reset_index(drop=True)
+        comparison.index = pd.RangeIndex(1, len(comparison) + 1, name='rank')
+        print(f"✅ Simulated {len(results)} scenarios over {len(self.durations):,} events")
+        return comparison.round(4), self._target_effects(results)
+
+    def _target_effects(self, results):
+        pairs = sorted({pair for result in results for pair in result['targets']})
+        before = compute_baselines(self.frame, pairs, self.rollups) if pairs else {}
+        rows = []
+        for result in results:
+            for (resource, activity), after in result['targets'].items():
+                row = {'scenario': result['scenario'], 'resource': resource, 'activity': activity}
+                for metric in BASELINE_METRICS:
+                    row[f'{metric}_before'] = before[(resource, activity)][metric]
+                    row[f'{metric}_after'] = after[metric]
+                row['mean_change'] = after['mean_duration'] / row['mean_duration_before'] - 1
+                rows.append(row)
+        columns = (['scenario', 'resource', 'activity']
+                   + [f'{metric}_{when}' for metric in BASELINE_METRICS for when in ('before', 'after')]
+                   + ['mean_change'])
+        return pd.DataFrame(rows, columns=columns).round(4)
+
+
+def _format_change(change):
+    return "n/a" if pd.isna(change) else f"{change*100:+.1f}%"
+
+
+def describe_scenario(row):
+    """One-line description of a ranked scenario (n/a where the original log has no such time)"""
+    return (f"{row['scenario']}: throughput {_format_change(row['mean_throughput_change'])} mean / "
+            f"{_format_change(row['p95_throughput_change'])} p95, "
+            f"bottleneck time {_format_change(row['bottleneck_change'])} "
+            f"({row['time_saved_ms']/1000:.1f}s saved over {row['events_changed']:,} calls)")
+
+
+def main():
+    """Simulate proposed optimisations and rank their effect"""
+    csv_file = input("Enter CSV file name: ").strip()
+    print("Enter one scenario per line as 'name: rule; rule' "
+          "(e.g. 'io: ReadFile WriteFile duration × 0.6', 'registry: cap RegQueryValue at 20ms'), "
+          "empty line to finish:")
+    scenarios = {}
+    while True:
+        line = input("> ").strip()
+        if not line:
+            break
+        name, _, rules = line.partition(':')
+        scenarios[name.strip()] = [rule for rule in rules.split(';') if rule.strip()]
+
+    try:
+        if not scenarios:
+            raise ValueError("No scenarios given")
+        df = read_event_log(csv_file)
+        comparison, effects = WhatIfEngine(df).run(scenarios)
+        print(f"\n=== Ranked scenarios ===")
+        for rank, row in comparison.iterrows():
+            print(f"{rank:2d}. {describe_scenario(row)}")
+        print(f"\n=== Affected process/syscall baselines ===")
+        print(effects)
+        return comparison, effects
+
+    except FileNotFoundError as e:
+        print(f"❌ File not found: {e}")
+    except Exception as e:
+        print(f"❌ Error: {e}")
+
+if __name__ == "__main__":
+    main()